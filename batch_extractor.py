@@ -0,0 +1,271 @@
+"""
+Borgo-Bot - Batch-Keyword-Extraktion für Offline-Auswertungen
+Match-Matrix (Queries x KB-Entries) mit Confidence-Stufen
+
+Zum Tunen von Synonymen und Schwellen werden tausende geloggte Fragen
+durch den KeywordExtractor geschickt. Statt Query für Query:
+- jede normalisierte Query wird nur einmal gematcht (Logs wiederholen sich stark)
+- Treffer werden als (Zeile, Spalte, Stufe) gesammelt und per NumPy in eine
+  Inzidenz-Matrix geschrieben; Hit-Counts und Auswertungen sind Matrix-Operationen
+
+NumPy ist optional (nur für diese Offline-Auswertung nötig).
+
+Usage:
+    python batch_extractor.py borgo_bot_metrics.json --json report.json
+    python batch_extractor.py fragen.txt --kb borgo_knowledge_base.yaml --top 30
+"""
+
+import json
+import time
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from keyword_extractor import KeywordExtractor, normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Confidence-Stufen in der Matrix (0 = kein Treffer, höher = sicherer)
+TIER_NONE = 0
+TIER_LOW = 1
+TIER_MEDIUM = 2
+TIER_HIGH = 3
+
+TIER_NAMES = {
+    TIER_HIGH: 'high',
+    TIER_MEDIUM: 'medium',
+    TIER_LOW: 'low',
+    TIER_NONE: 'none',
+}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("batch_extractor benötigt numpy (pip install numpy)")
+
+
+def load_query_log(path: str) -> List[str]:
+    """
+    Liest geloggte Fragen
+
+    Unterstützt:
+    - Metrik-JSON des Bots (recent_interactions[].query)
+    - JSONL (eine Interaktion pro Zeile mit 'query')
+    - Textdatei (eine Frage pro Zeile)
+    """
+    text = Path(path).read_text(encoding='utf-8')
+
+    if path.endswith('.json'):
+        data = json.loads(text)
+        return [i['query'] for i in data.get('recent_interactions', []) if i.get('query')]
+
+    if path.endswith('.jsonl'):
+        queries = []
+        for line in text.splitlines():
+            if line.strip():
+                query = json.loads(line).get('query')
+                if query:
+                    queries.append(query)
+        return queries
+
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+@dataclass
+class MatchMatrix:
+    """
+    Ergebnis einer Batch-Extraktion
+
+    Gespeichert wird nur die Matrix der eindeutigen (normalisierten) Queries;
+    `inverse` ordnet jede Original-Query ihrer Zeile zu.
+    """
+    queries: List[str]
+    entries: List[str]
+    unique_tiers: 'np.ndarray'    # (eindeutige Queries, Entries) int8
+    inverse: 'np.ndarray'         # Query-Index -> Zeile in unique_tiers
+    elapsed_ms: float = 0.0
+
+    @property
+    def tiers(self) -> 'np.ndarray':
+        """Volle Matrix (Queries x Entries) - bei großen Logs speicherintensiv"""
+        return self.unique_tiers[self.inverse]
+
+    @property
+    def query_counts(self) -> 'np.ndarray':
+        """Häufigkeit jeder eindeutigen Query im Log"""
+        return np.bincount(self.inverse, minlength=len(self.unique_tiers))
+
+    def confidence_levels(self) -> List[str]:
+        """Gesamt-Confidence pro Query (wie extract()['confidence_level'])"""
+        row_max = self.unique_tiers.max(axis=1, initial=TIER_NONE)[self.inverse]
+        return [TIER_NAMES[int(tier)] for tier in row_max]
+
+    def matches(self, query_index: int) -> Dict[str, str]:
+        """Entry -> Stufe für eine Query"""
+        row = self.unique_tiers[self.inverse[query_index]]
+        return {self.entries[col]: TIER_NAMES[int(row[col])] for col in np.flatnonzero(row)}
+
+    def entry_hit_counts(self, min_tier: int = TIER_LOW) -> Dict[str, int]:
+        """Anzahl Queries pro Entry mit mindestens min_tier (absteigend)"""
+        hits = (self.unique_tiers >= min_tier).T.astype(np.int64) @ self.query_counts
+        order = np.argsort(-hits, kind='stable')
+        return {self.entries[col]: int(hits[col]) for col in order if hits[col]}
+
+    def entry_tier_counts(self) -> Dict[str, Dict[str, int]]:
+        """Entry -> {'high': n, 'medium': n, 'low': n} (nur Entries mit Treffern)"""
+        counts = self.query_counts
+        per_tier = {
+            tier: (self.unique_tiers == tier).T.astype(np.int64) @ counts
+            for tier in (TIER_HIGH, TIER_MEDIUM, TIER_LOW)
+        }
+        result = {}
+        for col, entry in enumerate(self.entries):
+            tiers = {TIER_NAMES[tier]: int(hits[col]) for tier, hits in per_tier.items()}
+            if any(tiers.values()):
+                result[entry] = tiers
+        return result
+
+    def unmatched_queries(self) -> List[str]:
+        """Queries ohne jeden Treffer (Original-Text, Reihenfolge wie im Log)"""
+        unmatched_rows = ~self.unique_tiers.any(axis=1)
+        return [q for q, row in zip(self.queries, self.inverse) if unmatched_rows[row]]
+
+    def summary(self, top: int = 20) -> Dict:
+        """Maschinenlesbare Zusammenfassung (für --json)"""
+        unmatched = self.unmatched_queries()
+        frequent_unmatched: Dict[str, int] = {}
+        for query in unmatched:
+            key = normalize_query(query)
+            frequent_unmatched[key] = frequent_unmatched.get(key, 0) + 1
+
+        levels = self.confidence_levels()
+        return {
+            'queries': len(self.queries),
+            'unique_queries': len(self.unique_tiers),
+            'entries': len(self.entries),
+            'elapsed_ms': round(self.elapsed_ms, 2),
+            'confidence_levels': {name: levels.count(name) for name in TIER_NAMES.values()},
+            'no_match_rate_percent': round(len(unmatched) / len(self.queries) * 100, 2) if self.queries else 0.0,
+            'entry_hits': self.entry_tier_counts(),
+            'top_unmatched': sorted(frequent_unmatched.items(), key=lambda x: (-x[1], x[0]))[:top],
+        }
+
+
+class BatchExtractor:
+    """
+    Batch-API über einem KeywordExtractor
+
+    Nutzt dieselben kompilierten Matcher und Indizes wie der Bot
+    (gleiche Treffer wie extract()), aber ohne dessen LRU-Cache und Stats.
+    """
+
+    def __init__(self, extractor: KeywordExtractor):
+        _require_numpy()
+        self.extractor = extractor
+
+    def match_matrix(self, queries: Sequence[str]) -> MatchMatrix:
+        """
+        Match-Matrix für eine Liste von Queries
+
+        Returns:
+            MatchMatrix mit Stufe (TIER_*) pro Query und Entry
+        """
+        start = time.perf_counter()
+        lexicon = self.extractor.lexicon
+
+        entries = sorted(str(name) for name in lexicon.knowledge_base)
+        column = {name: col for col, name in enumerate(entries)}
+
+        # Jede normalisierte Query nur einmal matchen
+        row_of: Dict[str, int] = {}
+        inverse = np.fromiter(
+            (row_of.setdefault(normalize_query(q), len(row_of)) for q in queries),
+            dtype=np.int64, count=len(queries)
+        )
+
+        rows: List[int] = []
+        cols: List[int] = []
+        tiers: List[int] = []
+        for key, row in row_of.items():
+            high, medium, low = self.extractor.extract_tiers(key)
+            for keywords, tier in ((high, TIER_HIGH), (medium, TIER_MEDIUM), (low, TIER_LOW)):
+                for keyword in keywords:
+                    col = column.get(str(lexicon.term_to_entry.get(keyword, keyword)))
+                    if col is not None:
+                        rows.append(row)
+                        cols.append(col)
+                        tiers.append(tier)
+
+        unique_tiers = np.zeros((len(row_of), len(entries)), dtype=np.int8)
+        # Mehrere Keywords auf denselben Entry: höchste Stufe gewinnt
+        np.maximum.at(
+            unique_tiers,
+            (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)),
+            np.asarray(tiers, dtype=np.int8)
+        )
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(
+            f"📊 Batch extraction: {len(queries)} queries ({len(row_of)} unique) "
+            f"x {len(entries)} entries in {elapsed_ms:.0f} ms"
+        )
+
+        return MatchMatrix(
+            queries=list(queries),
+            entries=entries,
+            unique_tiers=unique_tiers,
+            inverse=inverse,
+            elapsed_ms=elapsed_ms,
+        )
+
+
+def print_report(summary: Dict, top: int):
+    """Menschenlesbarer Report der Batch-Auswertung"""
+    print("=" * 70)
+    print("BATCH KEYWORD EXTRACTION")
+    print("=" * 70)
+    print(f"Queries: {summary['queries']} ({summary['unique_queries']} unique), "
+          f"Entries: {summary['entries']}, Zeit: {summary['elapsed_ms']:.0f} ms")
+    print(f"Confidence: {summary['confidence_levels']}")
+    print(f"Ohne Treffer: {summary['no_match_rate_percent']}%")
+
+    print(f"\nTreffer pro Entry (Top {top}):")
+    ranked = sorted(summary['entry_hits'].items(), key=lambda x: -sum(x[1].values()))[:top]
+    for entry, tiers in ranked:
+        print(f"  {entry:28} {sum(tiers.values()):6}  "
+              f"(high {tiers['high']}, medium {tiers['medium']}, low {tiers['low']})")
+
+    print(f"\nHäufigste Fragen ohne Treffer (Top {top}):")
+    for query, count in summary['top_unmatched']:
+        print(f"  {count:5}x  {query}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    import argparse
+    from context_manager import ContextManager
+
+    parser = argparse.ArgumentParser(description="Query-Log gegen die Knowledge Base auswerten")
+    parser.add_argument('queries', help="Metrik-JSON, JSONL oder Textdatei (eine Frage pro Zeile)")
+    parser.add_argument('--kb', default='borgo_knowledge_base.yaml')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--json', default=None, help="Zusammenfassung als JSON speichern")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    manager = ContextManager(Path(args.kb))
+    batch = BatchExtractor(KeywordExtractor(lexicon=manager.lexicon_source, cache_size=0))
+    summary = batch.match_matrix(load_query_log(args.queries)).summary(top=args.top)
+
+    print_report(summary, args.top)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        print(f"✅ Report written to {args.json}")
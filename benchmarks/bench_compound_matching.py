@@ -0,0 +1,133 @@
+"""
+Borgo-Bot Benchmarks - Komposita und Flexion im KeywordExtractor
+
+Vergleicht Trefferquote und Latenz des KeywordExtractors mit und ohne
+CompoundIndex auf aufgezeichneten Gäste-Fragen.
+
+Queries kommen aus einer Metrik-Datei des Bots (recent_interactions in
+borgo_bot_metrics*.json), einer Textdatei (eine Frage pro Zeile) oder -
+ohne --queries - aus SAMPLE_QUERIES (typische Formulierungen aus dem Chat).
+
+Usage (aus dem Repo-Root):
+    python -m benchmarks.bench_compound_matching --queries borgo_bot_metrics_dev.json --json bench_compound.json
+"""
+
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.bench_utils import percentiles, print_table, time_calls, write_results
+from batch_extractor import load_query_log
+from context_manager import ContextManager
+from keyword_extractor import KeywordExtractor
+
+SAMPLE_QUERIES = [
+    "Wie geht die Pizzaofenreinigung?",
+    "Wo stehen die Mülltonnen?",
+    "Brauchen wir eine Hundeleine?",
+    "Wo ist der Sicherungskasten?",
+    "Gibt es einen Fahrradverleih in der Nähe?",
+    "Wie ist die Internetverbindung im Haus?",
+    "Wo finde ich Feuerholz?",
+    "Welche Wanderwege könnt ihr empfehlen?",
+    "Wie sind die Poolzeiten?",
+    "Gibt es einen Notarzt in der Gegend?",
+    "Wo sind die Parkplätze?",
+    "Wie funktioniert die Waschmaschine?",
+    "Ist die Heizung an?",
+    "Wer hat die Hausschlüssel?",
+    "Wo bekomme ich Bettwäsche?",
+    "Gibt es Schlangen im Garten?",
+    "Wann ist Checkout?",
+    "Wo kann ich einkaufen?",
+    "Wie komme ich zu den Stränden?",
+    "Gibt es Apotheken im Dorf?",
+    "Ist der Warmwasserboiler kaputt?",
+    "Wir hatten einen Stromausfall",
+    "Wie heißen die Passwörter fürs WLAN?",
+    "Wo ist der Küchenmüll hin?",
+    "Dürfen Hunde in den Pool?",
+    "Wo ist die Bushaltestelle?",
+    "Gibt es Taxis?",
+    "Wann kommt die Müllabfuhr?",
+    "Hallo zusammen!",
+    "Wie ist das Wetter morgen?",
+]
+
+
+def without_morphology(extractor: KeywordExtractor) -> KeywordExtractor:
+    """Baseline: gleicher Extractor, Komposita-Stufe abgeschaltet"""
+    extractor._find_morphology_matches = lambda query, exclude: set()
+    return extractor
+
+
+def run(extractors: Dict[str, KeywordExtractor], queries: List[str], repeat: int) -> Dict:
+    results = {}
+    for name, extractor in extractors.items():
+        hits = [bool(extractor.extract(q)['all']) for q in queries]
+        results[name] = {
+            'hit_rate_percent': round(sum(hits) / len(queries) * 100, 1),
+            'hits': hits,
+            'latency_ms': percentiles(time_calls(extractor.extract, queries, repeat)),
+        }
+    return results
+
+
+def main(args: argparse.Namespace):
+    queries = load_query_log(args.queries) if args.queries else SAMPLE_QUERIES
+    keywords = ContextManager(Path(args.kb)).get_available_keywords()
+
+    # Ohne Extraktions-Cache, sonst messen Wiederholungen nur Cache-Treffer
+    extractors = {
+        'baseline': without_morphology(KeywordExtractor(keywords, cache_size=0)),
+        'compound_index': KeywordExtractor(keywords, cache_size=0),
+    }
+    results = run(extractors, queries, args.repeat)
+
+    rescued = [
+        q for q, before, after in zip(
+            queries, results['baseline']['hits'], results['compound_index']['hits']
+        )
+        if after and not before
+    ]
+    build_ms = percentiles(time_calls(lambda kw: KeywordExtractor(kw), [keywords], 5))['p50']
+
+    rows = [
+        {
+            'extractor': name,
+            'hit_rate%': r['hit_rate_percent'],
+            'p50_ms': r['latency_ms']['p50'],
+            'p99_ms': r['latency_ms']['p99'],
+        }
+        for name, r in results.items()
+    ]
+    print(f"{len(queries)} queries, {len(keywords)} KB keywords, extractor build {build_ms} ms\n")
+    print_table(rows, list(rows[0]))
+
+    print(f"\nOnly found via compound/inflection index ({len(rescued)}):")
+    compound_extractor = extractors['compound_index']
+    for query in rescued:
+        print(f"  {query!r:50} -> {compound_extractor.extract(query)['medium']}")
+
+    for r in results.values():
+        del r['hits']
+    write_results(args.json, 'compound_matching', {
+        'queries': len(queries),
+        'extractor_build_ms': build_ms,
+        'results': results,
+        'rescued_queries': rescued,
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark: Trefferquote mit/ohne Komposita-Index")
+    parser.add_argument('--queries', default=None,
+                        help="Metrik-JSON (recent_interactions), JSONL oder Textdatei, eine Frage pro Zeile")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--kb', default='borgo_knowledge_base.yaml')
+    parser.add_argument('--json', default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    main(args)
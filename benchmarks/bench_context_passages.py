@@ -0,0 +1,172 @@
+"""
+Borgo-Bot Benchmarks - Prompt-Größe und Latenz mit Passagen-Auswahl
+
+Vergleicht für die Fragen des gelabelten Korpus (corpus_keywords.yaml)
+ganze Entries vs. nur die zur Frage passenden Absätze langer Entries
+(ContextManager mit passage_retrieval=False/True):
+- Prompt-Größe in Tokens (token_counter, wie im Bot) pro Frage
+- Anteil gekürzter Contexts und ob die erwarteten Entries erhalten bleiben
+- End-to-End-Latenz von LLMHandler für die gekürzten Fragen (nur dort
+  unterscheiden sich die Prompts) gegen den Ollama-Stub mit Prompt-Eval
+  proportional zur Prompt-Länge (--prompt-tps, CPU-Ollama ca. 30-100)
+  oder gegen ein echtes Ollama (--ollama-url)
+
+Usage (aus dem Repo-Root):
+    python -m benchmarks.bench_context_passages --prompt-tps 60 --json bench_passages.json
+"""
+
+import time
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.bench_keyword_accuracy import DEFAULT_CORPUS, load_corpus
+from benchmarks.bench_utils import percentiles, print_table, write_results
+from config_multi_bot import BM25_WEAK_CONFIDENCE, LLM_MODELS
+from context_manager import ContextManager
+from keyword_extractor import KeywordExtractor
+from lexicon import LexiconSource, build_lexicon, load_knowledge_base
+from llm_handler import LLMHandler
+from ollama_stub import OllamaStub, StubBehavior, StubConfig
+from token_counter import get_token_counter
+
+VARIANTS = {'full_entries': False, 'passages': True}
+
+
+def build_prompts(source: LexiconSource, corpus: List[Dict], model: Optional[str]) -> Dict[str, List[Dict]]:
+    """Pro Variante: Query, Context und Prompt-Tokens wie in process_message (Phase 2-3)"""
+    extractor = KeywordExtractor(lexicon=source, cache_size=0)
+    managers = {name: ContextManager(lexicon=source, passage_retrieval=enabled) for name, enabled in VARIANTS.items()}
+    handler = LLMHandler()
+    counter = get_token_counter(model)
+
+    prompts: Dict[str, List[Dict]] = {name: [] for name in VARIANTS}
+    for item in corpus:
+        query = item['query']
+        extraction = extractor.extract(query)
+        keywords = extractor.get_best_keywords(extraction, max_keywords=3)
+        if extraction['confidence_level'] in BM25_WEAK_CONFIDENCE:
+            retrieved = managers['full_entries'].rank_entries(query)
+            keywords = (keywords + [e for e in retrieved if e not in keywords])[:3]
+        if not keywords:
+            continue
+
+        for name, manager in managers.items():
+            context, meta = manager.build_context(keywords, query, model=model)
+            prompts[name].append({
+                'query': query,
+                'context': context,
+                'prompt_tokens': counter.count(handler._build_prompt(query, context, model)),
+                'trimmed': bool(meta['trimmed_entries']),
+                'expected_kept': bool(set(item['expected']) & set(meta['keywords_used'])),
+                'expected': bool(item['expected']),
+            })
+    return prompts
+
+
+def summarize_prompts(rows: List[Dict]) -> Dict:
+    tokens = [row['prompt_tokens'] for row in rows]
+    in_scope = [row for row in rows if row['expected']]
+    return {
+        'queries': len(rows),
+        'prompt_tokens': percentiles(tokens),
+        'total_prompt_tokens': sum(tokens),
+        'trimmed_rate': round(sum(row['trimmed'] for row in rows) / len(rows), 4) if rows else 0.0,
+        'expected_kept_rate': round(
+            sum(row['expected_kept'] for row in in_scope) / len(in_scope), 4
+        ) if in_scope else 0.0,
+    }
+
+
+async def measure_latency(rows: List[Dict], model: str, url: Optional[str], prompt_tps: float, repeat: int) -> Dict:
+    """End-to-End-Latenz von generate_response (ein Modell, sequentiell)"""
+
+    async def run(ollama_url: str) -> List[float]:
+        handler = LLMHandler(ollama_url=ollama_url)
+        handler.models = [model]
+        samples = []
+        for _ in range(repeat):
+            for row in rows:
+                start = time.perf_counter()
+                await handler.generate_response(row['query'], row['context'], max_retries=0)
+                samples.append((time.perf_counter() - start) * 1000)
+        await handler.close()
+        return samples
+
+    if url:
+        return percentiles(await run(url))
+
+    config = StubConfig(
+        models=[model],
+        default=StubBehavior(latency_ms=20, prompt_tokens_per_second=prompt_tps),
+    )
+    async with OllamaStub(config) as stub:
+        return percentiles(await run(stub.url))
+
+
+async def main(args: argparse.Namespace):
+    source = LexiconSource(build_lexicon(load_knowledge_base(Path(args.kb))))
+    corpus = load_corpus(Path(args.corpus))
+    model = args.model or LLM_MODELS[0]
+
+    prompts = build_prompts(source, corpus, model)
+
+    # Latenz nur für Fragen, deren Context sich durch die Passagen-Auswahl ändert
+    changed = [i for i, row in enumerate(prompts['passages']) if row['trimmed']]
+    results = {}
+    for name, rows in prompts.items():
+        trimmed_rows = [rows[i] for i in changed]
+        results[name] = summarize_prompts(rows)
+        results[name]['trimmed_queries'] = summarize_prompts(trimmed_rows)
+        results[name]['trimmed_queries']['latency_ms'] = await measure_latency(
+            trimmed_rows, model, args.ollama_url, args.prompt_tps, args.repeat
+        )
+
+    backend = args.ollama_url or f"stub, prompt eval {args.prompt_tps:g} tokens/s"
+    print(f"{len(prompts['passages'])} corpus queries with context, model {model}, {backend}\n")
+    print("All queries")
+    rows = [
+        {
+            'variant': name,
+            'trimmed': r['trimmed_rate'],
+            'prompt_tok_p50': r['prompt_tokens']['p50'],
+            'prompt_tok_p90': r['prompt_tokens']['p90'],
+            'prompt_tok_total': r['total_prompt_tokens'],
+            'expected_kept': r['expected_kept_rate'],
+        }
+        for name, r in results.items()
+    ]
+    print_table(rows, list(rows[0]))
+
+    print(f"\nTrimmed queries ({len(changed)})")
+    rows = [
+        {
+            'variant': name,
+            'prompt_tok_mean': r['trimmed_queries']['prompt_tokens']['mean'],
+            'prompt_tok_total': r['trimmed_queries']['total_prompt_tokens'],
+            'latency_p50_ms': r['trimmed_queries']['latency_ms']['p50'],
+            'latency_mean_ms': r['trimmed_queries']['latency_ms']['mean'],
+        }
+        for name, r in results.items()
+    ]
+    print_table(rows, list(rows[0]))
+
+    write_results(args.json, 'context_passages', {'model': model, 'backend': backend, 'variants': results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark: Prompt-Größe und Latenz mit/ohne Passagen-Auswahl")
+    parser.add_argument('--kb', default='borgo_knowledge_base.yaml')
+    parser.add_argument('--corpus', default=str(DEFAULT_CORPUS))
+    parser.add_argument('--model', default=None, help="Standard: Primärmodell (LLM_MODELS[0])")
+    parser.add_argument('--prompt-tps', type=float, default=60.0,
+                        help="Prompt-Eval Tokens/s des Stubs (CPU-Ollama)")
+    parser.add_argument('--ollama-url', default=None, help="Echtes Ollama statt Stub")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--json', default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    asyncio.run(main(args))
@@ -0,0 +1,135 @@
+"""
+Borgo-Bot Benchmarks - Fuzzy-Matching (Tippfehler)
+
+Vergleicht den früheren Brute-Force-Ansatz (SequenceMatcher gegen jedes
+Keyword) mit dem Trigramm-Index auf Lexika bis 10k Begriffe.
+Die Query-Wörter sind Tippfehler-Varianten echter Begriffe (Auslassung,
+Vertauschung, Ersetzung, Einfügung) plus Wörter ohne Treffer.
+"agreement" = Anteil Lookups, bei denen der Index denselben Score liefert
+wie Brute-Force (gleich gute Treffer).
+
+Usage (aus dem Repo-Root):
+    python -m benchmarks.bench_fuzzy_matching --sizes 100,1000,10000 --json bench_fuzzy.json
+"""
+
+import random
+import time
+import logging
+import argparse
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple
+
+from benchmarks.bench_utils import percentiles, print_table, time_calls, write_results
+from benchmarks.synthetic_kb import generate_kb, kb_terms, load_kb
+from fuzzy_index import TrigramIndex
+from config_multi_bot import FUZZY_MATCH_THRESHOLD
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyzäöüß'
+
+
+def brute_force(terms: List[str], word: str, threshold: float) -> Optional[Tuple[str, float]]:
+    """Früherer Ansatz aus KeywordExtractor._find_fuzzy_matches"""
+    best_match, best_score = None, 0.0
+    for term in terms:
+        score = SequenceMatcher(None, word, term).ratio()
+        if score > best_score and score >= threshold:
+            best_score, best_match = score, term
+    return (best_match, best_score) if best_match else None
+
+
+def make_typo(rng: random.Random, word: str) -> str:
+    """Ein zufälliger Tippfehler"""
+    if len(word) < 3:
+        return word + rng.choice(ALPHABET)
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(['delete', 'swap', 'replace', 'insert'])
+    if kind == 'delete':
+        return word[:i] + word[i + 1:]
+    if kind == 'swap':
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if kind == 'replace':
+        return word[:i] + rng.choice(ALPHABET) + word[i + 1:]
+    return word[:i] + rng.choice(ALPHABET) + word[i:]
+
+
+def query_words(terms: List[str], n: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    candidates = [t for t in terms if len(t) >= 4]
+    words = []
+    for i in range(n):
+        if i % 5 == 4:
+            words.append(''.join(rng.choice(ALPHABET) for _ in range(rng.randint(5, 10))))
+        else:
+            words.append(make_typo(rng, rng.choice(candidates)))
+    return words
+
+
+def run_size(size: int, base_kb: dict, n_words: int, brute_words: int, seed: int, threshold: float) -> dict:
+    kb = generate_kb(max(1, size // 6), seed=seed, base_kb=base_kb)
+    terms = sorted(set(kb_terms(kb)))[:size]
+
+    build_start = time.perf_counter()
+    index = TrigramIndex(terms)
+    build_ms = (time.perf_counter() - build_start) * 1000
+
+    words = query_words(terms, n_words, seed)
+    brute_subset = words[:brute_words]
+
+    agree = 0
+    for word in brute_subset:
+        expected = brute_force(terms, word, threshold)
+        got = index.best_match(word, threshold)
+        if (expected is None and got is None) or (expected and got and abs(expected[1] - got[1]) < 1e-9):
+            agree += 1
+
+    brute = time_calls(lambda w: brute_force(terms, w, threshold), brute_subset)
+    indexed = time_calls(lambda w: index.best_match(w, threshold), words, repeat=3)
+
+    return {
+        'terms': len(terms),
+        'build_ms': round(build_ms, 2),
+        'agreement_percent': round(agree / len(brute_subset) * 100, 1),
+        'brute_force_ms': percentiles(brute),
+        'trigram_index_ms': percentiles(indexed),
+    }
+
+
+def main(args: argparse.Namespace):
+    base_kb = load_kb(args.kb)
+    threshold = args.threshold if args.threshold is not None else FUZZY_MATCH_THRESHOLD
+    results = [
+        run_size(int(size), base_kb, args.words, args.brute_words, args.seed, threshold)
+        for size in args.sizes.split(',')
+    ]
+
+    rows = [
+        {
+            'terms': r['terms'],
+            'build_ms': r['build_ms'],
+            'brute_p50': round(r['brute_force_ms']['p50'], 3),
+            'index_p50': round(r['trigram_index_ms']['p50'], 4),
+            'index_p99': round(r['trigram_index_ms']['p99'], 4),
+            'speedup': round(r['brute_force_ms']['mean'] / max(r['trigram_index_ms']['mean'], 1e-9), 1),
+            'agreement%': r['agreement_percent'],
+        }
+        for r in results
+    ]
+    print(f"Fuzzy lookup per query word in ms (threshold {threshold})\n")
+    print_table(rows, list(rows[0]))
+    write_results(args.json, 'fuzzy_matching', results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark: SequenceMatcher-Scan vs. Trigramm-Index")
+    parser.add_argument('--sizes', default='100,1000,10000')
+    parser.add_argument('--words', type=int, default=500)
+    parser.add_argument('--brute-words', type=int, default=50,
+                        help="Wörter für Brute-Force-Baseline und Agreement")
+    parser.add_argument('--threshold', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--kb', default='borgo_knowledge_base.yaml')
+    parser.add_argument('--json', default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    main(args)
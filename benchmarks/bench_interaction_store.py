@@ -0,0 +1,132 @@
+"""
+Borgo-Bot Benchmarks - SQLite-Historie (interaction_store.py)
+
+Füllt eine DB mit synthetischer Historie (drei Bots, Interactions gleichmäßig
+über `--days` verteilt, Fehler-/Fallback-Anteile wie im Betrieb) und misst:
+- Insert-Durchsatz in Batches von INTERACTION_STORE_BATCH_SIZE
+- Problem-Patterns pro Bot über die ganze Historie und die letzten 7 Tage
+- Stunden-Report pro Bot (24 h)
+- Dauer von Retention + Compaction
+Zum Vergleich: get_problem_patterns über das volle In-Memory-Fenster.
+
+Usage (aus dem Repo-Root):
+    python -m benchmarks.bench_interaction_store --json bench_store.json
+"""
+
+import random
+import logging
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import Dict
+
+from benchmarks.bench_utils import percentiles, print_table, time_calls, write_results
+from benchmarks.bench_monitoring import make_interactions
+from config_multi_bot import INTERACTION_STORE_BATCH_SIZE
+from interaction_store import InteractionStore
+from monitoring import MonitoringSystem
+
+BOTS = ['Borgo-Bot-DEV 🔧', 'Borgo-Bot-TEST 🧪', 'Borgo-Bot 🤖']
+
+
+def fill(store: InteractionStore, rows: int, days: int, seed: int = 1) -> float:
+    """Historie einfügen (wie der Writer: to_row + executemany pro Batch); Returns: Zeilen/s"""
+    rng = random.Random(seed)
+    templates = make_interactions(1_000, seed=seed)
+    now = datetime.now()
+    step = timedelta(days=days) / rows
+    start = time.perf_counter()
+    batch = []
+    for n in range(rows):
+        template = templates[n % len(templates)]
+        # Kopie: serialisiert wird erst in _write
+        log_entry = replace(template, timestamp=(now - step * (rows - n)).isoformat())
+        batch.append((rng.choice(BOTS), log_entry))
+        if len(batch) == INTERACTION_STORE_BATCH_SIZE:
+            store._write(batch)
+            batch = []
+    if batch:
+        store._write(batch)
+    return rows / (time.perf_counter() - start)
+
+
+def bench_history(rows: int, days: int, repeats: int, metrics_dir: Path) -> Dict:
+    store = InteractionStore(str(metrics_dir / f"interactions_{rows}.db"), retention_days=days * 2)
+    rows_per_second = fill(store, rows, days)
+    bot = BOTS[0]
+
+    queries = {
+        'patterns_all': lambda _: store.problem_patterns(bot=bot),
+        'patterns_7d': lambda _: store.problem_patterns(bot=bot, days=7),
+        'hourly_24h': lambda _: store.hourly_report(bot=bot, hours=24),
+    }
+    timings = {
+        name: percentiles(time_calls(query, range(repeats)))
+        for name, query in queries.items()
+    }
+
+    # Retention + Compaction: ältestes Viertel löschen, Details ab der Hälfte kürzen
+    store.retention_days = days * 3 / 4
+    store.detail_days = days / 2
+    maintenance = store.maintain()
+
+    size_mb = sum(p.stat().st_size for p in metrics_dir.glob(f"interactions_{rows}.db*")) / 1024 / 1024
+    store._conn.close()
+    return {
+        'rows': rows,
+        'days': days,
+        'insert_rows_per_s': round(rows_per_second),
+        'query_ms': {name: {k: round(v, 2) for k, v in t.items() if k != 'count'} for name, t in timings.items()},
+        'maintenance': maintenance,
+        'db_mb_after_maintenance': round(size_mb, 1),
+    }
+
+
+def bench_window(window_size: int, repeats: int, metrics_dir: Path) -> Dict:
+    monitor = MonitoringSystem(metrics_file=str(metrics_dir / "window.json"), window_size=window_size)
+    monitor._save_metrics = lambda: None
+    for log_entry in make_interactions(window_size):
+        monitor.log_interaction(log_entry)
+    return percentiles(time_calls(lambda _: monitor.get_problem_patterns(), range(repeats)))
+
+
+def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [bench_history(rows, args.days, args.repeats, Path(tmp)) for rows in args.rows]
+        window = bench_window(args.window, args.repeats, Path(tmp))
+
+    rows = [
+        {
+            'rows': r['rows'],
+            'insert_rows_per_s': r['insert_rows_per_s'],
+            'patterns_all_p50_ms': r['query_ms']['patterns_all']['p50'],
+            'patterns_7d_p50_ms': r['query_ms']['patterns_7d']['p50'],
+            'hourly_24h_p50_ms': r['query_ms']['hourly_24h']['p50'],
+            'maintenance_ms': r['maintenance']['duration_ms'],
+            'db_mb': r['db_mb_after_maintenance'],
+        }
+        for r in results
+    ]
+    print_table(rows, list(rows[0]))
+    print(f"\nIn-Memory get_problem_patterns ({args.window} Interactions): p50 {window['p50']:.2f} ms")
+
+    write_results(args.json, 'interaction_store', {
+        'history': results,
+        'window_patterns_ms': {k: round(v, 2) for k, v in window.items() if k != 'count'},
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark: SQLite-Historie, Inserts und Analyse-Abfragen")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 500_000])
+    parser.add_argument('--days', type=int, default=180, help="Zeitraum der synthetischen Historie")
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--window', type=int, default=1_000, help="Fenstergröße für den In-Memory-Vergleich")
+    parser.add_argument('--json', default=None)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)  # Alerts des Testverkehrs nicht ausgeben
+    main(args)
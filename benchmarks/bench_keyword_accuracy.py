@@ -0,0 +1,295 @@
+"""
+Borgo-Bot Benchmarks - Genauigkeit und Latenz der Keyword-Extraktion
+
+Misst pro Extraktions-Strategie Precision/Recall gegen einen gelabelten
+Korpus (benchmarks/corpus_keywords.yaml, DE/IT/EN) und gegen synthetische
+KBs (1k/10k Entries) sowie Latenz-Perzentile und Speicherbedarf des Lexikons.
+Damit lässt sich jede Matching-Änderung auf Regressionen prüfen.
+
+Strategien (kumulativ, wie die Stufen in KeywordExtractor):
+- direct:      nur direkte Treffer (High)
+- synonyms:    + Synonyme
+- morphology:  + Wortformen/Komposita
+- fuzzy:       + Tippfehler (= KeywordExtractor.extract wie im Bot)
+- bm25_weak:   + BM25-Ranking bei schwacher Extraktion (Phase 2.5 im Bot)
+- bm25_only:   nur BM25 über Antworttexte
+
+Metriken pro Frage: vorhergesagte Entries = Top-3-Keywords, auf Entries
+abgebildet. Precision = korrekte / alle vorhergesagten Entries (Fragen
+außerhalb der KB zählen mit), Recall = Anteil der KB-Fragen mit mindestens
+einem erwarteten Entry.
+
+Usage (aus dem Repo-Root):
+    python -m benchmarks.bench_keyword_accuracy --sizes 1000,10000 --json bench_accuracy.json
+"""
+
+import time
+import logging
+import argparse
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+from benchmarks.bench_utils import percentiles, print_table, time_calls, write_results
+from benchmarks.synthetic_kb import generate_kb, generate_labeled_queries, load_kb
+from config_multi_bot import BM25_WEAK_CONFIDENCE
+from context_manager import ContextManager
+from keyword_extractor import CategoryMatcher, KeywordExtractor, normalize_query
+from lexicon import LexiconSource, build_lexicon
+
+DEFAULT_CORPUS = Path(__file__).with_name('corpus_keywords.yaml')
+MAX_KEYWORDS = 3
+
+LabeledQuery = Tuple[str, List[str]]
+
+
+def load_corpus(path: Path) -> List[Dict]:
+    """Gelabelter Korpus: Liste von {query, lang, expected}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        corpus = yaml.safe_load(f) or []
+    for item in corpus:
+        item['expected'] = [str(entry) for entry in item.get('expected') or []]
+    return corpus
+
+
+def build_strategies(source: LexiconSource) -> Dict[str, Callable[[str], List[str]]]:
+    """Strategie-Name -> Funktion Query -> vorhergesagte Entries (max. MAX_KEYWORDS)"""
+    extractor = KeywordExtractor(lexicon=source, cache_size=0)
+    context_manager = ContextManager(lexicon=source)
+
+    def to_entries(keywords) -> List[str]:
+        entries = []
+        for keyword in keywords:
+            entry = str(source.current.term_to_entry.get(keyword.lower(), keyword))
+            if entry not in entries:
+                entries.append(entry)
+        return entries[:MAX_KEYWORDS]
+
+    def direct(query: str) -> List[str]:
+        high, _ = extractor._find_lexicon_matches(normalize_query(query))
+        return to_entries(sorted(high))
+
+    def synonyms(query: str) -> List[str]:
+        high, medium = extractor._find_lexicon_matches(normalize_query(query))
+        return to_entries(sorted(high) + sorted(medium))
+
+    def morphology(query: str) -> List[str]:
+        key = normalize_query(query)
+        high, medium = extractor._find_lexicon_matches(key)
+        medium |= extractor._find_morphology_matches(key, exclude=high | medium)
+        return to_entries(sorted(high) + sorted(medium))
+
+    def fuzzy(query: str) -> List[str]:
+        extraction = extractor.extract(query)
+        return to_entries(extractor.get_best_keywords(extraction, max_keywords=MAX_KEYWORDS))
+
+    def bm25_weak(query: str) -> List[str]:
+        # Wie process_message: Phase 2 + Phase 2.5
+        extraction = extractor.extract(query)
+        keywords = extractor.get_best_keywords(extraction, max_keywords=MAX_KEYWORDS)
+        if extraction['confidence_level'] in BM25_WEAK_CONFIDENCE:
+            if not keywords:
+                keywords = context_manager.rank_entries(query)[:MAX_KEYWORDS]
+        return to_entries(keywords)
+
+    def bm25_only(query: str) -> List[str]:
+        return to_entries(context_manager.rank_entries(query))
+
+    return {
+        'direct': direct,
+        'synonyms': synonyms,
+        'morphology': morphology,
+        'fuzzy': fuzzy,
+        'bm25_weak': bm25_weak,
+        'bm25_only': bm25_only,
+    }
+
+
+def score(predictions: List[List[str]], labeled: List[LabeledQuery]) -> Dict:
+    """Micro-Precision, Recall (Treffer pro KB-Frage), F1, Fehlalarme"""
+    predicted = correct = in_scope = found = out_of_scope = false_alarms = 0
+
+    for entries, (_, expected) in zip(predictions, labeled):
+        hits = len(set(entries) & set(expected))
+        predicted += len(entries)
+        correct += hits
+        if expected:
+            in_scope += 1
+            found += bool(hits)
+        else:
+            out_of_scope += 1
+            false_alarms += bool(entries)
+
+    precision = correct / predicted if predicted else 0.0
+    recall = found / in_scope if in_scope else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        'precision': round(precision, 4),
+        'recall': round(recall, 4),
+        'f1': round(f1, 4),
+        'false_alarm_rate': round(false_alarms / out_of_scope, 4) if out_of_scope else 0.0,
+    }
+
+
+def evaluate(
+    strategies: Dict[str, Callable[[str], List[str]]],
+    labeled: List[LabeledQuery],
+    repeat: int,
+    languages: Optional[List[str]] = None
+) -> Dict:
+    """Genauigkeit und Latenz pro Strategie (optional je Sprache)"""
+    queries = [query for query, _ in labeled]
+    results = {}
+
+    for name, strategy in strategies.items():
+        predictions = [strategy(query) for query in queries]
+        result = score(predictions, labeled)
+        result['latency_ms'] = percentiles(time_calls(strategy, queries, repeat))
+
+        if languages:
+            result['by_lang'] = {}
+            for lang in sorted(set(languages)):
+                rows = [i for i, query_lang in enumerate(languages) if query_lang == lang]
+                result['by_lang'][lang] = score(
+                    [predictions[i] for i in rows], [labeled[i] for i in rows]
+                )
+        results[name] = result
+
+    return results
+
+
+def evaluate_categories(source: LexiconSource, corpus: List[Dict], repeat: int) -> Dict:
+    """
+    Trefferquote des CategoryMatchers
+
+    Bewertet werden Fragen, deren erwartete Entries eine Kategorie haben;
+    korrekt, wenn die gefundene Kategorie eine davon ist.
+    """
+    matcher = CategoryMatcher(lexicon=source)
+    lexicon = source.current
+    hinted = set(lexicon.category_index.categories)
+
+    evaluated = correct = answered = 0
+    for item in corpus:
+        categories = {lexicon.knowledge_base[e].get('category') for e in item['expected']} & hinted
+        if not categories:
+            continue
+        category = matcher.find_category(item['query'])
+        evaluated += 1
+        answered += category is not None
+        correct += category in categories
+
+    queries = [item['query'] for item in corpus]
+    return {
+        'evaluated': evaluated,
+        'accuracy': round(correct / evaluated, 4) if evaluated else 0.0,
+        'coverage': round(answered / evaluated, 4) if evaluated else 0.0,
+        'latency_ms': percentiles(time_calls(matcher.find_category, queries, repeat)),
+    }
+
+
+def measure_lexicon(kb: Dict) -> Tuple[LexiconSource, Dict]:
+    """Baut das Lexikon; Bauzeit und Speicher (tracemalloc) separat gemessen"""
+    start = time.perf_counter()
+    lexicon = build_lexicon(kb)
+    build_ms = (time.perf_counter() - start) * 1000
+    del lexicon
+
+    tracemalloc.start()
+    lexicon = build_lexicon(kb)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return LexiconSource(lexicon), {
+        'entries': len(kb),
+        'keywords': len(lexicon.keywords),
+        'build_ms': round(build_ms, 1),
+        'retained_mb': round(retained / 1e6, 2),
+        'peak_mb': round(peak / 1e6, 2),
+    }
+
+
+def print_results(title: str, results: Dict):
+    print(f"\n{title}")
+    rows = [
+        {
+            'strategy': name,
+            'precision': r['precision'],
+            'recall': r['recall'],
+            'f1': r['f1'],
+            'false_alarms': r['false_alarm_rate'],
+            'p50_ms': r['latency_ms']['p50'],
+            'p99_ms': r['latency_ms']['p99'],
+        }
+        for name, r in results.items()
+    ]
+    print_table(rows, list(rows[0]))
+
+
+def main(args: argparse.Namespace):
+    base_kb = load_kb(Path(args.kb))
+    corpus = load_corpus(Path(args.corpus))
+    unknown = sorted({e for item in corpus for e in item['expected'] if e not in base_kb})
+    if unknown:
+        raise SystemExit(f"Corpus references unknown KB entries: {unknown}")
+
+    # Echte KB mit gelabeltem Korpus
+    source, corpus_memory = measure_lexicon(base_kb)
+    labeled = [(item['query'], item['expected']) for item in corpus]
+    corpus_results = evaluate(
+        build_strategies(source), labeled, args.repeat,
+        languages=[item.get('lang', 'de') for item in corpus]
+    )
+    categories = evaluate_categories(source, corpus, args.repeat)
+
+    print(f"Corpus: {len(corpus)} queries, KB: {corpus_memory['entries']} entries, "
+          f"lexicon {corpus_memory['build_ms']} ms / {corpus_memory['retained_mb']} MB")
+    print_results("Labeled corpus (DE/IT/EN)", corpus_results)
+    print("\nRecall by language:")
+    for name, r in corpus_results.items():
+        recalls = ', '.join(f"{lang} {s['recall']}" for lang, s in r['by_lang'].items())
+        print(f"  {name:12} {recalls}")
+    print(f"\nCategoryMatcher: accuracy {categories['accuracy']}, coverage {categories['coverage']} "
+          f"({categories['evaluated']} queries), p50 {categories['latency_ms']['p50']} ms")
+
+    # Synthetische KBs: Skalierung von Latenz, Speicher und Genauigkeit
+    synthetic = {}
+    for size in args.sizes:
+        kb = generate_kb(size, seed=args.seed, base_kb=base_kb)
+        source, memory = measure_lexicon(kb)
+        labeled = generate_labeled_queries(kb, args.queries, seed=args.seed)
+        results = evaluate(build_strategies(source), labeled, 1)
+        synthetic[size] = {'lexicon': memory, 'strategies': results}
+
+        print(f"\nSynthetic KB: {size} entries, {memory['keywords']} keywords, "
+              f"build {memory['build_ms']} ms, retained {memory['retained_mb']} MB, "
+              f"peak {memory['peak_mb']} MB")
+        print_results(f"{len(labeled)} generated queries", results)
+
+    write_results(args.json, 'keyword_accuracy', {
+        'corpus': {
+            'queries': len(corpus),
+            'lexicon': corpus_memory,
+            'strategies': corpus_results,
+            'category_matcher': categories,
+        },
+        'synthetic': synthetic,
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark: Precision/Recall und Latenz der Keyword-Extraktion")
+    parser.add_argument('--kb', default='borgo_knowledge_base.yaml')
+    parser.add_argument('--corpus', default=str(DEFAULT_CORPUS))
+    parser.add_argument('--sizes', default='1000,10000',
+                        type=lambda s: [int(x) for x in s.split(',') if x])
+    parser.add_argument('--queries', type=int, default=2000, help="Generierte Fragen pro synthetischer KB")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    main(args)
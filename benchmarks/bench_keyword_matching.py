@@ -0,0 +1,124 @@
+"""
+Borgo-Bot Benchmarks - Direkte und Synonym-Treffer im KeywordExtractor
+
+Vergleicht den früheren Ansatz (ein \\b...\\b-Regex pro Keyword und Synonym,
+pro Query neu gebaut) mit dem kompilierten Aho-Corasick-Matcher - von der
+heutigen KB-Größe (~56 Einträge) bis zu mehreren tausend Einträgen.
+Prüft zusätzlich, dass beide Ansätze identische Treffer liefern.
+
+Usage (aus dem Repo-Root):
+    python -m benchmarks.bench_keyword_matching --sizes 56,500,2000,5000 --json bench_kw.json
+"""
+
+import re
+import time
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from benchmarks.bench_utils import percentiles, print_table, time_calls, write_results
+from benchmarks.synthetic_kb import generate_kb, generate_queries, load_kb
+from keyword_extractor import KeywordExtractor
+
+
+def kb_keywords(kb: Dict) -> Set[str]:
+    """Wie ContextManager.get_available_keywords()"""
+    keywords = set()
+    for name, data in kb.items():
+        keywords.add(name)
+        keywords.update(data.get('synonyms', []) or [])
+    return keywords
+
+
+def legacy_lexicon_matches(extractor: KeywordExtractor, query: str) -> Tuple[Set[str], Set[str]]:
+    """Früherer Ansatz: ein Regex pro Keyword / Synonym und Query"""
+    direct = set()
+    for keyword in extractor.yaml_keywords:
+        if re.search(r'\b' + re.escape(keyword) + r'\b', query):
+            direct.add(keyword)
+
+    via_synonym = set()
+    for base_keyword, synonyms in extractor.synonyms.items():
+        if base_keyword in direct or base_keyword not in extractor.yaml_keywords:
+            continue
+        for synonym in synonyms:
+            if re.search(r'\b' + re.escape(synonym) + r'\b', query):
+                via_synonym.add(base_keyword)
+                break
+
+    return direct, via_synonym
+
+
+def run_size(kb: Dict, queries: List[str], repeat: int, legacy_queries: int) -> Dict:
+    keywords = kb_keywords(kb)
+
+    build_start = time.perf_counter()
+    extractor = KeywordExtractor(keywords)
+    build_ms = (time.perf_counter() - build_start) * 1000
+
+    lowered = [q.lower() for q in queries]
+    # Der Regex-Ansatz kompiliert bei großen KBs pro Query zehntausende Patterns
+    # (re-Cache: 512) - daher nur auf einer Teilmenge messen
+    legacy_subset = lowered[:legacy_queries]
+
+    mismatches = sum(
+        1 for q in legacy_subset
+        if legacy_lexicon_matches(extractor, q) != extractor._find_lexicon_matches(q)
+    )
+
+    legacy = time_calls(lambda q: legacy_lexicon_matches(extractor, q), legacy_subset, 1)
+    compiled = time_calls(extractor._find_lexicon_matches, lowered, repeat)
+
+    return {
+        'entries': len(kb),
+        'patterns': extractor.matcher.pattern_count,
+        'build_ms': round(build_ms, 2),
+        'mismatches': mismatches,
+        'legacy_ms': percentiles(legacy),
+        'aho_corasick_ms': percentiles(compiled),
+    }
+
+
+def main(args: argparse.Namespace):
+    base_kb = load_kb(Path(args.kb))
+    results = []
+
+    for size in [int(s) for s in args.sizes.split(',')]:
+        kb = generate_kb(size, seed=args.seed, base_kb=base_kb)
+        queries = generate_queries(kb, args.queries, seed=args.seed)
+        results.append(run_size(kb, queries, args.repeat, args.legacy_queries))
+
+    rows = [
+        {
+            'entries': r['entries'],
+            'patterns': r['patterns'],
+            'build_ms': r['build_ms'],
+            'legacy_p50': round(r['legacy_ms']['p50'], 4),
+            'legacy_p99': round(r['legacy_ms']['p99'], 4),
+            'ac_p50': round(r['aho_corasick_ms']['p50'], 4),
+            'ac_p99': round(r['aho_corasick_ms']['p99'], 4),
+            'speedup': round(r['legacy_ms']['mean'] / max(r['aho_corasick_ms']['mean'], 1e-9), 1),
+            'mismatches': r['mismatches'],
+        }
+        for r in results
+    ]
+    print("Latency per query in ms (direct + synonym matching)\n")
+    print_table(rows, list(rows[0]))
+    write_results(args.json, 'keyword_matching', results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark: Regex-Scan vs. Aho-Corasick")
+    parser.add_argument('--sizes', default='56,500,2000,5000')
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--legacy-queries', type=int, default=30,
+                        help="Queries für Regex-Baseline und Treffer-Vergleich")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--kb', default='borgo_knowledge_base.yaml')
+    parser.add_argument('--json', default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    main(args)
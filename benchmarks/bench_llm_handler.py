@@ -0,0 +1,179 @@
+"""
+Borgo-Bot Benchmarks - LLM-Pfad gegen den Ollama-Stub
+
+Misst LLMHandler ohne echtes Ollama:
+- Retry/Fallback-Maschinerie (Fehler, Hänger, Timeouts)
+- Response-Validierung (ungültige Antworten erzwingen Retries)
+- Connection-Pooling unter Nebenläufigkeit (geteilte Session vs. Session pro Call)
+
+Usage (aus dem Repo-Root):
+    python -m benchmarks.bench_llm_handler --requests 200 --concurrency 8 --json bench_llm.json
+"""
+
+import time
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.bench_utils import percentiles, print_table, write_results
+from context_manager import ContextManager
+from llm_handler import LLMHandler
+from ollama_stub import OllamaStub, StubBehavior, StubConfig
+
+MODELS = ['mistral:instruct', 'granite3.3:2b', 'qwen2.5:7b']
+
+QUERIES = [
+    ("Wie funktioniert der Pizzaofen?", ['pizza']),
+    ("Wie ist das WLAN Passwort?", ['wlan']),
+    ("Sind Hunde erlaubt?", ['hunde']),
+    ("Was mache ich mit dem Müll?", ['muell']),
+    ("Wo kann ich parken?", ['parken']),
+]
+
+# Antwort, die _is_incomplete() ablehnt -> erzwingt Retry
+INCOMPLETE_RESPONSE = "Der Pizzaofen steht bei Casa Gabriello und"
+
+SCENARIOS = {
+    'happy_path': StubConfig(
+        models=MODELS,
+        default=StubBehavior(latency_ms=20),
+    ),
+    'primary_down': StubConfig(
+        models=MODELS,
+        default=StubBehavior(latency_ms=20),
+        model_overrides={'mistral:instruct': {'error_rate': 1.0}},
+    ),
+    'flaky_30pct': StubConfig(
+        models=MODELS,
+        default=StubBehavior(latency_ms=20, jitter_ms=10, error_rate=0.3),
+    ),
+    'validation_retry': StubConfig(
+        models=MODELS,
+        default=StubBehavior(latency_ms=20),
+        model_overrides={'mistral:instruct': {'mode': 'canned', 'response': INCOMPLETE_RESPONSE}},
+    ),
+    'primary_hangs': StubConfig(
+        models=MODELS,
+        default=StubBehavior(latency_ms=20),
+        model_overrides={'mistral:instruct': {'hang_rate': 1.0}},
+    ),
+    'slow_generation': StubConfig(
+        models=MODELS,
+        default=StubBehavior(latency_ms=50, tokens_per_second=400),
+    ),
+}
+
+
+def build_contexts(kb_path: Path) -> List[tuple]:
+    """Echte Contexts aus der Knowledge Base (realistische Prompt-Größen)"""
+    manager = ContextManager(kb_path)
+    contexts = []
+    for query, keywords in QUERIES:
+        context, _ = manager.build_context(keywords, query)
+        contexts.append((query, context))
+    return contexts
+
+
+async def run_scenario(
+    name: str,
+    config: StubConfig,
+    contexts: List[tuple],
+    requests: int,
+    concurrency: int,
+    pooled: bool,
+    timeout_seconds: float
+) -> Dict:
+    """Führt ein Szenario gegen einen frischen Stub aus"""
+    async with OllamaStub(config) as stub:
+        handler = LLMHandler(ollama_url=stub.url, pool_connections=pooled)
+        handler.models = MODELS
+        handler.timeout_seconds = timeout_seconds
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies: List[float] = []
+        attempts: List[int] = []
+        successes = 0
+
+        async def one(i: int):
+            nonlocal successes
+            query, context = contexts[i % len(contexts)]
+            async with semaphore:
+                start = time.perf_counter()
+                response, meta = await handler.generate_response(query, context)
+                latencies.append((time.perf_counter() - start) * 1000)
+                attempts.append(len(meta['attempts']))
+                if response:
+                    successes += 1
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        wall = time.perf_counter() - wall_start
+
+        await handler.close()
+
+        return {
+            'scenario': name,
+            'pooled': pooled,
+            'requests': requests,
+            'concurrency': concurrency,
+            'success_rate': round(successes / requests * 100, 1),
+            'avg_attempts': round(sum(attempts) / len(attempts), 2),
+            'throughput_rps': round(requests / wall, 1),
+            'latency_ms': percentiles(latencies),
+            'stub_requests': stub.stats['generate_requests'],
+            'stub_errors': stub.stats['errors_injected'],
+            'stub_hangs': stub.stats['hangs_injected'],
+        }
+
+
+async def main(args: argparse.Namespace):
+    contexts = build_contexts(Path(args.kb))
+    selected = args.scenarios.split(',') if args.scenarios else list(SCENARIOS)
+
+    results = []
+    for name in selected:
+        for pooled in (True, False):
+            result = await run_scenario(
+                name,
+                SCENARIOS[name],
+                contexts,
+                requests=args.requests,
+                concurrency=args.concurrency,
+                pooled=pooled,
+                timeout_seconds=args.timeout,
+            )
+            results.append(result)
+
+    rows = [
+        {
+            'scenario': r['scenario'],
+            'pool': 'yes' if r['pooled'] else 'no',
+            'ok%': r['success_rate'],
+            'attempts': r['avg_attempts'],
+            'rps': r['throughput_rps'],
+            'p50ms': round(r['latency_ms']['p50'], 1),
+            'p90ms': round(r['latency_ms']['p90'], 1),
+            'p99ms': round(r['latency_ms']['p99'], 1),
+            'stub_calls': r['stub_requests'],
+        }
+        for r in results
+    ]
+    print_table(rows, ['scenario', 'pool', 'ok%', 'attempts', 'rps', 'p50ms', 'p90ms', 'p99ms', 'stub_calls'])
+    write_results(args.json, 'llm_handler', results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLMHandler-Benchmark gegen den Ollama-Stub")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--timeout', type=float, default=0.5,
+                        help="Timeout pro Modell-Versuch in Sekunden (für 'primary_hangs')")
+    parser.add_argument('--scenarios', default='', help="Kommagetrennt, Default: alle")
+    parser.add_argument('--kb', default='borgo_knowledge_base.yaml')
+    parser.add_argument('--json', default=None, help="Ergebnisse als JSON speichern")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    asyncio.run(main(args))
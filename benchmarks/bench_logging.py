@@ -0,0 +1,179 @@
+"""
+Borgo-Bot Benchmarks - Kosten des Loggings pro Nachricht
+
+Vergleicht das bisherige Setup (FileHandler + StreamHandler, synchron im
+aufrufenden Thread) mit logging_setup.py (QueueHandler + Listener-Thread,
+Rotation, Sampling ausführlicher Zeilen). Die Konsole geht jeweils nach
+/dev/null, die Datei in ein temp-Verzeichnis.
+
+1. µs pro Log-Aufruf im aufrufenden Thread: kurze INFO-Zeile und
+   ausführliche Zeile (500 Zeichen, Sampling-Schlüssel 'llm_response')
+2. Pro Nachricht: Fragen des Korpus laufen durch BorgoBotInstance gegen den
+   Ollama-Stub; gemessen wird die Zeit in Logger.callHandlers (= Handler-
+   Arbeit auf der Event-Loop) und die Zahl der Zeilen pro Nachricht
+
+Usage (aus dem Repo-Root):
+    python -m benchmarks.bench_logging --json bench_logging.json
+"""
+
+import os
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from benchmarks.bench_keyword_accuracy import DEFAULT_CORPUS, load_corpus
+from benchmarks.bench_utils import percentiles, print_table, write_results
+from logging_setup import LOG_FORMAT, setup_logging, stop_logging, get_logging_stats
+
+VERBOSE_LINE = "🔍 LLM RESPONSE (500 chars): " + "Die Mülltonnen stehen am Parkplatz. " * 14
+
+
+def setup_sync(log_file: Path, devnull) -> Callable[[], None]:
+    """Bisheriges Setup (basicConfig mit FileHandler + StreamHandler)"""
+    handlers = [logging.FileHandler(log_file), logging.StreamHandler(devnull)]
+    formatter = logging.Formatter(LOG_FORMAT)
+    root = logging.getLogger()
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+    def teardown():
+        for handler in handlers:
+            root.removeHandler(handler)
+            handler.close()
+    return teardown
+
+
+def setup_queue(log_file: Path, devnull) -> Callable[[], None]:
+    """logging_setup.py (StreamHandler liest sys.stderr beim Anlegen)"""
+    with contextlib.redirect_stderr(devnull):
+        setup_logging(str(log_file))
+    return stop_logging
+
+
+SETUPS = {'sync': setup_sync, 'queue': setup_queue}
+
+
+def bench_calls(setup: Callable, calls: int, tmp: Path) -> Dict:
+    log = logging.getLogger('bench.logging')
+    results = {}
+    with open(os.devnull, 'w') as devnull:
+        for kind, message, extra in (('short', "📨 Processing: 'Wo stehen die Mülltonnen?...'", None),
+                                     ('verbose', VERBOSE_LINE, {'sample': 'llm_response'})):
+            teardown = setup(tmp / f"calls_{kind}.log", devnull)
+            samples = []
+            for _ in range(calls):
+                start = time.perf_counter()
+                log.info(message, extra=extra)
+                samples.append((time.perf_counter() - start) * 1e6)
+            teardown()
+            results[kind] = percentiles(samples)
+    return results
+
+
+class HandlerTimer:
+    """Misst die Zeit in Logger.callHandlers (Handler-Arbeit im aufrufenden Thread)"""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.records = 0
+        self._original = logging.Logger.callHandlers
+
+    def __enter__(self):
+        timer, original = self, self._original
+
+        def call_handlers(logger, record):
+            start = time.perf_counter()
+            original(logger, record)
+            timer.seconds += time.perf_counter() - start
+            timer.records += 1
+        logging.Logger.callHandlers = call_handlers
+        return self
+
+    def __exit__(self, *exc):
+        logging.Logger.callHandlers = self._original
+        return False
+
+
+async def bench_messages(setup: Callable, queries: List[str], tmp: Path) -> Dict:
+    from config_multi_bot import DEV_BOT_CONFIG
+    from borgo_bot_multi import BorgoBotInstance
+    from ollama_stub import OllamaStub, StubBehavior, StubConfig
+
+    log_file = tmp / "messages.log"
+    with open(os.devnull, 'w') as devnull:
+        teardown = setup(log_file, devnull)
+        async with OllamaStub(StubConfig(default=StubBehavior(latency_ms=0, mode='kb_echo'))) as stub:
+            bot = BorgoBotInstance({**DEV_BOT_CONFIG, 'ollama_url': stub.url,
+                                    'metrics_file': str(tmp / "metrics.json")})
+            per_message_ms = []
+            with HandlerTimer() as timer:
+                for query in queries:
+                    before = timer.seconds
+                    await bot.process_message(query)
+                    per_message_ms.append((timer.seconds - before) * 1000)
+            await bot.llm_handler.close()
+        stats = get_logging_stats()
+        teardown()
+
+    return {
+        'messages': len(queries),
+        'records_per_message': round(timer.records / len(queries), 1),
+        'lines_written_per_message': round(len(log_file.read_text(encoding='utf-8').splitlines()) / len(queries), 1),
+        'handler_ms_per_message': percentiles(per_message_ms),
+        'suppressed': stats.get('suppressed', {}),
+    }
+
+
+async def main(args: argparse.Namespace):
+    queries = [item['query'] for item in load_corpus(Path(args.corpus))]
+    queries = (queries * (args.messages // len(queries) + 1))[:args.messages]
+
+    # borgo_bot_multi konfiguriert beim Import das Logging - vorher importieren, dann zurücksetzen
+    import borgo_bot_multi  # noqa: F401
+    stop_logging()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, setup in SETUPS.items():
+            run_dir = Path(tmp) / name
+            run_dir.mkdir()
+            results[name] = {
+                'calls_us': bench_calls(setup, args.calls, run_dir),
+                'per_message': await bench_messages(setup, queries, run_dir),
+            }
+
+    rows = [
+        {
+            'setup': name,
+            'short_p50_us': r['calls_us']['short']['p50'],
+            'verbose_p50_us': r['calls_us']['verbose']['p50'],
+            'verbose_p99_us': r['calls_us']['verbose']['p99'],
+            'records_per_msg': r['per_message']['records_per_message'],
+            'lines_per_msg': r['per_message']['lines_written_per_message'],
+            'handler_ms_per_msg_p50': r['per_message']['handler_ms_per_message']['p50'],
+            'handler_ms_per_msg_p99': r['per_message']['handler_ms_per_message']['p99'],
+        }
+        for name, r in results.items()
+    ]
+    print_table(rows, list(rows[0]))
+    print(f"\nSuppressed (queue, {args.messages} messages): {results['queue']['per_message']['suppressed']}")
+
+    write_results(args.json, 'logging', results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark: synchrones Logging vs. Queue + Sampling")
+    parser.add_argument('--calls', type=int, default=20_000, help="Log-Aufrufe pro Zeilenart")
+    parser.add_argument('--messages', type=int, default=200, help="Nachrichten durch die Pipeline")
+    parser.add_argument('--corpus', default=str(DEFAULT_CORPUS))
+    parser.add_argument('--json', default=None)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,169 @@
+"""
+Borgo-Bot Benchmarks - Kosten von MonitoringSystem.log_interaction
+bei großen Interaction-Fenstern
+
+Vergleicht die inkrementellen Aggregate (Zähler beim Hinzufügen/Verdrängen,
+Stunden-Buckets) mit dem bisherigen Neu-Scannen des ganzen Fensters bei jedem
+Aufruf (RescanMonitoring, Logik des alten _update_metrics/_check_for_alerts).
+Gemessen wird µs pro log_interaction bei vollem Fenster (1k/10k/100k), ohne
+Datei-I/O (_save_metrics deaktiviert). Zusätzlich wird geprüft, dass die
+inkrementellen Raten denen eines vollständigen Scans entsprechen.
+
+Usage (aus dem Repo-Root):
+    python -m benchmarks.bench_monitoring --json bench_monitoring.json
+"""
+
+import random
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List
+
+from benchmarks.bench_utils import percentiles, print_table, time_calls, write_results
+from monitoring import InteractionLog, MonitoringSystem, is_hallucination
+
+WINDOW_SIZES = [1_000, 10_000, 100_000]
+
+# Ungefähr wie im Betrieb: 20% ohne Keywords, 10% Fallback, 5% Validierungsprobleme
+ISSUES = ["Possible hallucination: unknown number", "Response too short", "Wrong language"]
+
+
+class RescanMonitoring(MonitoringSystem):
+    """Bisherige Implementierung: Raten und Alerts per Scan über das ganze Fenster"""
+
+    def _append_to_window(self, log_entry: InteractionLog):
+        self.interactions.append(log_entry)
+
+    def _update_metrics(self, log_entry: InteractionLog):
+        super()._update_metrics(log_entry)
+        self.metrics['keywords_found_rate'] = (
+            sum(1 for i in self.interactions if i.keywords_found) / len(self.interactions) * 100
+        )
+        self.metrics['fallback_rate'] = (
+            sum(1 for i in self.interactions if i.fallback_used) / len(self.interactions) * 100
+        )
+        self.metrics['validation_failure_rate'] = (
+            sum(1 for i in self.interactions if i.validation_issues) / len(self.interactions) * 100
+        )
+        hour_key = datetime.now().strftime("%Y-%m-%d %H:00")
+        hour_interactions = [
+            i for i in self.interactions if i.timestamp.startswith(hour_key.split()[0])
+        ]
+        self.hourly_stats[hour_key]['avg_response_time'] = (
+            sum(i.response_time_ms for i in hour_interactions) / len(hour_interactions)
+        )
+
+    def _check_for_alerts(self, log_entry: InteractionLog):
+        recent = list(self.interactions)[-10:]
+        sum(1 for i in recent if not i.success)
+        hour_key = datetime.now().strftime("%Y-%m-%d %H")
+        recent_hour = [i for i in self.interactions if i.timestamp.startswith(hour_key)]
+        sum(1 for i in recent_hour if is_hallucination(i))
+
+
+def make_interactions(count: int, seed: int = 1) -> List[InteractionLog]:
+    rng = random.Random(seed)
+    timestamp = datetime.now().isoformat()
+    interactions = []
+    for n in range(count):
+        fallback = rng.random() < 0.10
+        issues = [rng.choice(ISSUES)] if rng.random() < 0.05 else []
+        interactions.append(InteractionLog(
+            timestamp=timestamp,
+            query=f"Frage {n}",
+            query_length=8,
+            keywords_found=[] if rng.random() < 0.20 else ['wifi'],
+            keywords_confidence='high',
+            context_entries=1,
+            context_words=80,
+            model_used=None if fallback else 'mistral:instruct',
+            response_length=200,
+            response_time_ms=rng.uniform(500, 5000),
+            validation_issues=issues,
+            fallback_used=fallback,
+            fallback_reason='llm_failed' if fallback else None,
+            success=not fallback,
+        ))
+    return interactions
+
+
+def new_monitor(cls, window_size: int, metrics_dir: Path) -> MonitoringSystem:
+    monitor = cls(metrics_file=str(metrics_dir / f"{cls.__name__}.json"), window_size=window_size)
+    monitor._save_metrics = lambda: None
+    return monitor
+
+
+def scanned_rates(monitor: MonitoringSystem) -> Dict[str, float]:
+    """Raten per vollständigem Scan (Referenz für die inkrementellen Zähler)"""
+    window = monitor.interactions
+    return {
+        'keywords_found_rate': sum(1 for i in window if i.keywords_found) / len(window) * 100,
+        'fallback_rate': sum(1 for i in window if i.fallback_used) / len(window) * 100,
+        'validation_failure_rate': sum(1 for i in window if i.validation_issues) / len(window) * 100,
+    }
+
+
+def bench_window(window_size: int, calls: int, rescan_calls: int, metrics_dir: Path) -> Dict:
+    prefill = make_interactions(window_size, seed=window_size)
+    measured = make_interactions(calls, seed=window_size + 1)
+
+    incremental = new_monitor(MonitoringSystem, window_size, metrics_dir)
+    for log_entry in prefill:
+        incremental.log_interaction(log_entry)
+    incremental_ms = time_calls(incremental.log_interaction, measured)
+
+    # Alte Variante: Fenster direkt füllen (sonst O(N²) schon beim Vorbereiten)
+    rescan = new_monitor(RescanMonitoring, window_size, metrics_dir)
+    rescan.interactions.extend(prefill)
+    rescan_ms = time_calls(rescan.log_interaction, measured[:rescan_calls])
+
+    expected = scanned_rates(incremental)
+    max_error = max(abs(incremental.metrics[key] - value) for key, value in expected.items())
+
+    return {
+        'window_size': window_size,
+        'incremental_us': {k: round(v * 1000, 2) for k, v in percentiles(incremental_ms).items() if k != 'count'},
+        'rescan_us': {k: round(v * 1000, 2) for k, v in percentiles(rescan_ms).items() if k != 'count'},
+        'incremental_calls': calls,
+        'rescan_calls': len(rescan_ms),
+        'max_rate_error': max_error,
+        'rates_match': max_error < 1e-6,
+    }
+
+
+def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [
+            bench_window(size, args.calls, args.rescan_calls, Path(tmp))
+            for size in args.windows
+        ]
+
+    rows = [
+        {
+            'window': r['window_size'],
+            'incremental_p50_us': r['incremental_us']['p50'],
+            'incremental_p99_us': r['incremental_us']['p99'],
+            'rescan_p50_us': r['rescan_us']['p50'],
+            'speedup': round(r['rescan_us']['p50'] / r['incremental_us']['p50'], 1)
+            if r['incremental_us']['p50'] else '-',
+            'rates_match': r['rates_match'],
+        }
+        for r in results
+    ]
+    print_table(rows, list(rows[0]))
+
+    write_results(args.json, 'monitoring', {'windows': results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark: log_interaction inkrementell vs. Scan über das Fenster")
+    parser.add_argument('--windows', type=int, nargs='+', default=WINDOW_SIZES)
+    parser.add_argument('--calls', type=int, default=10_000, help="Gemessene Aufrufe (inkrementell)")
+    parser.add_argument('--rescan-calls', type=int, default=100, help="Gemessene Aufrufe (Scan, langsam)")
+    parser.add_argument('--json', default=None)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)  # Alerts des Testverkehrs nicht ausgeben
+    main(args)
@@ -0,0 +1,134 @@
+"""
+Borgo-Bot Benchmarks - Startzeit und Speicher der Bot-Instanzen
+
+Startet die drei Bots wie multi_bot_signal_loop (DEV, TEST, Community-Test)
+und misst Initialisierungszeit und RSS-Zuwachs:
+- isolated:   jeder Bot parst die YAML und baut sein eigenes Lexikon
+              (Verhalten ohne KB-Registry), ohne Binär-Cache
+- shared:     ein eingefrorener KB-Snapshot pro yaml_path für alle Bots,
+              ohne Binär-Cache
+- cold_cache: shared, Binär-Cache leer (erster Start nach KB-Änderung)
+- warm_cache: shared, Lexikon aus dem Binär-Cache (kb_cache.py)
+
+Jede Messung läuft in einem frischen Python-Prozess (saubere RSS-Werte).
+
+Usage (aus dem Repo-Root):
+    python -m benchmarks.bench_startup --runs 5 --json bench_startup.json
+"""
+
+import sys
+import json
+import shutil
+import tempfile
+import time
+import logging
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List
+
+from benchmarks.bench_utils import print_table, write_results
+
+MODES = ('isolated', 'shared', 'cold_cache', 'warm_cache')
+
+
+def measure_child(mode: str, cache_dir: str) -> Dict:
+    """Läuft im Kind-Prozess: drei Bots starten, Zeit und RSS messen"""
+    logging.disable(logging.CRITICAL)
+
+    import lexicon
+    import kb_cache
+    kb_cache.KB_BINARY_CACHE = mode.endswith('_cache')
+    kb_cache.KB_CACHE_DIR = cache_dir
+
+    from monitoring import process_rss_mb
+    from borgo_bot_multi import (
+        BorgoBotInstance, DEV_BOT_CONFIG, TEST_BOT_CONFIG, COMMUNITY_TEST_BOT_CONFIG
+    )
+
+    rss_before = process_rss_mb()
+    start = time.perf_counter()
+    bots = []
+    for config in (DEV_BOT_CONFIG, TEST_BOT_CONFIG, COMMUNITY_TEST_BOT_CONFIG):
+        if mode == 'isolated':
+            lexicon._shared_sources.clear()
+        bots.append(BorgoBotInstance(config))
+    init_ms = (time.perf_counter() - start) * 1000
+    rss_after = process_rss_mb()
+
+    return {
+        'init_ms': round(init_ms, 1),
+        'rss_mb': rss_after,
+        'rss_delta_mb': round(rss_after - rss_before, 1) if rss_before and rss_after else None,
+        'distinct_lexicons': len({id(bot.lexicon.current) for bot in bots}),
+        # Parsen + Lexikon-Bau bzw. Laden aus dem Cache, alle Snapshots
+        'kb_load_ms': round(sum({id(bot.lexicon): bot.lexicon.load_ms for bot in bots}.values()), 1),
+    }
+
+
+def run_child(mode: str, cache_dir: str) -> Dict:
+    output = subprocess.check_output(
+        [sys.executable, '-m', 'benchmarks.bench_startup', '--child', mode, '--cache-dir', cache_dir],
+        text=True
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_mode(mode: str, runs: int) -> Dict:
+    samples: List[Dict] = []
+    for _ in range(runs):
+        cache_dir = tempfile.mkdtemp(prefix='kb_cache_')
+        try:
+            if mode == 'warm_cache':
+                run_child('cold_cache', cache_dir)     # Cache befüllen
+            samples.append(run_child(mode, cache_dir))
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def median(key: str):
+        values = [s[key] for s in samples if s[key] is not None]
+        return round(statistics.median(values), 1) if values else None
+
+    return {
+        'runs': runs,
+        'init_ms_median': median('init_ms'),
+        'kb_load_ms_median': median('kb_load_ms'),
+        'rss_delta_mb_median': median('rss_delta_mb'),
+        'rss_mb_median': median('rss_mb'),
+        'distinct_lexicons': samples[0]['distinct_lexicons'],
+        'samples': samples,
+    }
+
+
+def main(args: argparse.Namespace):
+    results = {mode: run_mode(mode, args.runs) for mode in MODES}
+
+    rows = [
+        {
+            'mode': mode,
+            'lexicons': r['distinct_lexicons'],
+            'init_ms': r['init_ms_median'],
+            'kb_load_ms': r['kb_load_ms_median'],
+            'rss_delta_mb': r['rss_delta_mb_median'],
+            'rss_mb': r['rss_mb_median'],
+        }
+        for mode, r in results.items()
+    ]
+    print(f"3 bot instances, median of {args.runs} runs (fresh process each)\n")
+    print_table(rows, list(rows[0]))
+
+    write_results(args.json, 'startup', results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark: Startzeit und RSS der drei Bot-Instanzen")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', default=None)
+    parser.add_argument('--child', choices=MODES, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--cache-dir', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_child(args.child, args.cache_dir)))
+    else:
+        main(args)
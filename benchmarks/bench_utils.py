@@ -0,0 +1,83 @@
+"""
+Borgo-Bot Benchmarks - Gemeinsame Hilfsfunktionen
+Timing, Perzentile und maschinenlesbare Ergebnisse
+"""
+
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    """p50/p90/p99/max einer Messreihe (Millisekunden)"""
+    if not samples_ms:
+        return {'count': 0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0, 'mean': 0.0}
+
+    ordered = sorted(samples_ms)
+
+    def pick(q: float) -> float:
+        index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+        return round(ordered[index], 4)
+
+    return {
+        'count': len(ordered),
+        'p50': pick(0.50),
+        'p90': pick(0.90),
+        'p99': pick(0.99),
+        'max': round(ordered[-1], 4),
+        'mean': round(sum(ordered) / len(ordered), 4),
+    }
+
+
+def time_calls(func: Callable, args_list: List, repeat: int = 1) -> List[float]:
+    """Misst func(arg) für jedes Argument (Millisekunden pro Aufruf)"""
+    samples = []
+    for _ in range(repeat):
+        for arg in args_list:
+            start = time.perf_counter()
+            func(arg)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def git_revision() -> Optional[str]:
+    """Aktueller Commit (für Vergleiche zwischen Commits)"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def write_results(path: Optional[str], name: str, results: Dict):
+    """Schreibt Benchmark-Ergebnisse als JSON (wenn path gesetzt)"""
+    if not path:
+        return
+
+    data = {
+        'benchmark': name,
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'timestamp': datetime.now().isoformat(),
+        'results': results,
+    }
+    Path(path).write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f"\n💾 Results written to {path}")
+
+
+def print_table(rows: List[Dict], columns: List[str]):
+    """Einfache Textausgabe einer Ergebnistabelle"""
+    widths = {
+        col: max(len(col), *(len(str(row.get(col, ''))) for row in rows))
+        for col in columns
+    }
+    print("  ".join(col.ljust(widths[col]) for col in columns))
+    print("  ".join("-" * widths[col] for col in columns))
+    for row in rows:
+        print("  ".join(str(row.get(col, '')).ljust(widths[col]) for col in columns))
@@ -0,0 +1,164 @@
+"""
+Borgo-Bot Benchmarks - Synthetische Knowledge Base
+Erzeugt deterministisch KBs im Format von borgo_knowledge_base.yaml
+(Name, Kategorie, Synonyme, Antwort) in beliebiger Größe
+"""
+
+import random
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+SYLLABLES = [
+    'ba', 'be', 'bo', 'da', 'de', 'fa', 'fe', 'ga', 'ge', 'ha', 'he', 'ka',
+    'ke', 'la', 'le', 'li', 'lo', 'ma', 'me', 'mi', 'na', 'ne', 'no', 'pa',
+    'pe', 'ra', 're', 'ri', 'ro', 'sa', 'se', 'si', 'ta', 'te', 'to', 'wa',
+    'we', 'za', 'ze', 'ung', 'er', 'en', 'el', 'sch', 'ch', 'st', 'ei', 'au',
+]
+
+CATEGORIES = ['basics', 'facilities', 'safety', 'rules', 'contact', 'services', 'activities']
+
+FILLER_WORDS = [
+    'bitte', 'immer', 'der', 'die', 'das', 'im', 'am', 'nach', 'vor', 'mit',
+    'Borgo', 'Haus', 'Gäste', 'Onsite-Gruppe', 'kontaktieren', 'beachten',
+    'sauber', 'Ordnung', 'Schlüssel', 'Küche', 'Garten', 'Abend', 'Morgen',
+]
+
+QUESTION_TEMPLATES = [
+    "Wie funktioniert {term}?",
+    "Wo finde ich {term}?",
+    "Gibt es {term} im Borgo?",
+    "Was muss ich bei {term} beachten?",
+    "{term}?",
+    "Hallo, kurze Frage zu {term} und {other}",
+]
+
+
+def load_kb(path: Path) -> Dict:
+    """Lädt eine echte Knowledge Base (z.B. als Basis für synthetische)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+def _word(rng: random.Random, min_syllables: int = 2, max_syllables: int = 4) -> str:
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(min_syllables, max_syllables)))
+
+
+def generate_kb(
+    n_entries: int,
+    seed: int = 0,
+    base_kb: Optional[Dict] = None,
+    synonyms_per_entry: int = 5,
+    answer_words: int = 60
+) -> Dict:
+    """
+    Erzeugt eine KB mit n_entries Einträgen
+
+    Args:
+        n_entries: Zielgröße (inkl. Einträgen aus base_kb)
+        seed: Seed für Reproduzierbarkeit
+        base_kb: Echte Einträge, die übernommen werden (z.B. die Borgo-KB)
+        synonyms_per_entry: Synonyme pro synthetischem Eintrag
+        answer_words: Wörter pro synthetischer Antwort
+    """
+    rng = random.Random(seed)
+    kb = dict(list((base_kb or {}).items())[:n_entries])
+    used = {name.lower() for name in kb}
+
+    while len(kb) < n_entries:
+        name = _word(rng)
+        if name in used:
+            continue
+        used.add(name)
+
+        synonyms = []
+        while len(synonyms) < synonyms_per_entry:
+            synonym = _word(rng, 2, 3)
+            if synonym not in used:
+                used.add(synonym)
+                synonyms.append(synonym)
+
+        vocabulary = [name] + synonyms + FILLER_WORDS
+        answer = ' '.join(rng.choice(vocabulary) for _ in range(answer_words))
+
+        kb[name] = {
+            'category': rng.choice(CATEGORIES),
+            'priority': rng.choice(['high', 'medium', 'low']),
+            'synonyms': synonyms,
+            'answer': f"{name.capitalize()}:\n\n{answer}\n",
+        }
+
+    return kb
+
+
+def kb_terms(kb: Dict) -> List[str]:
+    """Alle Entry-Namen und Synonyme (lowercase)"""
+    terms = []
+    for name, data in kb.items():
+        terms.append(str(name).lower())
+        terms.extend(str(s).lower() for s in data.get('synonyms', []) or [])
+    return terms
+
+
+def generate_labeled_queries(
+    kb: Dict,
+    n_queries: int,
+    seed: int = 0,
+    miss_rate: float = 0.2
+) -> List[Tuple[str, List[str]]]:
+    """
+    Erzeugt Gäste-Fragen mit KB-Begriffen und den erwarteten Entries
+
+    Returns:
+        Liste (Frage, erwartete Entry-Namen); Fragen ohne KB-Begriff
+        (Anteil miss_rate) erwarten keinen Entry
+    """
+    rng = random.Random(seed)
+    term_entries = {}
+    for name, data in kb.items():
+        for term in [name] + list(data.get('synonyms', []) or []):
+            term_entries.setdefault(str(term).lower(), str(name))
+    terms = list(term_entries)
+    labeled = []
+
+    for _ in range(n_queries):
+        template = rng.choice(QUESTION_TEMPLATES)
+        if rng.random() < miss_rate:
+            term, other = _word(rng, 3, 5), _word(rng, 3, 5)
+            expected = []
+        else:
+            term, other = rng.choice(terms), rng.choice(terms)
+            used = [term, other] if '{other}' in template else [term]
+            expected = sorted({term_entries[t] for t in used})
+        labeled.append((template.format(term=term, other=other), expected))
+
+    return labeled
+
+
+def generate_queries(kb: Dict, n_queries: int, seed: int = 0, miss_rate: float = 0.2) -> List[str]:
+    """
+    Erzeugt Gäste-Fragen mit KB-Begriffen (und einem Anteil ohne Treffer)
+    """
+    return [query for query, _ in generate_labeled_queries(kb, n_queries, seed, miss_rate)]
+
+
+def write_kb(kb: Dict, path: Path):
+    """Speichert eine synthetische KB als YAML"""
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(kb, f, allow_unicode=True, sort_keys=False)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Synthetische Knowledge Base erzeugen")
+    parser.add_argument('entries', type=int)
+    parser.add_argument('output')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--base', default='borgo_knowledge_base.yaml')
+    args = parser.parse_args()
+
+    base = load_kb(Path(args.base)) if args.base else None
+    write_kb(generate_kb(args.entries, seed=args.seed, base_kb=base), Path(args.output))
+    print(f"✅ {args.entries} entries written to {args.output}")
@@ -0,0 +1,258 @@
+"""
+Borgo-Bot - BM25-Index über KB-Antworten
+Ranking-Stufe, wenn die Keyword-Extraktion schwach ist
+
+Fragen, die Wörter aus dem Antworttext verwenden, aber nicht den Namen oder
+ein Synonym des Entries ("Wo ist der Router?" -> wlan), landeten bisher im
+generischen Fallback-Context. Der invertierte Index über Antworttext,
+Synonyme und Entry-Namen wird beim Laden der KB gebaut; eine Suche kostet nur
+die Posting-Listen der Query-Tokens (Mikrosekunden).
+
+Bei KB-Änderungen werden nur geänderte Entries neu tokenisiert
+(derive()); unveränderte Entries übernehmen ihre Term-Frequenzen.
+"""
+
+import math
+import re
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from compound_index import fold, stem
+
+logger = logging.getLogger(__name__)
+
+# BM25-Parameter (Standardwerte)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r'\w{3,}')
+
+# Häufige Wörter ohne Aussagekraft (DE/IT/EN), gefaltet
+STOPWORDS = frozenset(fold(word) for word in """
+    der die das den dem des ein eine einen einem einer eines und oder aber
+    ist sind war waren wird werden wurde kann können konnte muss müssen soll
+    sollen darf dürfen gibt gibt's habe haben hat hatte ich wir ihr sie man
+    mit von für auf aus bei nach vor über unter zum zur wie was wann warum
+    wer wieso weshalb welche welcher welches noch auch nur schon sehr mehr
+    nicht kein keine bitte danke hallo hier dort dann wenn weil dass als
+    the and for are was were can you how what where when why who with
+    che per con una sono come dove quando perché della delle degli
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Text -> gefaltete, gestemmte Tokens ohne Stopwörter"""
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text.lower()):
+        folded = fold(word)
+        if folded not in STOPWORDS and not folded.isdigit():
+            tokens.append(stem(folded))
+    return tokens
+
+
+class BM25Index:
+    """
+    Invertierter Index mit Okapi-BM25-Scoring
+
+    Dokumente (KB-Entries) können einzeln hinzugefügt, ersetzt und entfernt
+    werden; IDF und durchschnittliche Länge ergeben sich aus dem aktuellen
+    Zustand.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}     # Term -> {Doc: tf}
+        self._doc_terms: Dict[str, Counter] = {}           # Doc -> Term-Frequenzen
+        self._doc_texts: Dict[str, str] = {}               # Doc -> indizierter Text
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    @classmethod
+    def from_documents(cls, documents: Mapping[str, str], **params) -> 'BM25Index':
+        index = cls(**params)
+        for doc_id, text in documents.items():
+            index.add(doc_id, text)
+        logger.debug(f"BM25 index built: {len(index)} documents, {len(index._postings)} terms")
+        return index
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    @property
+    def average_length(self) -> float:
+        return self._total_length / len(self._doc_terms) if self._doc_terms else 0.0
+
+    def add(self, doc_id: str, text: str, terms: Optional[Counter] = None):
+        """Fügt ein Dokument hinzu (ersetzt ein bestehendes gleicher ID)"""
+        if doc_id in self._doc_terms:
+            self.remove(doc_id)
+
+        terms = terms if terms is not None else Counter(tokenize(text))
+        self._doc_terms[doc_id] = terms
+        self._doc_texts[doc_id] = text
+        length = sum(terms.values())
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id: str):
+        """Entfernt ein Dokument (no-op wenn unbekannt)"""
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+
+        del self._doc_texts[doc_id]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in terms:
+            docs = self._postings[term]
+            del docs[doc_id]
+            if not docs:
+                del self._postings[term]
+
+    def derive(self, documents: Mapping[str, str]) -> 'BM25Index':
+        """
+        Neuer Index für einen geänderten Dokumentbestand
+
+        Der bestehende Index bleibt unverändert (wird evtl. noch gelesen).
+        Nur neue oder geänderte Dokumente werden tokenisiert.
+
+        Returns:
+            Neuer BM25Index
+        """
+        index = BM25Index(self.k1, self.b)
+        reused = 0
+        for doc_id, text in documents.items():
+            if self._doc_texts.get(doc_id) == text:
+                index.add(doc_id, text, terms=self._doc_terms[doc_id])
+                reused += 1
+            else:
+                index.add(doc_id, text)
+
+        logger.debug(
+            f"BM25 index derived: {reused} documents reused, "
+            f"{len(documents) - reused} (re)tokenized, "
+            f"{len(set(self._doc_texts) - set(documents))} removed"
+        )
+        return index
+
+    def search(self, query: str, top_k: int = 3, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """
+        Beste Dokumente für eine Query
+
+        Returns:
+            Liste (doc_id, score), bester zuerst
+        """
+        terms = set(tokenize(query))
+        if not terms or not self._doc_terms:
+            return []
+
+        n_docs = len(self._doc_terms)
+        avg_length = self.average_length or 1.0
+        k1, b = self.k1, self.b
+
+        scores: Dict[str, float] = {}
+        for term in terms:
+            docs = self._postings.get(term)
+            if not docs:
+                continue
+
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = k1 * (1 - b + b * self._doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        ranked = sorted(
+            ((doc_id, score) for doc_id, score in scores.items() if score >= min_score),
+            key=lambda item: (-item[1], item[0])
+        )
+        return ranked[:top_k]
+
+    def score_documents(self, terms: Iterable[str], doc_ids: Iterable[str]) -> Dict[str, float]:
+        """
+        BM25-Scores ausgewählter Dokumente für bereits tokenisierte Query-Terms
+
+        Returns:
+            doc_id -> Score (nur Dokumente mit Score > 0)
+        """
+        n_docs = len(self._doc_terms)
+        avg_length = self.average_length or 1.0
+        k1, b = self.k1, self.b
+        idfs = {}
+        for term in set(terms):
+            docs = self._postings.get(term)
+            if docs:
+                idfs[term] = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+
+        scores: Dict[str, float] = {}
+        for doc_id in doc_ids:
+            doc_terms = self._doc_terms.get(doc_id)
+            if not doc_terms:
+                continue
+            norm = k1 * (1 - b + b * self._doc_lengths[doc_id] / avg_length)
+            score = sum(
+                idf * doc_terms[term] * (k1 + 1) / (doc_terms[term] + norm)
+                for term, idf in idfs.items()
+                if term in doc_terms
+            )
+            if score > 0:
+                scores[doc_id] = score
+        return scores
+
+
+def entry_document(entry_name: str, entry_data: Dict) -> str:
+    """Indizierter Text eines KB-Entries: Name, Synonyme, Antwort"""
+    synonyms = entry_data.get('synonyms') or []
+    return '\n'.join([
+        str(entry_name).replace('_', ' '),
+        ' '.join(str(s) for s in synonyms),
+        str(entry_data.get('answer') or ''),
+    ])
+
+
+def knowledge_base_documents(knowledge_base: Mapping[str, Dict]) -> Dict[str, str]:
+    """Entry-Name -> indizierter Text für alle Entries"""
+    return {
+        entry_name: entry_document(entry_name, entry_data if isinstance(entry_data, Mapping) else {})
+        for entry_name, entry_data in knowledge_base.items()
+    }
+
+
+def test_bm25_index(queries: Optional[Iterable[str]] = None):
+    """Selbsttest gegen die echte Knowledge Base"""
+    import time
+    from lexicon import load_knowledge_base
+    from config_multi_bot import YAML_DB_PATH
+
+    kb = load_knowledge_base(YAML_DB_PATH)
+    start = time.perf_counter()
+    index = BM25Index.from_documents(knowledge_base_documents(kb))
+    build_ms = (time.perf_counter() - start) * 1000
+
+    queries = list(queries or [
+        "Wo ist der Router?",
+        "Wie heiß muss das Feuer sein?",
+        "Wo kann ich Brot kaufen?",
+        "Wann wird der Biomüll abgeholt?",
+        "Wie viele Leute passen ins Haus?",
+        "Darf die Katze rein?",
+        "Blablabla nonsense",
+    ])
+
+    print("=" * 70)
+    print(f"BM25 INDEX TESTS ({len(index)} entries, build {build_ms:.1f} ms)")
+    print("=" * 70)
+    for query in queries:
+        start = time.perf_counter()
+        results = index.search(query, top_k=3)
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        ranked = ', '.join(f"{doc} ({score:.2f})" for doc, score in results) or '-'
+        print(f"  {query:40} {elapsed_us:7.1f} µs  -> {ranked}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    test_bm25_index()
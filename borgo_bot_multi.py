@@ -4,10 +4,11 @@ DREI logisch getrennte Bots in EINER Instanz
 Strikte Isolation basierend auf Signal group_id
 """
 
+import time
 import asyncio
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 # Multi-Bot Config
 from config_multi_bot import (
@@ -22,20 +23,28 @@ from config_multi_bot import (
     get_bot_name_for_group,
     is_allowed_group,
     LOG_FILE,
+    MAX_LLM_RETRIES,
+    LLM_TIMEOUT_SECONDS,
+    RESPONSE_BUDGET_SECONDS,
+    SIGNAL_SEND_TIMEOUT_SECONDS,
+    SIGNAL_SEND_MIN_TIMEOUT_SECONDS,
+    KEYWORD_CACHE_SIZE,
+    BM25_WEAK_CONFIDENCE,
+    KB_HOT_RELOAD,
+    METRICS_FILE,
+    METRICS_HTTP_ENABLED,
+    INTERACTION_STORE_ENABLED,
 )
 
 from signal_interface import SignalInterface
 from message_deduplication import MessageDeduplicator
+from deadline import Deadline
+from spans import span
+from token_counter import fits_context_of
+from logging_setup import setup_logging
 
-# Logging Setup
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s | %(levelname)-8s | %(name)s | %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
+# Logging Setup (Queue + Hintergrund-Thread, Rotation, Sampling)
+setup_logging(LOG_FILE)
 logger = logging.getLogger(__name__)
 
 
@@ -61,15 +70,24 @@ class BorgoBotInstance:
         from llm_handler import LLMHandler, ResponseFormatter
         from fallback_system import FallbackSystem, ResponseQualityChecker
         from monitoring import MonitoringSystem
+        from lexicon import get_lexicon_source
         
         # Komponenten mit bot-spezifischer Config initialisieren
         self.input_validator = InputValidator()
         self.quick_responder = QuickResponder()
-        self.context_manager = ContextManager(Path(config['yaml_path']))
+        
+        # Ein Lexikon pro YAML - geteilt von allen Komponenten und Bots
+        self.lexicon = get_lexicon_source(Path(config['yaml_path']))
+        self.context_manager = ContextManager(
+            Path(config['yaml_path']),
+            lexicon=self.lexicon,
+            passage_retrieval=config['features'].get('passage_retrieval', True)
+        )
         self.keyword_extractor = KeywordExtractor(
-            self.context_manager.get_available_keywords()
+            lexicon=self.lexicon,
+            cache_size=KEYWORD_CACHE_SIZE if config['features'].get('keyword_cache', True) else 0
         )
-        self.category_matcher = CategoryMatcher()
+        self.category_matcher = CategoryMatcher(lexicon=self.lexicon)
         
         # LLM Handler mit bot-spezifischen Modellen
         self.llm_handler = LLMHandler(
@@ -78,22 +96,44 @@ class BorgoBotInstance:
         # Setze bot-spezifische Modelle
         self.llm_handler.models = config['llm_models']
         self.llm_handler.primary_model = config['primary_model']
+        self.llm_handler.timeout_seconds = config.get('llm_timeout_seconds', LLM_TIMEOUT_SECONDS)
+        self.max_llm_retries = config.get('max_llm_retries', MAX_LLM_RETRIES)
+        
+        # Context für das Primärmodell; kleinere Fallback-Modelle bekommen einen gekürzten
+        self.context_model = self.llm_handler.models[0] if self.llm_handler.models else None
+        
+        # Gesamtbudget pro Nachricht (Deadline Propagation)
+        self.response_budget_seconds = config.get('response_budget_seconds', RESPONSE_BUDGET_SECONDS)
         
         self.response_formatter = ResponseFormatter()
-        self.fallback_system = FallbackSystem()
+        self.fallback_system = FallbackSystem(lexicon=self.lexicon)
         self.quality_checker = ResponseQualityChecker()
-        self.monitoring = MonitoringSystem()
+        self.monitoring = MonitoringSystem(metrics_file=config.get('metrics_file', METRICS_FILE))
         self.context_validator = ContextValidator()
         
         # Features aus Config laden
         self.features = config['features']
         
+        # Nachrichten in Bearbeitung (Gauge für den Metrik-Endpoint)
+        self.in_flight = 0
+        
         logger.info(f"✅ {self.name} initialized")
     
-    async def process_message(self, message: str, user_id: Optional[str] = None):
+    async def process_message(
+        self,
+        message: str,
+        user_id: Optional[str] = None,
+        deadline: Optional[Deadline] = None
+    ):
         """
         Verarbeitet Message mit bot-spezifischer Logik
         
+        Args:
+            message: Eingehende Nachricht
+            user_id: Sender (optional)
+            deadline: Zeitbudget ab Eintreffen der Nachricht
+                      (wird erstellt, falls nicht übergeben)
+        
         Returns:
             (response, success)
         """
@@ -102,6 +142,8 @@ class BorgoBotInstance:
         from fallback_system import FallbackReason
         
         start_time = datetime.now()
+        if deadline is None:
+            deadline = Deadline(self.response_budget_seconds)
         logger.info(f"📨 [{self.name}] Processing: '{message[:50]}...'")
         
         log_entry = InteractionLog(
@@ -118,71 +160,96 @@ class BorgoBotInstance:
             validation_issues=[],
             fallback_used=False,
             fallback_reason=None,
-            success=False
+            success=False,
+            budget_misses=deadline.missed_phases  # sammelt bis _finalize_log mit
         )
         
+        llm_budget_exhausted = False
+        timings = log_entry.phase_timings_ms
+        
         try:
-            # PHASE 1: Input Validation
-            if self.features['input_validation']:
-                cleaned_message, error = self.input_validator.validate(message)
-                
-                if error:
-                    logger.warning(f"❌ Input validation failed: {error}")
-                    log_entry.fallback_used = True
-                    log_entry.fallback_reason = 'invalid_input'
-                    self._finalize_log(log_entry, error, start_time)
-                    return error, False
-                
-                quick_response = self.quick_responder.get_quick_response(cleaned_message)
-                if quick_response:
-                    logger.info("⚡ Quick response triggered")
-                    log_entry.success = True
-                    self._finalize_log(log_entry, quick_response, start_time)
-                    return quick_response, True
-                
-                message = cleaned_message
-            
-            # PHASE 1.5: Meta-Query Check
-            from config_multi_bot import is_meta_query, FALLBACK_RESPONSES
-            if is_meta_query(message):
-                logger.info(f"🎭 Meta-query detected: {message[:50]}")
-                response = FALLBACK_RESPONSES['meta_query']
-                log_entry.success = True
-                log_entry.fallback_used = True
-                log_entry.fallback_reason = 'meta_query'
-                self._finalize_log(log_entry, response, start_time)
-                return response, True
+            # PHASE 1: Input Validation + Meta-Query Check
+            with span(timings, 'validation'):
+                message, early_response = self._validate_input(message, log_entry)
+            if early_response is not None:
+                self._finalize_log(log_entry, early_response[0], start_time)
+                return early_response
             
             # PHASE 2: Keyword Extraction
-            if self.features['keyword_confidence_scoring']:
-                extraction = self.keyword_extractor.extract(message)
-                keywords = self.keyword_extractor.get_best_keywords(extraction, max_keywords=3)
-                
-                log_entry.keywords_found = keywords
-                log_entry.keywords_confidence = extraction['confidence_level']
+            if not deadline.check('extraction'):
+                return self._budget_fallback(log_entry, message, start_time)
+            
+            with span(timings, 'extraction'):
+                if self.features['keyword_confidence_scoring']:
+                    extraction = self.keyword_extractor.extract(message)
+                    keywords = self.keyword_extractor.get_best_keywords(extraction, max_keywords=3)
+                    
+                    log_entry.keywords_found = keywords
+                    log_entry.keywords_confidence = extraction['confidence_level']
+                    
+                    logger.info(f"🔍 Keywords: {keywords} (confidence: {extraction['confidence_level']})",
+                                extra={'sample': 'keywords'})
+                else:
+                    keywords = []
                 
-                logger.info(f"🔍 Keywords: {keywords} (confidence: {extraction['confidence_level']})")
-            else:
-                keywords = []
+                # PHASE 2.5: BM25-Ranking über Antworttexte bei schwacher Extraktion
+                if (self.features.get('bm25_retrieval', False)
+                        and log_entry.keywords_confidence in BM25_WEAK_CONFIDENCE):
+                    retrieved = self.context_manager.rank_entries(message)
+                    log_entry.retrieved_entries = retrieved
+                    # Nur ohne Keywords übernehmen: einen Fuzzy-Treffer ("Heitzung" -> heizung)
+                    # nicht blind um fremde Entries ergänzen (Ranking bleibt im Log zum Abgleich)
+                    if not keywords:
+                        keywords = retrieved[:3]
+                        log_entry.keywords_found = keywords
             
             # PHASE 3: Context Building
-            if keywords and self.features['context_isolation']:
-                context, context_meta = self.context_manager.build_context(keywords, message)
-                log_entry.context_entries = context_meta['total_entries']
-                log_entry.context_words = context_meta['total_words']
-            elif not keywords:
-                category = self.category_matcher.find_category(message)
-                context = self.context_manager.get_fallback_context(category)
-                logger.info(f"📁 Using fallback context (category: {category})")
-            else:
-                context = None
+            if not deadline.check('context'):
+                return self._budget_fallback(log_entry, message, start_time)
+            
+            context_for_model = None
+            with span(timings, 'context'):
+                if keywords and self.features['context_isolation']:
+                    context, context_meta = self.context_manager.build_context(
+                        keywords, message, model=self.context_model
+                    )
+                    
+                    def context_for_model(model: str, primary_context: str = context) -> str:
+                        # Erst beim Fallback auf ein Modell mit kleinerem Budget neu kürzen (gemerkt)
+                        if fits_context_of(model, self.context_model):
+                            return primary_context
+                        return self.context_manager.build_context(keywords, message, model=model)[0]
+                    log_entry.context_entries = context_meta['total_entries']
+                    log_entry.context_words = context_meta['total_words']
+                    log_entry.context_tokens = context_meta['total_tokens']
+                elif not keywords:
+                    # Kategorie nur übernehmen, wenn ihr Score die Schwelle erreicht
+                    category, ranked = self.category_matcher.match_category(message)
+                    context = self.context_manager.get_fallback_context(category)
+                    logger.info(
+                        f"📁 Using fallback context (category: {category}, "
+                        f"scores: {[(c, round(score, 2)) for c, score in ranked]})",
+                        extra={'sample': 'context'}
+                    )
+                else:
+                    context = None
             
             # PHASE 4: LLM Generation
             if context and self.features['multi_model_fallback']:
-                response, llm_meta = await self.llm_handler.generate_response(message, context)
+                with span(timings, 'llm'):
+                    response, llm_meta = await self.llm_handler.generate_response(
+                        message,
+                        context,
+                        max_retries=self.max_llm_retries,
+                        deadline=deadline,
+                        context_for_model=context_for_model
+                    )
+                timings.update(llm_meta['phase_timings_ms'])
+                log_entry.model_timings_ms = llm_meta['model_timings_ms']
                 
                 log_entry.model_used = llm_meta.get('final_model')
                 log_entry.validation_issues = llm_meta.get('validation_issues', [])
+                llm_budget_exhausted = llm_meta.get('budget_exhausted', False)
                 
                 if response:
                     if self.quality_checker.is_helpful(response, message):
@@ -202,7 +269,9 @@ class BorgoBotInstance:
             # PHASE 5: Fallback
             log_entry.fallback_used = True
             
-            if not keywords:
+            if llm_budget_exhausted:
+                reason = FallbackReason.TIMEOUT
+            elif not keywords:
                 reason = FallbackReason.NO_KEYWORDS
             elif not context:
                 reason = FallbackReason.AMBIGUOUS
@@ -233,6 +302,55 @@ class BorgoBotInstance:
             self._finalize_log(log_entry, response, start_time)
             return response, False
     
+    def _validate_input(self, message: str, log_entry) -> Tuple[str, Optional[Tuple[str, bool]]]:
+        """
+        Phase 1: Input-Validierung, Quick Responses und Meta-Queries
+        
+        Returns:
+            (bereinigte Nachricht, (response, success) oder None = weiter in der Pipeline)
+        """
+        from config_multi_bot import is_meta_query, FALLBACK_RESPONSES
+        
+        if self.features['input_validation']:
+            cleaned_message, error = self.input_validator.validate(message)
+            
+            if error:
+                logger.warning(f"❌ Input validation failed: {error}")
+                log_entry.fallback_used = True
+                log_entry.fallback_reason = 'invalid_input'
+                return message, (error, False)
+            
+            quick_response = self.quick_responder.get_quick_response(cleaned_message)
+            if quick_response:
+                logger.info("⚡ Quick response triggered")
+                log_entry.success = True
+                return cleaned_message, (quick_response, True)
+            
+            message = cleaned_message
+        
+        # Meta-Query Check
+        if is_meta_query(message):
+            logger.info(f"🎭 Meta-query detected: {message[:50]}")
+            log_entry.success = True
+            log_entry.fallback_used = True
+            log_entry.fallback_reason = 'meta_query'
+            return message, (FALLBACK_RESPONSES['meta_query'], True)
+        
+        return message, None
+    
+    def _budget_fallback(self, log_entry, message: str, start_time):
+        """Fallback wenn das Zeitbudget vor einer Phase aufgebraucht ist"""
+        from fallback_system import FallbackReason
+        
+        log_entry.fallback_used = True
+        log_entry.fallback_reason = FallbackReason.TIMEOUT.value
+        
+        response = self.fallback_system.get_fallback_response(FallbackReason.TIMEOUT, message)
+        self._finalize_log(log_entry, response, start_time)
+        
+        logger.warning(f"⏱️ [{self.name}] Budget exhausted - using timeout fallback")
+        return response, False
+    
     def _finalize_log(self, log_entry, response: str, start_time):
         """Finalisiert Log Entry"""
         from datetime import datetime
@@ -240,6 +358,9 @@ class BorgoBotInstance:
         duration = (datetime.now() - start_time).total_seconds() * 1000
         log_entry.response_time_ms = duration
         log_entry.response_length = len(response)
+        # Von deadline.missed_phases lösen: ein späterer 'send'-Miss darf den
+        # schon gezählten Eintrag nicht mehr ändern (Journal/Store serialisieren im Thread)
+        log_entry.budget_misses = list(log_entry.budget_misses)
         
         if self.features.get('detailed_logging', True):
             self.monitoring.log_interaction(log_entry)
@@ -262,11 +383,61 @@ async def multi_bot_signal_loop():
     
     # Erstelle DREI separate Bot-Instanzen
     logger.info("\n🤖 Initializing Bot Instances...")
+    from lexicon import get_registry_stats
+    from monitoring import process_rss_mb
+    init_start = time.perf_counter()
+    rss_before = process_rss_mb()
     
     dev_bot = BorgoBotInstance(DEV_BOT_CONFIG)
     test_bot = BorgoBotInstance(TEST_BOT_CONFIG)
     community_test_bot = BorgoBotInstance(COMMUNITY_TEST_BOT_CONFIG)
     
+    # Bots mit derselben yaml_path teilen einen KB-Snapshot
+    logger.info(
+        f"⏱️  Bot startup: {(time.perf_counter() - init_start) * 1000:.0f} ms, "
+        f"RSS {rss_before} -> {process_rss_mb()} MB"
+    )
+    for path, stats in get_registry_stats().items():
+        logger.info(
+            f"   📚 {Path(path).name}: {stats['entries']} entries, "
+            f"loaded in {stats['load_ms']} ms, shared by {stats['users']} bots"
+        )
+    
+    # YAML-Änderungen ohne Neustart übernehmen (ein Watcher pro KB-Snapshot)
+    watchers = []
+    if KB_HOT_RELOAD:
+        from kb_watcher import KnowledgeBaseWatcher
+        from lexicon import get_shared_sources
+        for source in get_shared_sources():
+            watcher = KnowledgeBaseWatcher(source)
+            watcher.start()
+            watchers.append(watcher)
+    
+    # Metriken im Hintergrund speichern (Snapshot + Journal pro Bot)
+    from metrics_persistence import MetricsPersister
+    persisters = [
+        MetricsPersister(bot.monitoring)
+        for bot in (dev_bot, test_bot, community_test_bot)
+    ]
+    for persister in persisters:
+        persister.start()
+    
+    # Interaction-Historie in SQLite (eine DB für alle Bots)
+    store = None
+    if INTERACTION_STORE_ENABLED:
+        from interaction_store import InteractionStore
+        store = InteractionStore()
+        for bot in (dev_bot, test_bot, community_test_bot):
+            store.attach(bot.monitoring, bot.name)
+        store.start()
+    
+    # Prometheus-Endpoint (GET /metrics, nur lokal)
+    metrics_server = None
+    if METRICS_HTTP_ENABLED:
+        from metrics_exporter import MetricsServer
+        metrics_server = MetricsServer([dev_bot, test_bot, community_test_bot], watchers=watchers)
+        await metrics_server.start()
+    
     logger.info("\n📋 Bot → Group Mapping:")
     logger.info(f"   {dev_bot.name:20} → DEV Group")
     logger.info(f"   {test_bot.name:20} → TEST Group")
@@ -308,21 +479,52 @@ async def multi_bot_signal_loop():
             logger.error(f"❌ Unknown group_id: {group_id} - This should never happen!")
             return
         
+        # Zeitbudget startet mit dem Eintreffen der Nachricht
+        deadline = Deadline(bot.response_budget_seconds)
+        
         # Verarbeite Message mit gewähltem Bot
+        bot.in_flight += 1
         try:
-            response, success = await bot.process_message(text, sender)
+            response, success = await bot.process_message(text, sender, deadline=deadline)
+            
+            # Senden wird immer versucht - notfalls mit Mindest-Timeout
+            if not deadline.check('send'):
+                bot.monitoring.record_budget_miss('send')
+            send_timeout = deadline.timeout_for(
+                SIGNAL_SEND_TIMEOUT_SECONDS,
+                floor_seconds=SIGNAL_SEND_MIN_TIMEOUT_SECONDS
+            )
             
             # KRITISCH: Sende Antwort NUR an ursprüngliche Gruppe!
-            await si.send(response, group_id=group_id)
+            send_timings = {}
+            await si.send(response, group_id=group_id, timeout=send_timeout, timings=send_timings)
+            for phase, duration_ms in send_timings.items():
+                bot.monitoring.observe_phase(phase, duration_ms / 1000)
             
             status = "✅ SUCCESS" if success else "⚠️ FALLBACK"
             logger.info(f"📤 [{bot_name}] Sent response ({status}) to group {group_id[:20]}...")
             
         except Exception as e:
             logger.error(f"❌ [{bot_name}] Error processing message: {e}", exc_info=True)
+        finally:
+            bot.in_flight -= 1
     
     # Starte Listener
-    await si.run_listener(handler)
+    try:
+        await si.run_listener(handler)
+    finally:
+        if metrics_server is not None:
+            await metrics_server.stop()
+        for watcher in watchers:
+            await watcher.stop()
+        # Letzten Stand schreiben
+        for persister in persisters:
+            await persister.stop()
+        if store is not None:
+            await store.stop()
+        # Geteilte HTTP-Sessions der LLMHandler schließen
+        for bot in (dev_bot, test_bot, community_test_bot):
+            await bot.llm_handler.close()
 
 
 if __name__ == "__main__":
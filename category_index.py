@@ -0,0 +1,147 @@
+"""
+Borgo-Bot - Token -> Kategorie Gewichts-Index
+Kategorie-Fallback für Fragen ohne Keyword-Treffer
+
+Bisher prüfte der CategoryMatcher feste Hinweis-Listen per Teilstring; die
+'faq'-Hinweise ('wie', 'was', 'wo') trafen fast jede Frage. Der Index wird
+beim Laden der KB aus den `category`-Feldern und dem Vokabular der Entries
+(Name, Synonyme, Antwort) gebaut:
+- Gewicht(Token, Kategorie) = Anteil der Kategorie am Token x IDF über
+  Kategorien; Tokens, die nur vereinzelt in Antworttexten stehen, zählen
+  anteilig (ANSWER_WEIGHT pro Entry)
+- Tokens wie in bm25_index (gefaltet, gestemmt, ohne Stopwörter) -
+  Fragewörter zählen also nicht
+
+Das Scoring ist ein Durchlauf über die Query-Tokens mit Dict-Lookups; die
+Scores werden zurückgegeben, damit der Aufrufer über eine Schwelle
+entscheiden kann.
+"""
+
+import math
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from bm25_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Gewicht eines Vorkommens in Entry-Name/Synonymen bzw. Hinweis-Begriffen
+TERM_WEIGHT = 1.0
+# Gewicht eines Tokens aus dem Antworttext (einmal pro Entry)
+ANSWER_WEIGHT = 0.25
+
+
+class CategoryIndex:
+    """
+    Vorberechneter Index: Token -> {Kategorie: Gewicht}
+
+    Die Gewichte eines Tokens summieren sich höchstens zu seiner IDF -
+    Tokens, die in vielen Kategorien vorkommen, tragen wenig bei.
+    """
+
+    def __init__(self, weights: Mapping[str, Mapping[str, float]], categories: Iterable[str]):
+        self._weights = {token: dict(by_category) for token, by_category in weights.items()}
+        # Reihenfolge entscheidet bei Gleichstand
+        self.categories: Tuple[str, ...] = tuple(categories)
+        self._order = {category: i for i, category in enumerate(self.categories)}
+
+    @classmethod
+    def from_knowledge_base(
+        cls,
+        knowledge_base: Mapping[str, Dict],
+        hints: Optional[Mapping[str, Iterable[str]]] = None
+    ) -> 'CategoryIndex':
+        """
+        Args:
+            knowledge_base: Entry-Name -> YAML-Daten (category, synonyms, answer)
+            hints: Zusätzliche Begriffe pro Kategorie (z.B. CATEGORY_HINTS)
+        """
+        raw: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        categories: List[str] = []
+
+        def add(category: str, text: str, weight: float, once: bool = False):
+            if category not in categories:
+                categories.append(category)
+            tokens = tokenize(text)
+            for token in (set(tokens) if once else tokens):
+                raw[token][category] += weight
+
+        for entry_name, entry_data in knowledge_base.items():
+            entry_data = entry_data if isinstance(entry_data, Mapping) else {}
+            category = entry_data.get('category')
+            if not category:
+                continue
+
+            terms = [str(entry_name).replace('_', ' ')] + [str(s) for s in entry_data.get('synonyms') or []]
+            add(category, ' '.join(terms), TERM_WEIGHT)
+            add(category, str(entry_data.get('answer') or ''), ANSWER_WEIGHT, once=True)
+
+        for category, terms in (hints or {}).items():
+            add(category, ' '.join(terms), TERM_WEIGHT)
+
+        n_categories = len(categories)
+        weights = {}
+        for token, by_category in raw.items():
+            idf = math.log(1 + n_categories / len(by_category))
+            # Volles Gewicht erst ab einem Namen/Synonym (oder mehreren Antworten)
+            total = max(sum(by_category.values()), TERM_WEIGHT)
+            weights[token] = {
+                category: weight / total * idf
+                for category, weight in by_category.items()
+            }
+
+        index = cls(weights, categories)
+        logger.debug(f"Category index built: {len(weights)} tokens, {n_categories} categories")
+        return index
+
+    def __len__(self) -> int:
+        return len(self._weights)
+
+    def score(self, query: str, top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Kategorie-Scores einer Query
+
+        Returns:
+            Liste (Kategorie, Score), bester zuerst (leer ohne bekannte Tokens)
+        """
+        scores: Dict[str, float] = defaultdict(float)
+        for token in set(tokenize(query)):
+            for category, weight in self._weights.get(token, {}).items():
+                scores[category] += weight
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self._order[item[0]]))
+        return ranked[:top_k] if top_k else ranked
+
+
+def test_category_index():
+    """Selbsttest gegen die echte Knowledge Base"""
+    import time
+    from lexicon import load_knowledge_base, CATEGORY_HINTS
+    from config_multi_bot import YAML_DB_PATH, CATEGORY_MIN_SCORE
+
+    kb = load_knowledge_base(YAML_DB_PATH)
+    start = time.perf_counter()
+    index = CategoryIndex.from_knowledge_base(kb, CATEGORY_HINTS)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    queries = [
+        "Gibt es einen Laden im Dorf?",
+        "Ist Lärm nach 22 Uhr verboten?",
+        "Wie heiß muss das Feuer sein?",
+        "Wo ist der Router?",
+        "Wie ist das Wetter morgen?",
+    ]
+
+    print("=" * 70)
+    print(f"CATEGORY INDEX TESTS ({len(index)} tokens, {len(index.categories)} categories, "
+          f"build {build_ms:.1f} ms, min score {CATEGORY_MIN_SCORE})")
+    print("=" * 70)
+    for query in queries:
+        ranked = ', '.join(f"{category} ({score:.2f})" for category, score in index.score(query, 3)) or '-'
+        print(f"  {query:40} -> {ranked}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    test_category_index()
@@ -0,0 +1,230 @@
+"""
+Borgo-Bot - Komposita- und Flexions-Index
+Löst deutsche Wortformen und Komposita auf KB-Keywords auf
+
+Gäste schreiben "Pizzaofenreinigung", "Mülltonnen" oder "Hundeleine" -
+die \\b-begrenzte Direktsuche findet darin kein KB-Keyword. Der Index wird
+einmal beim Laden der KB gebaut:
+- Umlaut-Faltung + Flexion gegen die KB-Wortformen ("Hunden" -> "hund"):
+  ein Token passt nur, wenn es selbst eine KB-Form ist, ohne eine Endung
+  eine KB-Form ergibt ("schlüssels" -> schluessel) oder eine KB-Form ohne
+  Endung ist ("schlange" -> schlangen). Zwei gekürzte Stämme werden nie
+  verglichen - sonst fielen "router" und "route" auf "rout" zusammen
+- Kompositum-Zerlegung gegen das KB-Vokabular (Bestimmungs- und Grundwort)
+
+Ein Query-Token wird per Dict-Lookup aufgelöst; die Zerlegung prüft höchstens
+len(token) Präfixe/Suffixe. Der Index ist Teil des geteilten, unveränderlichen
+Lexikons - gemerkte Token-Auflösungen und Zähler hält jeder KeywordExtractor
+selbst.
+"""
+
+import logging
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Suffixe für leichtes Stemming (längste zuerst, nur eines wird entfernt)
+GERMAN_SUFFIXES = ('ern', 'em', 'er', 'en', 'es', 'e', 'n', 's')
+# Stamm muss nach dem Stripping mindestens so lang bleiben
+MIN_STEM_LENGTH = 4
+# KB-Begriff als Kompositum-Teil: min. Länge (verhindert "gas" in "Gastgeber")
+MIN_COMPOUND_PART = 4
+# Rest des Kompositums ("leine" in "Hundeleine"): min. Länge
+MIN_COMPOUND_REST = 3
+# Reste, die kein Grundwort sind, sondern Endungen ("beach|ten", "beach|tung")
+NON_HEAD_ENDINGS = frozenset({
+    'ten', 'tet', 'tes', 'ter', 'test', 'tung', 'tungen', 'ung', 'ungen',
+    'lich', 'heit', 'keit', 'isch', 'ig', 'ige', 'igen',
+})
+# Fugenelemente zwischen Bestimmungs- und Grundwort ("Pizzaofens-", "Hunde-")
+LINKING_ELEMENTS = ('s', 'es', 'n', 'en', 'e', 'er')
+# Gemerkte Token-Auflösungen pro KeywordExtractor (wird bei Überlauf geleert)
+MAX_CACHED_TOKENS = 10000
+
+UMLAUT_FOLDING = (
+    ('ß', 'ss'),
+    ('ä', 'a'), ('ö', 'o'), ('ü', 'u'),
+    ('ae', 'a'), ('oe', 'o'), ('ue', 'u'),
+)
+
+EMPTY: FrozenSet[str] = frozenset()
+
+
+def fold(word: str) -> str:
+    """Lowercase + Umlaut-Faltung ("Müll" und "muell" -> "mull")"""
+    word = word.lower()
+    for source, target in UMLAUT_FOLDING:
+        word = word.replace(source, target)
+    return word
+
+
+def stem(word: str) -> str:
+    """
+    Leichter deutscher Stemmer (gefaltetes Wort -> Stamm)
+
+    Entfernt genau ein Flexions-Suffix, wenn der Stamm lang genug bleibt.
+    Nur für die BM25-/Kategorie-Tokenisierung (gewichtetes Ranking) - für
+    Keyword-Treffer zu grob ("router" -> "rout" <- "route"), dort gilt
+    inflection_bases gegen die KB-Formen.
+    """
+    for suffix in GERMAN_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[:-len(suffix)]
+    return word
+
+
+def inflection_bases(word: str) -> Iterator[str]:
+    """Wort ohne je eines der GERMAN_SUFFIXES (Stamm bleibt >= MIN_STEM_LENGTH)"""
+    for suffix in GERMAN_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            yield word[:-len(suffix)]
+
+
+class CompoundIndex:
+    """
+    Vorberechneter Index: KB-Wortform/Grundform -> KB-Keywords
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        # Gefaltete KB-Form -> Keywords
+        surface: Dict[str, Set[str]] = defaultdict(set)
+        # KB-Form ohne eine Endung ("schlangen" -> "schlange", "schlang") -> Keywords
+        bases: Dict[str, Set[str]] = defaultdict(set)
+
+        for keyword in set(k.lower() for k in keywords):
+            # Mehrwort-Keywords ("check-in", "pizza ofen") matcht der Direkt-Matcher
+            if not keyword.isalpha():
+                continue
+
+            folded = fold(keyword)
+            surface[folded].add(keyword)
+            for base in inflection_bases(folded):
+                bases[base].add(keyword)
+
+        self._surface = {form: frozenset(kws) for form, kws in surface.items()}
+        self._bases = {form: frozenset(kws) for form, kws in bases.items()}
+        # Kompositum-Teile: dieselben Formen ab MIN_COMPOUND_PART
+        self._part_surface = {f: kws for f, kws in self._surface.items() if len(f) >= MIN_COMPOUND_PART}
+        self._part_bases = {f: kws for f, kws in self._bases.items() if len(f) >= MIN_COMPOUND_PART}
+
+        logger.debug(
+            f"Compound index built: {len(self._surface)} forms, {len(self._bases)} base forms, "
+            f"{len(self._part_surface) + len(self._part_bases)} compound parts"
+        )
+
+    def __len__(self) -> int:
+        return len(self._surface) + len(self._bases)
+
+    @staticmethod
+    def _inflected(
+        word: str,
+        surface: Dict[str, FrozenSet[str]],
+        bases: Dict[str, FrozenSet[str]]
+    ) -> FrozenSet[str]:
+        """
+        KB-Keywords, deren Form `word` ist oder sich um genau eine Endung
+        unterscheidet ("hunden" -> hund/hunde, "schlange" -> schlangen)
+        """
+        keywords = surface.get(word) or bases.get(word)
+        if keywords:
+            return keywords
+        found: Set[str] = set()
+        for base in inflection_bases(word):
+            found.update(surface.get(base, EMPTY))
+        return frozenset(found) if found else EMPTY
+
+    def resolve(self, token: str) -> Tuple[Optional[str], FrozenSet[str]]:
+        """
+        KB-Keywords für ein Query-Token und die Art des Treffers
+
+        Reihenfolge: Wortform/Flexion, dann Kompositum-Zerlegung
+
+        Returns:
+            ('inflection' | 'compound' | None, Keywords - leer, wenn nichts passt)
+        """
+        folded = fold(token)
+        keywords = self._inflected(folded, self._surface, self._bases)
+        if keywords:
+            return 'inflection', keywords
+        keywords = self._split_compound(folded)
+        if keywords:
+            return 'compound', keywords
+        return None, EMPTY
+
+    def lookup(self, token: str) -> FrozenSet[str]:
+        """KB-Keywords für ein Query-Token (leer, wenn nichts passt)"""
+        return self.resolve(token)[1]
+
+    def _split_compound(self, word: str) -> FrozenSet[str]:
+        """
+        Längstes KB-Bestimmungswort (Präfix) und längstes KB-Grundwort (Suffix)
+
+        "hundeleine" -> hunde + leine, "kuchenmull" -> kuchen + mull
+        """
+        found: Set[str] = set()
+        length = len(word)
+
+        # Bestimmungswort: längster Präfix, optional mit Fugenelement
+        for end in range(length - MIN_COMPOUND_REST, MIN_COMPOUND_PART - 1, -1):
+            if word[end:] in NON_HEAD_ENDINGS:
+                continue
+            keywords = self._part_with_linking(word[:end])
+            if keywords:
+                found.update(keywords)
+                break
+
+        # Grundwort: längster (flektierter) Suffix
+        for start in range(MIN_COMPOUND_REST, length - MIN_COMPOUND_PART + 1):
+            keywords = self._inflected(word[start:], self._part_surface, self._part_bases)
+            if keywords:
+                found.update(keywords)
+                break
+
+        return frozenset(found) if found else EMPTY
+
+    def _part_with_linking(self, prefix: str) -> FrozenSet[str]:
+        keywords = self._part_surface.get(prefix) or self._part_bases.get(prefix)
+        if keywords:
+            return keywords
+
+        # Fugenelement nur hinter einer echten KB-Form ("hund|e|leine")
+        for linking in LINKING_ELEMENTS:
+            if prefix.endswith(linking):
+                keywords = self._part_surface.get(prefix[:-len(linking)])
+                if keywords:
+                    return keywords
+        return EMPTY
+
+
+def test_compound_index():
+    """Selbsttest mit typischen Gäste-Formulierungen"""
+    index = CompoundIndex({
+        'pizzaofen', 'pizza', 'muell', 'müll', 'hunde', 'hund', 'pool',
+        'schlangen', 'schluessel', 'fahrraeder', 'gas', 'heizung', 'check-in',
+        'beach', 'route', 'compute', 'wasserkocher', 'gartenmöbel',
+    })
+
+    tokens: List[str] = [
+        'pizzaofenreinigung', 'mülltonnen', 'hundeleine', 'hunden',
+        'schlange', 'schlüssels', 'fahrrad', 'gartenpool', 'küchenmüll',
+        'gastgeber', 'heizungen', 'strasse', 'beachten',
+    ]
+    # Dürfen nicht treffen: Stamm-Kollisionen ohne gemeinsame KB-Form
+    negatives: List[str] = ['router', 'computer', 'wasser', 'garten']
+
+    print("=" * 70)
+    print("COMPOUND INDEX TESTS")
+    print("=" * 70)
+    for token in tokens:
+        keywords = sorted(index.lookup(token))
+        print(f"  {token:22} -> {keywords if keywords else '-'}")
+    print("\n  Negative cases:")
+    for token in negatives:
+        keywords = sorted(index.lookup(token))
+        print(f"  {'FAIL' if keywords else 'ok':4} {token:17} -> {keywords if keywords else '-'}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    test_compound_index()
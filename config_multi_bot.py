@@ -4,6 +4,7 @@ MULTI-BOT ARCHITEKTUR: Drei logisch getrennte Bots in einer Instanz
 """
 
 import os
+from pathlib import Path
 
 # =====================================================================================
 # BASIS-INFO
@@ -59,6 +60,7 @@ BOT_NAMES = {
 DEV_BOT_CONFIG = {
     'name': BOT_NAMES['dev'],
     'yaml_path': 'borgo_knowledge_base.yaml',  # oder borgo_knowledge_base_dev.yaml
+    'metrics_file': 'borgo_bot_metrics_dev.json',
     'ollama_url': 'http://localhost:11434',
     
     # LLM Settings (EXPERIMENTELL - hier kannst du andere Modelle testen!)
@@ -70,9 +72,9 @@ DEV_BOT_CONFIG = {
     'primary_model': 'mistral:instruct',
     'max_llm_retries': 3,
     'llm_timeout_seconds': 45,
+    'response_budget_seconds': 90,  # Gesamtbudget pro Nachricht
     
     # Context Settings
-    'max_context_words': 800,  # Mehr Context für DEV-Tests
     'max_context_entries': 3,
     
     # Features (kannst du einzeln togglen)
@@ -83,6 +85,9 @@ DEV_BOT_CONFIG = {
         'hallucination_detection': True,
         'multi_model_fallback': True,
         'fuzzy_keyword_matching': True,
+        'keyword_cache': True,
+        'bm25_retrieval': True,
+        'passage_retrieval': True,
         'response_validation': True,
         'detailed_logging': True,
     },
@@ -99,6 +104,7 @@ DEV_BOT_CONFIG = {
 TEST_BOT_CONFIG = {
     'name': BOT_NAMES['test'],
     'yaml_path': 'borgo_knowledge_base.yaml',
+    'metrics_file': 'borgo_bot_metrics_test.json',
     'ollama_url': 'http://localhost:11434',
     
     # LLM Settings (Standard)
@@ -110,9 +116,9 @@ TEST_BOT_CONFIG = {
     'primary_model': 'mistral:instruct',
     'max_llm_retries': 2,
     'llm_timeout_seconds': 30,
+    'response_budget_seconds': 60,  # Gesamtbudget pro Nachricht
     
     # Context Settings
-    'max_context_words': 800,
     'max_context_entries': 3,
     
     # Features
@@ -123,6 +129,9 @@ TEST_BOT_CONFIG = {
         'hallucination_detection': True,
         'multi_model_fallback': True,
         'fuzzy_keyword_matching': True,
+        'keyword_cache': True,
+        'bm25_retrieval': True,
+        'passage_retrieval': True,
         'response_validation': True,
         'detailed_logging': True,
     },
@@ -139,6 +148,7 @@ TEST_BOT_CONFIG = {
 COMMUNITY_TEST_BOT_CONFIG = {
     'name': BOT_NAMES['community_test'],
     'yaml_path': 'borgo_knowledge_base.yaml',
+    'metrics_file': 'borgo_bot_metrics_community_test.json',
     'ollama_url': 'http://localhost:11434',
     
     # LLM Settings (Production-ready)
@@ -150,9 +160,9 @@ COMMUNITY_TEST_BOT_CONFIG = {
     'primary_model': 'mistral:instruct',
     'max_llm_retries': 2,
     'llm_timeout_seconds': 30,
+    'response_budget_seconds': 60,  # Gesamtbudget pro Nachricht
     
     # Context Settings
-    'max_context_words': 800,
     'max_context_entries': 3,
     
     # Features
@@ -163,6 +173,9 @@ COMMUNITY_TEST_BOT_CONFIG = {
         'hallucination_detection': True,
         'multi_model_fallback': True,
         'fuzzy_keyword_matching': True,
+        'keyword_cache': True,
+        'bm25_retrieval': True,
+        'passage_retrieval': True,
         'response_validation': True,
         'detailed_logging': True,
     },
@@ -220,10 +233,41 @@ KEYWORD_CONFIDENCE = {
     'low': 0.50
 }
 
-FUZZY_MATCH_THRESHOLD = 80
+FUZZY_MATCH_THRESHOLD = 0.80  # SequenceMatcher-Ratio (0-1) für fuzzy_index.py, Prozentwerte werden normalisiert
 MIN_KEYWORDS_REQUIRED = 0
+KEYWORD_CACHE_SIZE = 1024  # LRU für extract() pro Bot (Feature 'keyword_cache')
+
+# BM25-Ranking über KB-Antworten (Feature 'bm25_retrieval')
+BM25_WEAK_CONFIDENCE = ('none', 'low')  # Extraktion gilt als schwach (Entries nur ohne Keywords übernommen)
+BM25_MIN_SCORE = 2.0                     # Mindest-Score eines Treffers
+BM25_RELATIVE_SCORE = 0.7                # Treffer >= 70% des besten Scores
+
+# Kategorie-Fallback ohne Keywords: Mindest-Score der besten Kategorie
+CATEGORY_MIN_SCORE = 1.0
 
 # Context Management
+CONTEXT_CACHE_SIZE = 256  # Memo für build_context pro Entry-Kombination (0 = aus)
+
+# Context-Budget in Tokens (statt Wörtern) - Header/Regeln des Contexts inklusive,
+# ohne Frage und Prompt-Rahmen des LLMHandlers
+CONTEXT_TOKEN_BUDGETS = {
+    'default': 2000,          # entspricht etwa den bisherigen 800 Wörtern
+    'granite3.1:2b': 1200,    # kleine Modelle: kleines Kontextfenster
+    'granite3.3:2b': 1200,
+}
+TOKEN_COUNT_MODE = 'approx'   # 'approx' (Heuristik) oder 'exact' (Tokenizer aus TOKENIZER_FILES)
+APPROX_CHARS_PER_TOKEN = 4    # Zeichen pro Token bei Wörtern (approx)
+TOKENIZER_FILES = {
+    # Modell -> tokenizer.json (pip install tokenizers), z.B.:
+    # 'mistral:instruct': 'tokenizers/mistral-7b-instruct.json',
+}
+
+# Passagen langer Entries (Feature 'passage_retrieval', passage_index.py)
+PASSAGE_MIN_ENTRY_TOKENS = 150   # Kürzere Entries immer vollständig
+PASSAGES_PER_ENTRY = 2           # Höchstens so viele Absätze zusätzlich zur Einleitung
+PASSAGE_RELATIVE_SCORE = 0.5     # Absätze >= 50% des besten Scores
+PASSAGE_KEEP_TOKENS = 25         # Kurze Absätze (Grundsätze, Hinweise) immer behalten
+PASSAGE_WHOLE_CATEGORIES = ('emergency', 'safety')  # Nie kürzen
 CONTEXT_MIXING_RULES = {
     'pizza': ['rasenmäher', 'benzin', 'startleine', 'motor'],
     'hunde': ['säureabfalltüchel', 'spülen im hinterhof'],
@@ -242,6 +286,14 @@ YAML_CATEGORIES = [
     'emergency', 'faq', 'seasonal', 'technical', 'general'
 ]
 
+# Knowledge Base Hot-Reload (YAML-Änderungen ohne Neustart übernehmen)
+KB_HOT_RELOAD = True
+KB_WATCH_INTERVAL_SECONDS = 5.0   # mtime-Polling der YAML-Datei
+
+# Binär-Cache des KB-Lexikons (pickle, Schlüssel = SHA-256 der YAML)
+KB_BINARY_CACHE = True
+KB_CACHE_DIR = Path(".kb_cache")
+
 # Hallucination Detection
 HALLUCINATION_PATTERNS = [
     # Erfundene spezifische Details (KRITISCH!)
@@ -350,6 +402,11 @@ Das tut mir leid! Bitte:
 
 Ich lerne ständig dazu! 🤖""",
 
+    'timeout': """Das hat leider zu lange gedauert - ich konnte deine Frage nicht rechtzeitig beantworten.
+
+Bitte versuche es gleich nochmal oder stelle eine kürzere, konkretere Frage.
+Bei dringenden Anliegen: Onsite-Gruppe kontaktieren.""",
+
     'unknown': """Entschuldigung, ein unerwarteter Fehler ist aufgetreten.
 
 Bitte versuche es erneut oder kontaktiere die Onsite-Gruppe für Hilfe.
@@ -383,6 +440,16 @@ ALERT_THRESHOLDS = {
 NUM_WORKERS = 3
 QUEUE_TIMEOUT_SECONDS = 60
 
+# Zeitbudget pro Nachricht (Deadline Propagation)
+RESPONSE_BUDGET_SECONDS = 60       # Default, wenn Bot-Config nichts setzt
+LLM_MIN_ATTEMPT_SECONDS = 5        # Kürzere LLM-Versuche lohnen sich nicht
+SEND_RESERVE_SECONDS = 5           # Budget, das fürs Senden frei bleibt
+SIGNAL_SEND_TIMEOUT_SECONDS = 10   # Max. Wartezeit auf Daemon-Antwort
+SIGNAL_SEND_MIN_TIMEOUT_SECONDS = 3  # Senden wird auch nach Ablauf versucht
+
+# Ollama HTTP-Verbindungen (geteilt pro LLMHandler)
+LLM_CONNECTION_POOL_SIZE = 10
+
 # =====================================================================================
 # HILFSFUNKTIONEN
 
@@ -504,11 +571,9 @@ KEYWORD_CONFIDENCE = {
     'medium': 0.75,
     'low': 0.50
 }
-FUZZY_MATCH_THRESHOLD = 0.80
 MIN_KEYWORDS_REQUIRED = 0
 
-# Context Limits (Defaults)
-MAX_CONTEXT_WORDS = 800
+# Context Limits (Defaults; Größe in Tokens: CONTEXT_TOKEN_BUDGETS)
 MAX_CONTEXT_ENTRIES = 3
 
 # LLM Defaults
@@ -539,6 +604,45 @@ LOG_LEVEL = "DEBUG"
 LOG_FILE = "borgo_bot_multi.log"
 LOG_ROTATION_MB = 10
 LOG_RETENTION_DAYS = 30
+LOG_QUEUE_SIZE = 10000               # Log-Records in der Queue (logging_setup.py); darüber verwerfen
+# Ausführliche INFO-Zeilen pro Schlüssel höchstens N-mal pro Fenster (Rest gezählt, nicht geschrieben)
+LOG_SAMPLE_WINDOW_SECONDS = 60
+LOG_SAMPLE_LIMITS = {
+    'llm_response': 10,     # LLM-Antwort (500 Zeichen)
+    'prompt': 20,           # Modell-Versuche
+    'send_payload': 10,     # gesendeter Text
+    'keywords': 30,         # Keyword-, Kategorie- und BM25-Entscheidungen
+    'context': 30,          # Context-Aufbau
+}
+
+MONITORING_WINDOW_SIZE = 1000        # Letzte N Interactions für Raten und Problem-Patterns
+MONITORING_HOURLY_RETENTION_HOURS = 168  # Stunden-Buckets (7 Tage)
+
+# Metrik-Persistenz (Hintergrund-Task, siehe metrics_persistence.py)
+METRICS_FLUSH_INTERVAL_SECONDS = 30  # Snapshot spätestens alle N Sekunden (wenn geändert)
+METRICS_FLUSH_EVERY = 50             # ... oder nach N neuen Interactions
+METRICS_JOURNAL_MAX_MB = 50          # Journal danach nach .1 rotieren
+
+# Prometheus-Endpoint (metrics_exporter.py), nur lokal erreichbar
+METRICS_HTTP_ENABLED = True
+METRICS_HTTP_HOST = "127.0.0.1"
+METRICS_HTTP_PORT = 9464
+# Histogramm-Grenzen für Phasen-Latenzen (Sekunden; Validierung bis LLM)
+LATENCY_BUCKETS_SECONDS = (0.001, 0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 45, 90)
+
+# Streaming-Quantile (quantile_sketch.py): p50/p90/p99 pro Phase und Modell
+QUANTILE_RELATIVE_ACCURACY = 0.01   # max. relativer Fehler pro Quantil
+QUANTILE_WINDOW_SECONDS = 3600      # gleitendes Fenster
+QUANTILE_WINDOW_SLOTS = 12          # Zeitscheiben à 5 Minuten
+
+# Interaction-Historie in SQLite (interaction_store.py), alle Bots in einer DB
+INTERACTION_STORE_ENABLED = True
+INTERACTION_DB_FILE = "borgo_bot_interactions.db"
+INTERACTION_STORE_BATCH_SIZE = 50        # Insert nach N Interactions ...
+INTERACTION_STORE_FLUSH_SECONDS = 5      # ... oder spätestens nach N Sekunden
+INTERACTION_STORE_RETENTION_DAYS = 365   # ältere Interactions löschen
+INTERACTION_STORE_DETAIL_DAYS = 30       # danach nur noch Kennzahlen (volles JSON entfernt)
+INTERACTION_STORE_MAINTENANCE_HOURS = 24 # Retention + Compaction alle N Stunden
 
 TRACK_METRICS = {
     'query_processing_time': True,
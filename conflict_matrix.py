@@ -0,0 +1,158 @@
+"""
+Borgo-Bot - Konflikt-Matrix für Context-Mixing
+Paarweise Entry-Konflikte, einmal beim Laden der KB berechnet
+
+Eine Regel in CONTEXT_MIXING_RULES (Entry -> verbotene Wörter) bedeutet:
+Entry A darf nicht zusammen mit einem Entry B im Context stehen, dessen
+Antworttext eines der verbotenen Wörter enthält. Das hängt nur von der KB ab,
+nicht von der Frage. Daher wird pro Entry ein Bitset gebaut (Bit j = Konflikt
+mit Entry j); der Filter im ContextManager ist dann ein UND über die Bitsets
+der ausgewählten Entries.
+
+Export für KB-Autoren:
+    python conflict_matrix.py --json conflicts.json
+"""
+
+import logging
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ConflictMatrix:
+    """
+    Entry-Konflikte als Bitsets (Python-int pro Entry)
+
+    `rows[i]` hat Bit j gesetzt, wenn Entry i wegen einer Regel nicht neben
+    Entry j stehen darf; `reasons[(i, j)]` ist das auslösende Wort.
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[str],
+        rows: Iterable[int],
+        reasons: Mapping[Tuple[int, int], str],
+        rules: Mapping[str, Iterable[str]]
+    ):
+        self.entries: Tuple[str, ...] = tuple(entries)
+        self.rows: Tuple[int, ...] = tuple(rows)
+        self.reasons: Dict[Tuple[int, int], str] = dict(reasons)
+        self.rules: Dict[str, Tuple[str, ...]] = _normalize_rules(rules)
+        self._index = {entry: i for i, entry in enumerate(self.entries)}
+
+    @classmethod
+    def from_contents(
+        cls,
+        contents: Mapping[str, str],
+        rules: Mapping[str, Iterable[str]]
+    ) -> 'ConflictMatrix':
+        """
+        Args:
+            contents: Entry-Name -> Antworttext (Reihenfolge = Bit-Position)
+            rules: Entry-Name -> verbotene Wörter in anderen Entries
+        """
+        entries = list(contents)
+        index = {entry: i for i, entry in enumerate(entries)}
+        lowered = [str(contents[entry]).lower() for entry in entries]
+        rows = [0] * len(entries)
+        reasons: Dict[Tuple[int, int], str] = {}
+
+        for entry, forbidden_words in _normalize_rules(rules).items():
+            i = index.get(entry)
+            if i is None:
+                continue
+            for j, content in enumerate(lowered):
+                if j == i:
+                    continue
+                # Erstes passendes Wort der Regel (wie bisher beim Filtern)
+                word = next((w for w in forbidden_words if w in content), None)
+                if word is not None:
+                    rows[i] |= 1 << j
+                    reasons[(i, j)] = word
+
+        matrix = cls(entries, rows, reasons, rules)
+        logger.debug(f"Conflict matrix built: {len(reasons)} conflicts, {len(entries)} entries")
+        return matrix
+
+    def __len__(self) -> int:
+        return len(self.reasons)
+
+    def matches_rules(self, rules: Mapping[str, Iterable[str]]) -> bool:
+        """True, wenn die Matrix mit diesen Regeln gebaut wurde"""
+        return self.rules == _normalize_rules(rules)
+
+    def mask(self, entries: Iterable[str]) -> int:
+        """Bitset einer Entry-Auswahl (unbekannte Entries zählen nicht)"""
+        mask = 0
+        for entry in entries:
+            i = self._index.get(entry)
+            if i is not None:
+                mask |= 1 << i
+        return mask
+
+    def conflict(self, entry: str, selected_mask: int) -> Optional[Tuple[str, str]]:
+        """
+        Erster Konflikt eines Entries mit der Auswahl
+
+        Returns:
+            (anderer Entry, verbotenes Wort) oder None
+        """
+        i = self._index.get(entry)
+        if i is None:
+            return None
+        hits = self.rows[i] & selected_mask
+        if not hits:
+            return None
+        j = (hits & -hits).bit_length() - 1     # niedrigstes gesetztes Bit
+        return self.entries[j], self.reasons[(i, j)]
+
+    def conflicting_pairs(self) -> List[Dict[str, str]]:
+        """Alle Konflikte als Liste (für Export und Review der KB)"""
+        return [
+            {'entry': self.entries[i], 'conflicts_with': self.entries[j], 'word': word}
+            for (i, j), word in sorted(self.reasons.items())
+        ]
+
+    def to_dict(self) -> Dict:
+        return {
+            'entries': len(self.entries),
+            'rules': {entry: list(words) for entry, words in self.rules.items()},
+            'conflicts': self.conflicting_pairs(),
+        }
+
+
+def _normalize_rules(rules: Mapping[str, Iterable[str]]) -> Dict[str, Tuple[str, ...]]:
+    return {str(entry): tuple(str(word) for word in words) for entry, words in (rules or {}).items()}
+
+
+def print_conflicts(matrix: ConflictMatrix):
+    print("=" * 70)
+    print(f"CONTEXT-MIXING CONFLICTS ({len(matrix)} conflicts, {len(matrix.rules)} rules, "
+          f"{len(matrix.entries)} entries)")
+    print("=" * 70)
+    if not matrix.rules:
+        print("  Keine CONTEXT_MIXING_RULES konfiguriert")
+    for pair in matrix.conflicting_pairs():
+        print(f"  {pair['entry']:20} x {pair['conflicts_with']:24} ('{pair['word']}')")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    import json
+    import argparse
+    from pathlib import Path
+    from lexicon import build_lexicon, load_knowledge_base
+
+    parser = argparse.ArgumentParser(description="Context-Mixing-Konflikte der Knowledge Base anzeigen")
+    parser.add_argument('--kb', default='borgo_knowledge_base.yaml')
+    parser.add_argument('--json', default=None, help="Konflikte als JSON speichern")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    matrix = build_lexicon(load_knowledge_base(Path(args.kb))).conflicts
+    print_conflicts(matrix)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(matrix.to_dict(), f, indent=2, ensure_ascii=False)
+        print(f"✅ Conflicts written to {args.json}")
@@ -3,21 +3,47 @@ Borgo-Bot v3.5 - Context Manager
 Phase 3: Strikte Context-Isolierung und Size-Management
 """
 
-import yaml
 import logging
-from typing import List, Dict, Set, Optional, Tuple
+from collections import OrderedDict
+from typing import List, Dict, Set, Optional, Tuple, Mapping
 from pathlib import Path
 from dataclasses import dataclass
 
 from config_multi_bot import (
-    MAX_CONTEXT_WORDS,
     MAX_CONTEXT_ENTRIES,
     YAML_DB_PATH,
-    CONTEXT_MIXING_RULES
+    BM25_MIN_SCORE,
+    BM25_RELATIVE_SCORE,
+    CONTEXT_CACHE_SIZE,
+    PASSAGE_MIN_ENTRY_TOKENS,
+    PASSAGES_PER_ENTRY,
+    PASSAGE_RELATIVE_SCORE,
+    PASSAGE_KEEP_TOKENS,
+    PASSAGE_WHOLE_CATEGORIES
 )
+from lexicon import KBLexicon, LexiconSource, format_block, get_lexicon_source
+from token_counter import TokenCounter, context_token_budget, get_token_counter
 
 logger = logging.getLogger(__name__)
 
+CONTEXT_HEADER = "\n".join([
+    "# BORGO BATONE KNOWLEDGE BASE",
+    "",
+    "Du bist Borgo-Bot, der Borgo-Batone Gäste-Assistent.",
+    "WICHTIG: Kopiere die Antworten unten WORT-FÜR-WORT - keine Paraphrasierung!",
+    "Antworte EXAKT mit dem Text aus der Knowledge Base:",
+    "",
+])
+
+CONTEXT_FOOTER = "\n".join([
+    "# WICHTIGE REGELN",
+    "1. Antworte NUR mit Informationen aus obigen Einträgen",
+    "2. Wenn du etwas nicht weißt, sage es ehrlich",
+    "3. Erfinde KEINE Zahlen, Einheiten oder Details",
+    "4. Bleibe beim Thema - keine Themenvermischung",
+    "5. Sei präzise und korrekt",
+])
+
 
 @dataclass
 class ContextEntry:
@@ -27,6 +53,8 @@ class ContextEntry:
     content: str
     word_count: int
     metadata: Dict
+    block: str = ''     # Vorformatierter Abschnitt ohne Nummer (EntryFragment.block)
+    token_count: int = 0  # Tokens des Abschnitts (vorberechnet beim KB-Laden)
 
 
 class ContextManager:
@@ -35,114 +63,246 @@ class ContextManager:
     Verhindert Context-Mixing und Halluzinationen
     """
     
-    def __init__(self, yaml_path: Path = YAML_DB_PATH):
+    def __init__(
+        self,
+        yaml_path: Path = YAML_DB_PATH,
+        lexicon: Optional[LexiconSource] = None,
+        passage_retrieval: bool = True
+    ):
+        """
+        Args:
+            yaml_path: Pfad zur YAML Knowledge Base
+            lexicon: Geteiltes KB-Lexikon (Standard: geteilt pro yaml_path)
+            passage_retrieval: Lange Entries auf die zur Frage passenden Absätze kürzen
+        """
         self.yaml_path = yaml_path
-        self.knowledge_base = self._load_yaml()
-        self.synonym_map = self._build_synonym_map()
+        self.lexicon_source = lexicon or get_lexicon_source(yaml_path)
+        self.passage_retrieval = passage_retrieval
         self.stats = {
             'contexts_built': 0,
             'entries_loaded': 0,
             'truncations': 0,
             'mixing_prevented': 0,
+            'bm25_rankings': 0,
+            'context_cache_hits': 0,
+            'passages_trimmed': 0,
         }
-    
-    def _load_yaml(self) -> Dict:
-        """Lädt YAML Knowledge Base"""
-        try:
-            with open(self.yaml_path, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f)
-                logger.info(f"✅ YAML loaded: {len(data)} entries")
-                return data
-        except Exception as e:
-            logger.error(f"❌ Failed to load YAML: {e}")
-            return {}
-    
-    def _build_synonym_map(self) -> Dict[str, str]:
-        """Baut Mapping: Synonym zu Entry-Name"""
-        synonym_map = {}
         
-        for entry_name, entry_data in self.knowledge_base.items():
-            synonym_map[entry_name.lower()] = entry_name
-            
-            if 'synonyms' in entry_data:
-                for synonym in entry_data['synonyms']:
-                    synonym_map[synonym.lower()] = entry_name
+        # Memo: (Entry-Namen, Zähler, Budget) -> (Context, Metadaten, Stat-Zuwachs);
+        # gilt nur für _context_cache_version (KB-Reload leert es)
+        self._context_cache: OrderedDict = OrderedDict()
+        self._context_cache_version: Optional[int] = None
         
-        logger.debug(f"Built synonym map with {len(synonym_map)} mappings")
-        return synonym_map
+        # Tokens von Header + Regeln pro Token-Zähler
+        self._frame_tokens: Dict[str, int] = {}
+    
+    @property
+    def knowledge_base(self) -> Mapping[str, Dict]:
+        """Entries des aktuellen Lexikons (read-only)"""
+        return self.lexicon_source.current.knowledge_base
+    
+    @property
+    def synonym_map(self) -> Mapping[str, str]:
+        """Mapping: Synonym (lowercase) zu Entry-Name"""
+        return self.lexicon_source.current.term_to_entry
     
     def get_available_keywords(self) -> Set[str]:
-        """Gibt alle verfügbaren Keywords zurück"""
-        all_keywords = set()
+        """Gibt alle verfügbaren Keywords zurück (lowercase)"""
+        return set(self.lexicon_source.current.keywords)
+
+    def rank_entries(
+        self,
+        query: str,
+        max_entries: int = MAX_CONTEXT_ENTRIES
+    ) -> List[str]:
+        """
+        Rankt KB-Entries per BM25 über Antworttext und Synonyme
+        Für Fragen ohne (sichere) Keyword-Treffer
         
-        for entry_name, entry_data in self.knowledge_base.items():
-            all_keywords.add(entry_name)
-            
-            if 'synonyms' in entry_data:
-                all_keywords.update(entry_data['synonyms'])
+        Returns:
+            Entry-Namen, bester zuerst (leer wenn nichts relevant ist)
+        """
+        results = self.lexicon_source.current.answer_index.search(
+            query, top_k=max_entries, min_score=BM25_MIN_SCORE
+        )
+        if not results:
+            return []
         
-        return all_keywords
-
+        best_score = results[0][1]
+        entries = [entry for entry, score in results if score >= best_score * BM25_RELATIVE_SCORE]
+        
+        self.stats['bm25_rankings'] += 1
+        logger.info(f"🔎 BM25 ranked entries: {entries} (best score: {best_score:.2f})",
+                    extra={'sample': 'keywords'})
+        return entries
+    
     def build_context(
         self, 
         keywords: List[str], 
         query: str,
-        max_entries: int = MAX_CONTEXT_ENTRIES
+        max_entries: int = MAX_CONTEXT_ENTRIES,
+        model: Optional[str] = None
     ) -> Tuple[str, Dict]:
-        """Baut Context aus Keywords"""
+        """
+        Baut Context aus Keywords
+        
+        Der Context hängt von den aufgelösten Entries und - bei langen
+        Entries - den zur Frage passenden Absätzen ab; er wird pro
+        Kombination gemerkt.
+        
+        Args:
+            model: LLM, dessen Token-Budget und Tokenizer gelten
+                   (None = CONTEXT_TOKEN_BUDGETS['default'], approx)
+        """
         self.stats['contexts_built'] += 1
         
-        entries = self._load_entries(keywords, max_entries)
-        entries = self._prevent_context_mixing(entries, query)
-        entries = self._truncate_by_word_count(entries)
-        context_string = self._format_context(entries)
+        counter = get_token_counter(model)
+        token_budget = context_token_budget(model)
+        lexicon = self.lexicon_source.current
+        entry_names = self._resolve_entry_names(keywords, max_entries, lexicon)
+        self.stats['entries_loaded'] += len(entry_names)
         
-        metadata = {
-            'total_entries': len(entries),
-            'total_words': sum(e.word_count for e in entries),
-            'keywords_used': [e.keyword for e in entries],
-            'categories': list(set(e.category for e in entries)),
-        }
+        if lexicon.version != self._context_cache_version:
+            self._context_cache.clear()
+            self._context_cache_version = lexicon.version
         
-        logger.info(f"📦 Context built: {len(entries)} entries, {metadata['total_words']} words")
+        selection = (
+            self._select_passages(entry_names, query, lexicon, counter)
+            if self.passage_retrieval else ()
+        )
+        self.stats['passages_trimmed'] += sum(positions is not None for positions in selection)
         
-        return context_string, metadata
+        cache_key = (entry_names, selection, counter.name, token_budget)
+        cached = self._context_cache.get(cache_key)
+        if cached is not None:
+            self._context_cache.move_to_end(cache_key)
+            self.stats['context_cache_hits'] += 1
+            context_string, metadata, stat_deltas = cached
+            for key, delta in stat_deltas.items():
+                self.stats[key] += delta
+        else:
+            before = {key: self.stats[key] for key in ('mixing_prevented', 'truncations')}
+            
+            entries = self._entries_from_fragments(entry_names, lexicon, counter, selection)
+            entries = self._prevent_context_mixing(entries, query)
+            entries, total_tokens = self._truncate_to_token_budget(entries, counter, token_budget)
+            context_string = self._format_context(entries)
+            
+            metadata = {
+                'total_entries': len(entries),
+                'total_words': sum(e.word_count for e in entries),
+                'total_tokens': total_tokens,
+                'token_budget': token_budget,
+                'keywords_used': [e.keyword for e in entries],
+                'categories': list(set(e.category for e in entries)),
+                'trimmed_entries': [e.keyword for e in entries if e.metadata.get('passages')],
+            }
+            
+            if CONTEXT_CACHE_SIZE:
+                stat_deltas = {key: self.stats[key] - value for key, value in before.items()}
+                self._context_cache[cache_key] = (context_string, metadata, stat_deltas)
+                if len(self._context_cache) > CONTEXT_CACHE_SIZE:
+                    self._context_cache.popitem(last=False)
+        
+        logger.info(
+            f"📦 Context built: {metadata['total_entries']} entries, {metadata['total_words']} words, "
+            f"{metadata['total_tokens']}/{token_budget} tokens"
+            f"{' (cached)' if cached is not None else ''}",
+            extra={'sample': 'context'}
+        )
+        
+        # Kopie: Aufrufer dürfen die Metadaten verändern, ohne das Memo zu treffen
+        return context_string, {**metadata, 'keywords_used': list(metadata['keywords_used']),
+                                'categories': list(metadata['categories']),
+                                'trimmed_entries': list(metadata['trimmed_entries'])}
     
-    def _load_entries(
-        self, 
-        keywords: List[str], 
-        max_entries: int
+    def _resolve_entry_names(
+        self,
+        keywords: List[str],
+        max_entries: int,
+        lexicon: KBLexicon
+    ) -> Tuple[str, ...]:
+        """Keywords -> existierende Entry-Namen (ohne Duplikate, Reihenfolge bleibt)"""
+        names = []
+        for keyword in keywords[:max_entries]:
+            entry_name = lexicon.term_to_entry.get(keyword.lower(), keyword)
+            if entry_name in lexicon.fragments and entry_name not in names:
+                names.append(entry_name)
+        return tuple(names)
+    
+    def _select_passages(
+        self,
+        entry_names: Tuple[str, ...],
+        query: str,
+        lexicon: KBLexicon,
+        counter: TokenCounter
+    ) -> Tuple[Optional[Tuple[int, ...]], ...]:
+        """
+        Pro Entry: Positionen der zur Frage passenden Absätze (None = ganzer Entry)
+        
+        Kurze Absätze bleiben immer drin - sie sparen kaum Tokens, enthalten
+        aber oft den Grundsatz ("Hunde sind WILLKOMMEN!").
+        """
+        selection = []
+        for entry_name in entry_names:
+            fragment = lexicon.fragments[entry_name]
+            positions = None
+            if (fragment.tokens(counter) >= PASSAGE_MIN_ENTRY_TOKENS
+                    and fragment.category not in PASSAGE_WHOLE_CATEGORIES):
+                positions = lexicon.passage_index.select(
+                    entry_name, query, PASSAGES_PER_ENTRY, PASSAGE_RELATIVE_SCORE
+                )
+            if positions is not None:
+                passages = lexicon.passage_index.passages(entry_name)
+                positions = tuple(
+                    p.position for p in passages
+                    if p.position in positions or p.tokens(counter) < PASSAGE_KEEP_TOKENS
+                )
+                if len(positions) == len(passages):
+                    positions = None
+            selection.append(positions)
+        return tuple(selection)
+    
+    def _entries_from_fragments(
+        self,
+        entry_names: Tuple[str, ...],
+        lexicon: KBLexicon,
+        counter: TokenCounter,
+        selection: Tuple[Optional[Tuple[int, ...]], ...] = ()
     ) -> List[ContextEntry]:
-        """Lädt YAML-Entries für Keywords"""
-        entries = []
-        seen_entries = set()
+        """
+        ContextEntries aus den beim KB-Laden vorformatierten Fragmenten
         
-        for keyword in keywords[:max_entries]:
-            entry_name = self.synonym_map.get(keyword.lower(), keyword)
+        Args:
+            selection: Pro Entry die zu verwendenden Absätze (None = ganzer Entry)
+        """
+        entries = []
+        for i, entry_name in enumerate(entry_names):
+            fragment = lexicon.fragments[entry_name]
+            positions = selection[i] if selection else None
+            entry = ContextEntry(
+                keyword=entry_name,
+                category=fragment.category,
+                content=fragment.content,
+                word_count=fragment.word_count,
+                metadata={
+                    'synonyms': fragment.synonyms,
+                    'priority': fragment.priority,
+                },
+                block=fragment.block,
+                token_count=fragment.tokens(counter),
+            )
             
-            if entry_name in seen_entries:
-                continue
+            if positions is not None:
+                passages = lexicon.passage_index.passages(entry_name)
+                dropped = [p for p in passages if p.position not in positions]
+                entry.content = "\n\n".join(passages[position].text for position in positions)
+                entry.word_count = len(entry.content.split())
+                entry.block = format_block(entry_name, fragment.category, entry.content)
+                entry.token_count -= sum(p.tokens(counter) for p in dropped)
+                entry.metadata['passages'] = positions
             
-            if entry_name in self.knowledge_base:
-                data = self.knowledge_base[entry_name]
-                
-                entry = ContextEntry(
-                    keyword=entry_name,
-                    category=data.get('category', 'unknown'),
-                    content=data.get('answer', ''),
-                    word_count=len(data.get('answer', '').split()),
-                    metadata={
-                        'synonyms': data.get('synonyms', []),
-                        'priority': data.get('priority', 'normal'),
-                    }
-                )
-                
-                entries.append(entry)
-                seen_entries.add(entry_name)
-                self.stats['entries_loaded'] += 1
-                
-                logger.debug(f"Loaded entry: {entry_name} from keyword: {keyword}")
-        
+            entries.append(entry)
         return entries
     
     def _prevent_context_mixing(
@@ -150,96 +310,74 @@ class ContextManager:
         entries: List[ContextEntry], 
         query: str
     ) -> List[ContextEntry]:
-        """Verhindert Context-Mixing"""
+        """Verhindert Context-Mixing (Konflikt-Matrix aus dem Lexikon)"""
         if not entries:
             return entries
         
-        query_lower = query.lower()
+        conflicts = self.lexicon_source.current.conflicts
+        selected = conflicts.mask(entry.keyword for entry in entries)
         filtered_entries = []
         
         for entry in entries:
-            should_keep = True
-            
-            if entry.keyword in CONTEXT_MIXING_RULES:
-                forbidden_words = CONTEXT_MIXING_RULES[entry.keyword]
-                
-                for other_entry in entries:
-                    if other_entry.keyword == entry.keyword:
-                        continue
-                    
-                    other_content_lower = other_entry.content.lower()
-                    for forbidden in forbidden_words:
-                        if forbidden in other_content_lower:
-                            logger.warning(
-                                f"Context mixing detected: '{entry.keyword}' conflicts with "
-                                f"'{other_entry.keyword}' (contains '{forbidden}')"
-                            )
-                            should_keep = False
-                            self.stats['mixing_prevented'] += 1
-                            break
-                    
-                    if not should_keep:
-                        break
-            
-            if should_keep:
+            conflict = conflicts.conflict(entry.keyword, selected)
+            if conflict is None:
                 filtered_entries.append(entry)
+                continue
+            
+            other_keyword, forbidden = conflict
+            logger.warning(
+                f"Context mixing detected: '{entry.keyword}' conflicts with "
+                f"'{other_keyword}' (contains '{forbidden}')"
+            )
+            self.stats['mixing_prevented'] += 1
         
         return filtered_entries
     
-    def _truncate_by_word_count(
-        self, 
-        entries: List[ContextEntry]
-    ) -> List[ContextEntry]:
-        """Begrenzt Entries auf MAX_CONTEXT_WORDS"""
-        total_words = 0
+    def _truncate_to_token_budget(
+        self,
+        entries: List[ContextEntry],
+        counter: TokenCounter,
+        token_budget: int
+    ) -> Tuple[List[ContextEntry], int]:
+        """
+        Packt Entries (in Relevanz-Reihenfolge) ins Token-Budget
+        
+        Ein zu großer Entry wird übersprungen, kleinere danach passen ggf. noch.
+        
+        Returns:
+            (Entries, Tokens des Contexts inkl. Header und Regeln)
+        """
+        if counter.name not in self._frame_tokens:
+            self._frame_tokens[counter.name] = (
+                counter.count(CONTEXT_HEADER) + counter.count(CONTEXT_FOOTER)
+            )
+        total_tokens = self._frame_tokens[counter.name]
         truncated_entries = []
         
         for entry in entries:
-            if total_words + entry.word_count <= MAX_CONTEXT_WORDS:
+            entry_tokens = counter.count(f"## {len(truncated_entries) + 1}. ") + entry.token_count
+            if total_tokens + entry_tokens <= token_budget:
                 truncated_entries.append(entry)
-                total_words += entry.word_count
+                total_tokens += entry_tokens
             else:
                 logger.warning(
-                    f"Truncating context: '{entry.keyword}' would exceed limit "
-                    f"({total_words + entry.word_count} > {MAX_CONTEXT_WORDS})"
+                    f"Truncating context: '{entry.keyword}' would exceed token budget "
+                    f"({total_tokens + entry_tokens} > {token_budget}, {counter.name})"
                 )
                 self.stats['truncations'] += 1
-                break
         
-        return truncated_entries
+        return truncated_entries, (total_tokens if truncated_entries else 0)
     
     def _format_context(self, entries: List[ContextEntry]) -> str:
         """Formatiert Entries zu LLM-Context-String"""
         if not entries:
             return ""
         
-        context_parts = [
-            "# BORGO BATONE KNOWLEDGE BASE",
-            "",
-            "Du bist Borgo-Bot, der Borgo-Batone Gäste-Assistent.",
-            "WICHTIG: Kopiere die Antworten unten WORT-FÜR-WORT - keine Paraphrasierung!",
-            "Antworte EXAKT mit dem Text aus der Knowledge Base:",
-            ""
-        ]
-        
+        context_parts = [CONTEXT_HEADER]
         for i, entry in enumerate(entries, 1):
-            context_parts.extend([
-                f"## {i}. {entry.keyword.upper()} (Kategorie: {entry.category})",
-                "",
-                entry.content,
-                "",
-                "---",
-                ""
-            ])
-        
-        context_parts.extend([
-            "# WICHTIGE REGELN",
-            "1. Antworte NUR mit Informationen aus obigen Einträgen",
-            "2. Wenn du etwas nicht weißt, sage es ehrlich",
-            "3. Erfinde KEINE Zahlen, Einheiten oder Details",
-            "4. Bleibe beim Thema - keine Themenvermischung",
-            "5. Sei präzise und korrekt",
-        ])
+            block = entry.block or format_block(entry.keyword, entry.category, entry.content)
+            context_parts.append(f"## {i}. {block}")
+        context_parts.append(CONTEXT_FOOTER)
         
         return "\n".join(context_parts)
     
@@ -268,11 +406,15 @@ class ContextManager:
         return "\n".join(fallback)
     
     def reload_knowledge_base(self) -> bool:
-        """Lädt Knowledge Base neu"""
+        """
+        Lädt Knowledge Base neu
+        
+        Baut ein neues Lexikon und tauscht es atomar aus - gilt für alle
+        Komponenten und Bots, die dieses Lexikon teilen.
+        """
         try:
-            self.knowledge_base = self._load_yaml()
-            self.synonym_map = self._build_synonym_map()
-            logger.info("✅ Knowledge base reloaded")
+            lexicon = self.lexicon_source.reload()
+            logger.info(f"✅ Knowledge base reloaded (lexicon v{lexicon.version})")
             return True
         except Exception as e:
             logger.error(f"❌ Failed to reload knowledge base: {e}")
@@ -284,6 +426,7 @@ class ContextManager:
             **self.stats,
             'total_entries_in_db': len(self.knowledge_base),
             'total_synonym_mappings': len(self.synonym_map),
+            'lexicon_version': self.lexicon_source.current.version,
             'avg_entries_per_context': (
                 self.stats['entries_loaded'] / self.stats['contexts_built']
                 if self.stats['contexts_built'] > 0 else 0
@@ -302,9 +445,12 @@ class ContextValidator:
         if not context or len(context.strip()) < 50:
             issues.append("Context zu kurz oder leer")
         
-        word_count = len(context.split())
-        if word_count > MAX_CONTEXT_WORDS * 1.2:
-            issues.append(f"Context zu groß: {word_count} Wörter")
+        token_budget = metadata.get('token_budget') or context_token_budget()
+        total_tokens = metadata.get('total_tokens')
+        if total_tokens is None:
+            total_tokens = get_token_counter().count(context)
+        if total_tokens > token_budget:
+            issues.append(f"Context zu groß: {total_tokens} Tokens (Budget {token_budget})")
         
         keywords = metadata.get('keywords_used', [])
         if len(keywords) != len(set(keywords)):
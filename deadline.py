@@ -0,0 +1,95 @@
+"""
+Borgo-Bot - Deadline Propagation
+Gesamtes Zeitbudget pro Nachricht, das durch alle Pipeline-Phasen gereicht wird
+"""
+
+import time
+import logging
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+
+class Deadline:
+    """
+    Zeitbudget für eine einzelne Nachricht
+
+    Wird beim Eintreffen der Nachricht erstellt und an Validierung,
+    Keyword-Extraktion, Context-Building, LLM und Senden weitergereicht.
+    Phasen, die nach Ablauf des Budgets erreicht werden, werden als
+    Budget-Miss protokolliert.
+    """
+
+    def __init__(
+        self,
+        budget_seconds: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            budget_seconds: Gesamtbudget in Sekunden
+            clock: Monotone Uhr (austauschbar für Tests)
+        """
+        self.budget_seconds = budget_seconds
+        self._clock = clock
+        self.started_at = clock()
+        self.expires_at = self.started_at + budget_seconds
+        self.missed_phases: List[str] = []
+
+    def elapsed(self) -> float:
+        """Verstrichene Zeit seit Erstellung (Sekunden)"""
+        return self._clock() - self.started_at
+
+    def remaining(self) -> float:
+        """Verbleibendes Budget (Sekunden, nie negativ)"""
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self) -> bool:
+        """True wenn das Budget aufgebraucht ist"""
+        return self._clock() >= self.expires_at
+
+    def check(self, phase: str) -> bool:
+        """
+        Prüft das Budget beim Eintritt in eine Phase
+
+        Returns:
+            True wenn noch Budget vorhanden ist, sonst False
+            (der Miss wird für die Phase protokolliert)
+        """
+        if not self.expired():
+            return True
+
+        self.record_miss(phase)
+        return False
+
+    def record_miss(self, phase: str):
+        """Protokolliert einen Budget-Miss für eine Phase (einmal pro Phase)"""
+        if phase in self.missed_phases:
+            return
+
+        self.missed_phases.append(phase)
+        logger.warning(
+            f"⏱️ Budget exceeded in phase '{phase}' "
+            f"({self.elapsed():.1f}s of {self.budget_seconds:.0f}s)"
+        )
+
+    def timeout_for(
+        self,
+        cap_seconds: float,
+        reserve_seconds: float = 0.0,
+        floor_seconds: float = 0.0
+    ) -> float:
+        """
+        Berechnet ein Timeout für einen Einzelschritt
+
+        Args:
+            cap_seconds: Obergrenze (z.B. konfiguriertes Modell-Timeout)
+            reserve_seconds: Budget, das für spätere Phasen frei bleiben muss
+            floor_seconds: Untergrenze (z.B. Senden muss immer versucht werden)
+
+        Returns:
+            Timeout in Sekunden
+        """
+        available = self.remaining() - reserve_seconds
+        return max(floor_seconds, min(cap_seconds, available))
+
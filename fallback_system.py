@@ -8,6 +8,7 @@ from typing import Optional, Dict, List
 from enum import Enum
 
 from config_multi_bot import FALLBACK_RESPONSES
+from lexicon import LexiconSource
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +31,12 @@ class FallbackSystem:
     Stellt sicher dass User immer hilfreiche Antworten bekommt
     """
     
-    def __init__(self):
+    def __init__(self, lexicon: Optional[LexiconSource] = None):
+        """
+        Args:
+            lexicon: Geteiltes KB-Lexikon (Topic-Begriffe)
+        """
+        self.lexicon_source = lexicon or LexiconSource.from_keywords(set())
         self.stats = {
             'total_fallbacks': 0,
             'by_reason': {reason.value: 0 for reason in FallbackReason},
@@ -121,24 +127,11 @@ class FallbackSystem:
         Returns:
             Topic-spezifische Hilfe oder None
         """
-        query_lower = query.lower()
-        
-        # Prüfe Topics
-        topic_keywords = {
-            'wlan': ['wlan', 'wifi', 'internet', 'w-lan', 'passwort'],
-            'pizza': ['pizza', 'ofen', 'pizzaofen', 'backen', 'mehl'],
-            'hunde': ['hund', 'hunde', 'dog', 'haustier', 'vierbeiner'],
-            'schlangen': ['schlange', 'schlangen', 'viper', 'giftig', 'biss'],
-            'notfall': ['notfall', 'emergency', 'hilfe', 'sos', 'dringend'],
-        }
+        lexicon = self.lexicon_source.current
         
-        # Finde beste Matches
-        matches = []
-        for topic, keywords in topic_keywords.items():
-            for keyword in keywords:
-                if keyword in query_lower:
-                    matches.append(topic)
-                    break
+        # Topics aller Begriff-Treffer (Teilstring) in einem Durchlauf
+        found = lexicon.topic_matcher.find_values(query.lower())
+        matches = [topic for topic in lexicon.topic_order if topic in found]
         
         # Gib erste Match zurück
         if matches:
@@ -0,0 +1,140 @@
+"""
+Borgo-Bot - Fuzzy-Index für Tippfehler-Toleranz
+Zeichen-Trigramm-Index über das KB-Lexikon
+
+Statt jedes Query-Wort mit jedem Keyword per SequenceMatcher zu vergleichen,
+liefert der invertierte Trigramm-Index wenige Kandidaten (Dice-Ähnlichkeit
+der Trigramm-Mengen + Längenschranke). Nur diese werden exakt bewertet.
+"""
+
+import logging
+from collections import Counter, defaultdict
+from itertools import chain
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Kandidaten, die exakt mit SequenceMatcher bewertet werden
+MAX_FUZZY_CANDIDATES = 20
+# Mindest-Dice-Ähnlichkeit der Trigramme, um Kandidat zu werden
+MIN_TRIGRAM_SIMILARITY = 0.2
+
+
+def normalize_threshold(threshold: float) -> float:
+    """
+    Ähnlichkeits-Schwelle als Ratio 0-1
+
+    Akzeptiert auch Prozentwerte (z.B. 80), damit alte Configs weiter
+    funktionieren - verglichen wird immer mit SequenceMatcher.ratio() (0-1).
+    """
+    return threshold / 100 if threshold > 1 else threshold
+
+
+def trigrams(word: str) -> Set[str]:
+    """Zeichen-Trigramme mit Rand-Markern ("$$hei", ..., "ng$")"""
+    padded = f"$${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Invertierter Trigramm-Index über eine Menge von Begriffen
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: List[str] = sorted(set(terms))
+        self._trigram_counts: List[int] = []
+        self._term_lengths: List[int] = [len(term) for term in self.terms]
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+
+        for term_id, term in enumerate(self.terms):
+            grams = trigrams(term)
+            self._trigram_counts.append(len(grams))
+            for gram in grams:
+                self._postings[gram].append(term_id)
+
+        self._postings = dict(self._postings)
+        logger.debug(
+            f"Trigram index built: {len(self.terms)} terms, {len(self._postings)} trigrams"
+        )
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def candidates(
+        self,
+        word: str,
+        threshold: float = 0.0,
+        limit: int = MAX_FUZZY_CANDIDATES,
+        exclude: Optional[Set[str]] = None
+    ) -> List[Tuple[float, str]]:
+        """
+        Günstige Kandidaten-Generierung über gemeinsame Trigramme
+
+        Args:
+            word: Query-Wort (lowercase)
+            threshold: Ziel-Schwelle (0-1) für die Längenschranke
+            limit: Max. Anzahl Kandidaten
+            exclude: Begriffe, die nicht in Frage kommen
+
+        Returns:
+            Liste (dice, term), beste zuerst
+        """
+        grams = trigrams(word)
+        shared = Counter(chain.from_iterable(self._postings.get(gram, ()) for gram in grams))
+
+        word_length = len(word)
+        gram_count = len(grams)
+        scored = []
+        for term_id, count in shared.items():
+            dice = 2 * count / (gram_count + self._trigram_counts[term_id])
+            if dice < MIN_TRIGRAM_SIMILARITY:
+                continue
+
+            # Obergrenze der SequenceMatcher-Ratio über die Längen
+            term_length = self._term_lengths[term_id]
+            if 2 * min(word_length, term_length) / (word_length + term_length) < threshold:
+                continue
+
+            term = self.terms[term_id]
+            if exclude and term in exclude:
+                continue
+            scored.append((dice, term))
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored[:limit]
+
+    def best_match(
+        self,
+        word: str,
+        threshold: float,
+        exclude: Optional[Set[str]] = None
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Bester Begriff mit SequenceMatcher-Ratio >= threshold
+
+        Returns:
+            (term, score) oder None
+        """
+        threshold = normalize_threshold(threshold)
+
+        # Gleiche Argument-Reihenfolge wie bisher: ratio(query_word, keyword)
+        matcher = SequenceMatcher(None)
+        matcher.set_seq1(word)
+
+        best_term = None
+        best_score = 0.0
+        for _, term in self.candidates(word, threshold, exclude=exclude):
+            matcher.set_seq2(term)
+            if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                continue
+
+            score = matcher.ratio()
+            if score > best_score and score >= threshold:
+                best_score = score
+                best_term = term
+
+        if best_term is None:
+            return None
+        return best_term, best_score
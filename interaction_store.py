@@ -0,0 +1,462 @@
+"""
+Borgo-Bot - Interaction-Historie in SQLite
+Problem-Patterns und Stunden-Report über Monate statt über das Fenster
+
+MonitoringSystem hält nur die letzten MONITORING_WINDOW_SIZE Interactions im
+Speicher; nach einem Neustart ist die Historie weg. InteractionStore schreibt
+jede Interaction (aller Bots) in eine eingebettete SQLite-DB:
+
+1. log_interaction hängt sie auf der Event-Loop nur an einen Puffer an
+2. Ein Hintergrund-Task schreibt den Puffer gebündelt im Worker-Thread
+   (Zeilen und JSON bauen, ein executemany pro Batch, eine Transaktion) - nach
+   INTERACTION_STORE_BATCH_SIZE Interactions oder spätestens alle
+   INTERACTION_STORE_FLUSH_SECONDS
+3. WAL-Modus: Abfragen (Report) lesen parallel zum Writer, ohne zu blockieren
+4. Indizes auf timestamp, bot und model; für Problem-Patterns partielle
+   Indizes nur über die seltenen Zeilen (Fallback-Grund gesetzt, gescheitert,
+   Validierungsprobleme) - Problem-Patterns und Stunden-Report laufen als SQL
+   in Millisekunden, auch über Monate. Sie blockieren dennoch (SQLite,
+   synchron) - nicht im Nachrichtenpfad aufrufen, sondern aus Reports,
+   Admin-Befehlen oder per run_in_executor
+
+Retention und Compaction (alle INTERACTION_STORE_MAINTENANCE_HOURS):
+- Interactions älter als INTERACTION_STORE_RETENTION_DAYS werden gelöscht
+- Ab INTERACTION_STORE_DETAIL_DAYS bleibt nur die Zeile mit den Kennzahlen,
+  das volle InteractionLog-JSON (Timings, Context, Retrieval) wird entfernt
+- Freie Seiten per incremental_vacuum zurückgeben, WAL-Checkpoint
+"""
+
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from config_multi_bot import (
+    ALERT_THRESHOLDS,
+    INTERACTION_DB_FILE,
+    INTERACTION_STORE_BATCH_SIZE,
+    INTERACTION_STORE_FLUSH_SECONDS,
+    INTERACTION_STORE_RETENTION_DAYS,
+    INTERACTION_STORE_DETAIL_DAYS,
+    INTERACTION_STORE_MAINTENANCE_HOURS,
+)
+from monitoring import HOUR_FORMAT, InteractionLog, is_hallucination
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,            -- ISO-Format (sortiert lexikografisch)
+    bot TEXT NOT NULL,
+    query TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    response_time_ms REAL NOT NULL,
+    fallback_reason TEXT,
+    model TEXT,
+    keywords_found INTEGER NOT NULL,    -- Anzahl
+    hallucination INTEGER NOT NULL,
+    validation_issues TEXT,             -- JSON-Liste, NULL wenn keine
+    data TEXT                           -- volles InteractionLog, NULL nach Compaction
+);
+CREATE INDEX IF NOT EXISTS idx_interactions_timestamp ON interactions (timestamp);
+CREATE INDEX IF NOT EXISTS idx_interactions_bot ON interactions (bot, timestamp);
+CREATE INDEX IF NOT EXISTS idx_interactions_model ON interactions (model, timestamp);
+-- Problem-Patterns: partielle, abdeckende Indizes (nur die seltenen Zeilen)
+CREATE INDEX IF NOT EXISTS idx_interactions_fallback ON interactions (bot, timestamp, fallback_reason)
+    WHERE fallback_reason IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_interactions_failed ON interactions (bot, timestamp, query)
+    WHERE success = 0;
+CREATE INDEX IF NOT EXISTS idx_interactions_issues ON interactions (bot, timestamp, validation_issues)
+    WHERE validation_issues IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_interactions_slow ON interactions (bot, response_time_ms);
+"""
+
+INSERT = """
+INSERT INTO interactions (timestamp, bot, query, success, response_time_ms, fallback_reason,
+                          model, keywords_found, hallucination, validation_issues, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# '2026-10-19T14:03:27.123456' -> '2026-10-19 14:00' (HOUR_FORMAT der hourly_stats)
+HOUR_SQL = "substr(timestamp, 1, 10) || ' ' || substr(timestamp, 12, 2) || ':00'"
+
+DELETE_CHUNK = 10_000   # Zeilen pro Lösch-/Compaction-Transaktion
+
+
+def to_row(bot: str, log_entry: InteractionLog) -> Tuple:
+    return (
+        log_entry.timestamp,
+        bot,
+        log_entry.query,
+        int(log_entry.success),
+        log_entry.response_time_ms,
+        log_entry.fallback_reason,
+        log_entry.model_used,
+        len(log_entry.keywords_found),
+        int(is_hallucination(log_entry)),
+        json.dumps(log_entry.validation_issues, ensure_ascii=False) if log_entry.validation_issues else None,
+        json.dumps(asdict(log_entry), ensure_ascii=False),
+    )
+
+
+class InteractionStore:
+    """
+    SQLite-Historie aller Interactions mit gebündeltem Hintergrund-Writer
+    """
+
+    def __init__(
+        self,
+        db_file: str = INTERACTION_DB_FILE,
+        batch_size: int = INTERACTION_STORE_BATCH_SIZE,
+        flush_seconds: float = INTERACTION_STORE_FLUSH_SECONDS,
+        retention_days: int = INTERACTION_STORE_RETENTION_DAYS,
+        detail_days: int = INTERACTION_STORE_DETAIL_DAYS,
+        maintenance_hours: float = INTERACTION_STORE_MAINTENANCE_HOURS
+    ):
+        self.db_file = Path(db_file)
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.retention_days = retention_days
+        self.detail_days = detail_days
+        self.maintenance_seconds = maintenance_hours * 3600
+
+        # Writer-Verbindung: nur im Worker-Thread und unter _write_lock benutzt
+        self._conn = self._connect()
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+        self._write_lock = threading.Lock()
+
+        self._pending: List[Tuple[str, InteractionLog]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_maintenance = 0.0
+
+        self.stats = {
+            'inserted': 0,
+            'batches': 0,
+            'failures': 0,
+            'last_batch_ms': None,
+            'last_error': None,
+            'last_maintenance': None,
+        }
+
+    def _connect(self, readonly: bool = False) -> sqlite3.Connection:
+        if readonly:
+            conn = sqlite3.connect(f"{self.db_file.resolve().as_uri()}?mode=ro", uri=True)
+        else:
+            conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            # auto_vacuum greift nur bei neuer DB (vor der ersten Tabelle)
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA busy_timeout = 5000")
+        return conn
+
+    # ------------------------------------------------------------------
+    # Schreiben
+    # ------------------------------------------------------------------
+
+    def attach(self, monitoring, bot: str):
+        """Interactions dieses MonitoringSystems unter `bot` speichern"""
+        monitoring.store = self
+        monitoring.bot_name = bot
+
+    def add(self, bot: str, log_entry: InteractionLog):
+        """Nach jeder Interaction (Event-Loop): nur puffern, serialisiert wird in _write"""
+        self._pending.append((bot, log_entry))
+        if self._wakeup is not None and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def _write(self, entries: List[Tuple[str, InteractionLog]]):
+        rows = [to_row(bot, log_entry) for bot, log_entry in entries]
+        with self._write_lock, self._conn:
+            self._conn.executemany(INSERT, rows)
+
+    async def flush(self) -> int:
+        """
+        Puffer im Worker-Thread schreiben
+
+        Returns:
+            Anzahl geschriebener Interactions
+        """
+        if not self._pending:
+            return 0
+
+        rows, self._pending = self._pending, []
+        start = time.perf_counter()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, rows)
+        except Exception as e:
+            self._pending[:0] = rows
+            self.stats['failures'] += 1
+            self.stats['last_error'] = f"{type(e).__name__}: {e}"
+            logger.error(f"Failed to write interactions to {self.db_file}: {e}")
+            return 0
+
+        self.stats['inserted'] += len(rows)
+        self.stats['batches'] += 1
+        self.stats['last_batch_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        self.stats['last_error'] = None
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # Retention und Compaction
+    # ------------------------------------------------------------------
+
+    def maintain(self, now: Optional[datetime] = None) -> Dict:
+        """
+        Alte Interactions löschen, Details kürzen, Platz freigeben
+        (Worker-Thread; in Chunks, damit der Writer zwischendurch schreiben kann)
+        """
+        now = now or datetime.now()
+        retention_cutoff = (now - timedelta(days=self.retention_days)).isoformat()
+        detail_cutoff = (now - timedelta(days=self.detail_days)).isoformat()
+        start = time.perf_counter()
+
+        def chunked(sql: str, cutoff: str) -> int:
+            total = 0
+            while True:
+                with self._write_lock, self._conn:
+                    changed = self._conn.execute(sql, (cutoff, DELETE_CHUNK)).rowcount
+                total += changed
+                if changed < DELETE_CHUNK:
+                    return total
+
+        deleted = chunked(
+            "DELETE FROM interactions WHERE id IN "
+            "(SELECT id FROM interactions WHERE timestamp < ? LIMIT ?)",
+            retention_cutoff
+        )
+        compacted = chunked(
+            "UPDATE interactions SET data = NULL WHERE id IN "
+            "(SELECT id FROM interactions WHERE timestamp < ? AND data IS NOT NULL LIMIT ?)",
+            detail_cutoff
+        )
+        with self._write_lock:
+            # executescript läuft bis zum Ende; execute würde nur eine Seite freigeben
+            self._conn.executescript("PRAGMA incremental_vacuum;")
+            self._conn.execute("PRAGMA optimize")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        result = {
+            'deleted': deleted,
+            'compacted': compacted,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 1),
+            'at': now.isoformat(),
+        }
+        self.stats['last_maintenance'] = result
+        if deleted or compacted:
+            logger.info(f"🗄️ Interaction store maintenance: {deleted} deleted, {compacted} compacted "
+                        f"({result['duration_ms']} ms)")
+        return result
+
+    async def run(self):
+        """Writer-Schleife (läuft bis zum Abbruch des Tasks)"""
+        self._wakeup = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                if time.monotonic() - self._last_maintenance >= self.maintenance_seconds:
+                    self._last_maintenance = time.monotonic()
+                    await loop.run_in_executor(None, self.maintain)
+            except Exception as e:
+                logger.error(f"❌ Interaction store error: {e}", exc_info=True)
+
+    def start(self) -> asyncio.Task:
+        """Startet die Writer-Schleife als Task der laufenden Event-Loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        """Beendet die Schleife, schreibt den Rest und schließt die DB"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+        await self.flush()
+        with self._write_lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Abfragen (eigene Read-Verbindung, parallel zum Writer; blockierend -
+    # nicht aus dem Nachrichtenpfad aufrufen)
+    # ------------------------------------------------------------------
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        conn = self._connect(readonly=True)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _where(bot: Optional[str], since: Optional[datetime], *conditions: str) -> Tuple[str, Tuple]:
+        clauses, params = list(conditions), []
+        if bot is not None:
+            clauses.append("bot = ?")
+            params.append(bot)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since.isoformat())
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), tuple(params)
+
+    def problem_patterns(self, bot: Optional[str] = None, days: Optional[int] = None) -> Dict:
+        """
+        Problem-Patterns wie MonitoringSystem.get_problem_patterns, über die
+        gespeicherte Historie
+
+        Args:
+            bot: Nur dieser Bot (None = alle)
+            days: Nur die letzten N Tage (None = alles innerhalb der Retention)
+        """
+        since = datetime.now() - timedelta(days=days) if days else None
+        slow_threshold = ALERT_THRESHOLDS['slow_response_seconds'] * 1000
+
+        where, params = self._where(bot, since, "success = 0")
+        failed = self._query(
+            # Ohne ANALYZE-Statistik wählt SQLite sonst den größeren idx_interactions_slow
+            f"SELECT query, COUNT(*) AS n FROM interactions INDEXED BY idx_interactions_failed{where} "
+            f"GROUP BY query ORDER BY n DESC LIMIT 5",
+            params
+        )
+        where, params = self._where(bot, since, "response_time_ms > ?")
+        slowest = self._query(
+            f"SELECT substr(query, 1, 50), response_time_ms FROM interactions{where} "
+            f"ORDER BY response_time_ms DESC LIMIT 5",
+            (slow_threshold,) + params
+        )
+        where, params = self._where(bot, since, "fallback_reason IS NOT NULL")
+        fallbacks = self._query(
+            f"SELECT fallback_reason, COUNT(*) FROM interactions{where} GROUP BY fallback_reason",
+            params
+        )
+        where, params = self._where(bot, since, "validation_issues IS NOT NULL")
+        issues = self._query(
+            f"SELECT issue.value, COUNT(*) FROM interactions, json_each(interactions.validation_issues) AS issue"
+            f"{where} GROUP BY issue.value",
+            params
+        )
+
+        return {
+            'most_failed_queries': [tuple(row) for row in failed],
+            'slowest_queries': [tuple(row) for row in slowest],
+            'most_common_fallback_reasons': dict(fallbacks),
+            'most_common_validation_issues': dict(issues),
+        }
+
+    def hourly_report(self, bot: Optional[str] = None, hours: int = 24) -> Dict:
+        """Stündliche Statistik wie MonitoringSystem.hourly_stats, aus der Historie"""
+        now = datetime.now()
+        since = datetime.strptime(now.strftime(HOUR_FORMAT), HOUR_FORMAT) - timedelta(hours=hours)
+        where, params = self._where(bot, since)
+        rows = self._query(
+            f"SELECT {HOUR_SQL} AS hour, COUNT(*), SUM(1 - success), AVG(response_time_ms), "
+            f"SUM(hallucination) FROM interactions{where} GROUP BY hour ORDER BY hour",
+            params
+        )
+        return {
+            hour: {
+                'interactions': interactions,
+                'failures': failures,
+                'avg_response_time': avg_response_time,
+                'hallucinations': hallucinations,
+            }
+            for hour, interactions, failures, avg_response_time, hallucinations in rows
+        }
+
+    def count(self, bot: Optional[str] = None) -> int:
+        where, params = self._where(bot, None)
+        return self._query(f"SELECT COUNT(*) FROM interactions{where}", params)[0][0]
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'pending': len(self._pending), 'db_file': str(self.db_file)}
+
+
+async def test_interaction_store():
+    """Selbsttest: Interactions zweier Bots puffern, schreiben, abfragen, aufräumen"""
+    import tempfile
+    from monitoring import MonitoringSystem
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = InteractionStore(str(Path(tmp) / 'interactions.db'), batch_size=5, flush_seconds=60)
+        monitors = {}
+        for bot in ('Borgo-Bot-DEV', 'Borgo-Bot-TEST'):
+            monitors[bot] = MonitoringSystem(metrics_file=str(Path(tmp) / f'{bot}.json'))
+            store.attach(monitors[bot], bot)
+        store.start()
+        await asyncio.sleep(0)
+
+        now = datetime.now()
+        cases = [
+            ("Wie ist das WLAN-Passwort?", True, 2500.0, None, []),
+            ("Wann ist Check-out?", True, 3100.0, None, []),
+            ("Wie ist das Wetter morgen?", False, 1200.0, 'no_keywords', []),
+            ("Was kostet Pizza in Rom?", False, 42000.0, 'llm_failed', ["Possible hallucination: price"]),
+        ]
+        for i in range(12):
+            query, success, time_ms, reason, issues = cases[i % len(cases)]
+            bot = 'Borgo-Bot-DEV' if i % 3 else 'Borgo-Bot-TEST'
+            monitors[bot].log_interaction(InteractionLog(
+                timestamp=(now - timedelta(minutes=10 * i)).isoformat(), query=query,
+                query_length=len(query), keywords_found=[] if reason == 'no_keywords' else ['wifi'],
+                keywords_confidence='high', context_entries=1, context_words=50,
+                model_used=None if reason else 'mistral:instruct', response_length=100,
+                response_time_ms=time_ms, validation_issues=issues, fallback_used=bool(reason),
+                fallback_reason=reason, success=success,
+            ))
+        # Alte Interaction für Retention/Compaction
+        store.add('Borgo-Bot-DEV', InteractionLog(
+            timestamp=(now - timedelta(days=400)).isoformat(), query="Alt", query_length=3,
+            keywords_found=[], keywords_confidence='low', context_entries=0, context_words=0,
+            model_used=None, response_length=0, response_time_ms=100.0, validation_issues=[],
+            fallback_used=False, fallback_reason=None, success=True,
+        ))
+        await asyncio.sleep(0.2)
+
+        print("=" * 70)
+        print("INTERACTION STORE TESTS")
+        print("=" * 70)
+        print(f"  Batched: {store.stats['batches']} batches, {store.stats['inserted']} inserted, "
+              f"{len(store._pending)} pending")
+        await store.flush()
+        print(f"  Rows: {store.count()} total, {store.count('Borgo-Bot-DEV')} DEV")
+
+        patterns = monitors['Borgo-Bot-DEV'].get_problem_patterns()
+        print(f"  DEV failed queries:  {patterns['most_failed_queries']}")
+        print(f"  DEV fallback reasons: {patterns['most_common_fallback_reasons']}")
+        print(f"  All issues: {store.problem_patterns()['most_common_validation_issues']}")
+        print(f"  Hourly (DEV): {monitors['Borgo-Bot-DEV'].get_hourly_report(hours=3)}")
+
+        result = await asyncio.get_running_loop().run_in_executor(None, store.maintain)
+        print(f"  Maintenance: {result}")
+        plan = store._query(
+            "EXPLAIN QUERY PLAN SELECT fallback_reason, COUNT(*) FROM interactions "
+            "WHERE fallback_reason IS NOT NULL AND bot = ? GROUP BY fallback_reason", ('x',)
+        )
+        print(f"  Query plan: {[row[-1] for row in plan]}")
+        await store.stop()
+        print(f"\n  Stats: {store.get_stats()}")
+        print("=" * 70)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(test_interaction_store())
@@ -0,0 +1,209 @@
+"""
+Borgo-Bot - Binär-Cache für das KB-Lexikon
+Schneller Start ohne YAML-Parsen und Index-Bau
+
+Beim Laden wird der SHA-256 der YAML-Datei berechnet. Existiert dazu ein
+Cache-Eintrag, wird das fertige Lexikon (Entries, Synonym-Maps, Matcher,
+Fuzzy-/Komposita-/BM25-/Kategorie-/Passagen-Index, Context-Fragmente mit
+Token-Zahlen, Konflikt-Matrix) per pickle geladen. Sonst wird die YAML
+geparst (libyaml, falls vorhanden), das Lexikon gebaut und der Cache atomar
+neu geschrieben; veraltete Einträge derselben YAML werden entfernt. Wurden
+CONTEXT_MIXING_RULES, Token-Zähler oder der Quelltext der Module, die das
+Lexikon bauen (EXTRA_SYNONYMS, CATEGORY_HINTS, Stoppwörter, Stemming, ...),
+geändert, wird ebenfalls neu gebaut.
+
+Der Cache ist nur ein Beschleuniger: fehlt er, ist er beschädigt oder von
+einer anderen Code-/Python-Version, wird ohne ihn gebaut. Die Dateien
+schreibt und liest nur der Bot selbst (pickle - nicht aus fremden Quellen
+befüllen).
+"""
+
+import os
+import sys
+import time
+import pickle
+import hashlib
+import logging
+import importlib
+import functools
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from config_multi_bot import KB_BINARY_CACHE, KB_CACHE_DIR, CONTEXT_MIXING_RULES
+from token_counter import configured_token_counters
+from lexicon import (
+    KBLexicon,
+    KnowledgeBaseError,
+    build_lexicon,
+    lexicon_from_state,
+    lexicon_state,
+    parse_knowledge_base,
+    validate_knowledge_base,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bei Änderungen an KBLexicon oder den Index-Klassen erhöhen
+KB_CACHE_FORMAT = 5
+
+# Module, deren Konstanten und Code in das Lexikon eingehen (Quelltext im Cache-Schlüssel)
+LEXICON_MODULES = (
+    'lexicon',
+    'keyword_matcher',
+    'fuzzy_index',
+    'compound_index',
+    'bm25_index',
+    'category_index',
+    'conflict_matrix',
+    'passage_index',
+    'token_counter',
+)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@functools.lru_cache(maxsize=1)
+def code_fingerprint() -> str:
+    """SHA-256 über den Quelltext von LEXICON_MODULES (einmal pro Prozess)"""
+    digest = hashlib.sha256()
+    for name in LEXICON_MODULES:
+        digest.update(name.encode('utf-8'))
+        digest.update(Path(importlib.import_module(name).__file__).read_bytes())
+    return digest.hexdigest()
+
+
+def cache_path(yaml_path: Path, digest: str, cache_dir: Path) -> Path:
+    """Cache-Datei für einen YAML-Stand: <cache_dir>/<name>.<hash>.pickle"""
+    return Path(cache_dir) / f"{Path(yaml_path).stem}.{digest[:16]}.pickle"
+
+
+def _read_cache(path: Path, digest: str) -> Optional[KBLexicon]:
+    try:
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"⚠️ Ignoring unreadable KB cache {path.name}: {e}")
+        return None
+
+    try:
+        if (payload.get('format') != KB_CACHE_FORMAT
+                or payload.get('python') != tuple(sys.version_info[:2])
+                or payload.get('code') != code_fingerprint()
+                or payload.get('digest') != digest):
+            logger.info(f"KB cache {path.name} is from another version - rebuilding")
+            return None
+
+        lexicon = lexicon_from_state(payload['state'])
+    except Exception as e:
+        # Unerwartete Struktur (fremdes Pickle, fehlende Felder) wie beschädigt behandeln
+        logger.warning(f"⚠️ Ignoring malformed KB cache {path.name}: {e}")
+        return None
+    # Konfiguration geändert, YAML nicht
+    if not lexicon.conflicts.matches_rules(CONTEXT_MIXING_RULES):
+        logger.info(f"KB cache {path.name} has other CONTEXT_MIXING_RULES - rebuilding")
+        return None
+    if lexicon.token_counters != tuple(counter.name for counter in configured_token_counters()):
+        logger.info(f"KB cache {path.name} has other token counters - rebuilding")
+        return None
+    return lexicon
+
+
+def _write_cache(path: Path, yaml_path: Path, digest: str, lexicon: KBLexicon):
+    """Schreibt atomar (temp + rename) und entfernt ältere Stände derselben YAML"""
+    payload = {
+        'format': KB_CACHE_FORMAT,
+        'python': tuple(sys.version_info[:2]),
+        'code': code_fingerprint(),
+        'digest': digest,
+        'state': lexicon_state(lexicon),
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_name, path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+        for stale in path.parent.glob(f"{Path(yaml_path).stem}.*.pickle"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+    except Exception as e:
+        # Ohne Cache geht es weiter (z.B. read-only Deployment)
+        logger.warning(f"⚠️ Could not write KB cache {path}: {e}")
+
+
+def load_lexicon(
+    yaml_path: Path,
+    previous: Optional[KBLexicon] = None,
+    strict: bool = False,
+    cache_dir: Optional[Path] = None
+) -> KBLexicon:
+    """
+    Lexikon für eine YAML-Datei - aus dem Binär-Cache oder neu gebaut
+
+    Args:
+        previous: Bisheriges Lexikon (BM25-Index wird inkrementell abgeleitet)
+        strict: Lese-/Parse-/Strukturfehler weiterreichen (Reload) statt leerer KB
+        cache_dir: Cache-Verzeichnis (Standard: KB_CACHE_DIR)
+    """
+    start = time.perf_counter()
+    cache_dir = Path(cache_dir or KB_CACHE_DIR)
+
+    try:
+        raw = Path(yaml_path).read_bytes()
+    except OSError as e:
+        logger.error(f"❌ Failed to load YAML: {e}")
+        if strict:
+            raise
+        return build_lexicon({})
+
+    digest = content_hash(raw)
+    path = cache_path(yaml_path, digest, cache_dir)
+
+    if KB_BINARY_CACHE:
+        lexicon = _read_cache(path, digest)
+        if lexicon is not None:
+            logger.info(
+                f"⚡ KB cache hit: {path.name} ({len(lexicon.knowledge_base)} entries) "
+                f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+            )
+            return lexicon
+
+    try:
+        knowledge_base = parse_knowledge_base(raw.decode('utf-8'))
+    except Exception as e:
+        logger.error(f"❌ Failed to load YAML: {e}")
+        if strict:
+            raise
+        return build_lexicon({})
+
+    cacheable = KB_BINARY_CACHE
+    try:
+        validate_knowledge_base(knowledge_base)
+    except KnowledgeBaseError as e:
+        if strict:
+            logger.error(f"❌ Invalid knowledge base: {e}")
+            raise
+        # Beim Start wie bisher nutzen, was da ist - aber nicht cachen
+        logger.warning(f"⚠️ Invalid knowledge base, not cached: {e}")
+        knowledge_base = knowledge_base if isinstance(knowledge_base, dict) else {}
+        cacheable = False
+
+    lexicon = build_lexicon(knowledge_base, previous=previous)
+    if cacheable:
+        _write_cache(path, yaml_path, digest, lexicon)
+
+    logger.info(
+        f"✅ YAML loaded: {len(knowledge_base)} entries, lexicon built "
+        f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+    return lexicon
@@ -0,0 +1,197 @@
+"""
+Borgo-Bot - Hot-Reload der Knowledge Base
+Übernimmt Änderungen an der YAML ohne Neustart des Multi-Bot-Prozesses
+
+Ein Watcher pro KB-Snapshot (LexiconSource) pollt mtime und Größe der
+YAML-Datei. Bei einer Änderung:
+1. Warten, bis die Datei ein Intervall lang unverändert ist (Editoren und
+   scp schreiben in mehreren Schritten)
+2. Parsen, Validieren und Lexikon-Bau in einem Worker-Thread -
+   die Event-Loop beantwortet währenddessen weiter Nachrichten
+3. Austausch des Lexikons auf dem Event-Loop-Thread (eine Zuweisung);
+   versionsgebundene Caches (z.B. Keyword-LRU) verfallen damit
+
+Ungültige YAML wird geloggt und verworfen - der bisherige Stand bleibt aktiv,
+bis die Datei erneut geändert wird.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from config_multi_bot import KB_WATCH_INTERVAL_SECONDS
+from lexicon import LexiconSource
+
+logger = logging.getLogger(__name__)
+
+FileSignature = Tuple[int, int]     # (mtime_ns, Größe)
+
+
+def file_signature(path: Path) -> Optional[FileSignature]:
+    """mtime und Größe einer Datei (None, wenn sie gerade fehlt)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class KnowledgeBaseWatcher:
+    """
+    Überwacht die YAML-Datei eines LexiconSource und lädt sie bei Änderungen neu
+    """
+
+    def __init__(self, source: LexiconSource, interval_seconds: float = KB_WATCH_INTERVAL_SECONDS):
+        if source.yaml_path is None:
+            raise ValueError("KnowledgeBaseWatcher needs a LexiconSource with yaml_path")
+
+        self.source = source
+        self.path = Path(source.yaml_path)
+        self.interval_seconds = interval_seconds
+
+        self._loaded = file_signature(self.path)    # Stand des aktiven Lexikons
+        self._pending: Optional[FileSignature] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            'checks': 0,
+            'reloads': 0,
+            'failures': 0,
+            'last_reload_ms': None,
+            'last_error': None,
+        }
+
+    async def check(self) -> bool:
+        """
+        Ein Polling-Schritt
+
+        Returns:
+            True, wenn ein neues Lexikon aktiviert wurde
+        """
+        self.stats['checks'] += 1
+        signature = file_signature(self.path)
+
+        if signature is None or signature == self._loaded:
+            self._pending = None
+            return False
+
+        if signature != self._pending:
+            # Erste Sichtung bzw. Datei ändert sich noch - nächsten Tick abwarten
+            self._pending = signature
+            return False
+
+        self._pending = None
+        self._loaded = signature
+        return await self.reload()
+
+    async def reload(self) -> bool:
+        """
+        Baut das neue Lexikon im Worker-Thread und tauscht es auf der Event-Loop aus
+
+        Returns:
+            True bei Erfolg, False wenn die neue YAML verworfen wurde
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+
+        try:
+            lexicon = await loop.run_in_executor(None, self.source.load_next)
+        except Exception as e:
+            self.stats['failures'] += 1
+            self.stats['last_error'] = f"{type(e).__name__}: {e}"
+            logger.error(
+                f"❌ KB reload failed for {self.path.name} - keeping lexicon "
+                f"v{self.source.current.version}: {self.stats['last_error']}"
+            )
+            return False
+
+        previous = self.source.swap(lexicon)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.stats['reloads'] += 1
+        self.stats['last_reload_ms'] = round(elapsed_ms, 1)
+        self.stats['last_error'] = None
+        logger.info(
+            f"🔄 KB reloaded: {self.path.name} lexicon v{previous.version} -> v{lexicon.version} "
+            f"({len(previous.knowledge_base)} -> {len(lexicon.knowledge_base)} entries) "
+            f"in {elapsed_ms:.0f} ms"
+        )
+        return True
+
+    async def run(self):
+        """Polling-Schleife (läuft bis zum Abbruch des Tasks)"""
+        logger.info(f"👀 Watching {self.path} for changes (every {self.interval_seconds:g}s)")
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"❌ KB watcher error for {self.path.name}: {e}", exc_info=True)
+
+    def start(self) -> asyncio.Task:
+        """Startet die Polling-Schleife als Task der laufenden Event-Loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'path': str(self.path), 'lexicon_version': self.source.current.version}
+
+
+async def test_kb_watcher():
+    """Selbsttest: Kopie der KB ändern, kaputt machen und wieder reparieren"""
+    import shutil
+    import tempfile
+    from lexicon import build_lexicon, load_knowledge_base
+    from config_multi_bot import YAML_DB_PATH
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'kb.yaml'
+        shutil.copy(YAML_DB_PATH, path)
+        source = LexiconSource(build_lexicon(load_knowledge_base(path)), path)
+        watcher = KnowledgeBaseWatcher(source, interval_seconds=0.05)
+
+        async def settle():
+            # Erste Sichtung + ein stabiles Intervall
+            for _ in range(2):
+                await watcher.check()
+
+        original = path.read_text(encoding='utf-8')
+
+        print("=" * 70)
+        print("KB WATCHER TESTS")
+        print("=" * 70)
+
+        path.write_text(original + "\ntestentry:\n  category: basics\n  answer: Nur ein Test\n", encoding='utf-8')
+        await settle()
+        print(f"  Entry added:   v{source.current.version}, "
+              f"'testentry' in KB: {'testentry' in source.current.knowledge_base}")
+
+        path.write_text(original + "\nkaputt: [\n", encoding='utf-8')
+        await settle()
+        print(f"  Invalid YAML:  v{source.current.version} still active, error: {watcher.stats['last_error'].splitlines()[0]}")
+
+        path.write_text(original, encoding='utf-8')
+        await settle()
+        print(f"  Repaired:      v{source.current.version}, "
+              f"'testentry' in KB: {'testentry' in source.current.knowledge_base}")
+
+        print(f"\n  Stats: {watcher.get_stats()}")
+        print("=" * 70)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(test_kb_watcher())
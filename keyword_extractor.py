@@ -4,19 +4,35 @@ Phase 2: Intelligente Keyword-Extraktion mit Confidence-Scoring
 """
 
 import re
+import time
 import logging
-from typing import List, Dict, Set, Tuple, Optional
-from difflib import SequenceMatcher
-from collections import defaultdict
+from typing import List, Dict, Set, Tuple, Optional, FrozenSet
+from collections import OrderedDict
 
 from config_multi_bot import (
     KEYWORD_CONFIDENCE,
     FUZZY_MATCH_THRESHOLD,
-    MIN_KEYWORDS_REQUIRED
+    MIN_KEYWORDS_REQUIRED,
+    KEYWORD_CACHE_SIZE,
+    CATEGORY_MIN_SCORE
 )
+from lexicon import LexiconSource, KBLexicon, MATCH_DIRECT
+from compound_index import MIN_COMPOUND_PART, MAX_CACHED_TOKENS
+from fuzzy_index import normalize_threshold
 
 logger = logging.getLogger(__name__)
 
+# Zeichen, die am Query-Rand keinen Einfluss auf Treffer haben
+QUERY_EDGE_CHARS = ' ?!.,;:"\'()'
+
+
+def normalize_query(query: str) -> str:
+    """
+    Cache-Key einer Query: lowercase, Whitespace zusammengefasst,
+    Satzzeichen am Rand entfernt ("WLAN Passwort?" == "wlan  passwort")
+    """
+    return ' '.join(query.lower().split()).strip(QUERY_EDGE_CHARS)
+
 
 class KeywordExtractor:
     """
@@ -24,66 +40,130 @@ class KeywordExtractor:
     Verwendet Fuzzy-Matching für ähnliche Begriffe
     """
     
-    def __init__(self, yaml_keywords: Set[str]):
+    def __init__(
+        self,
+        yaml_keywords: Optional[Set[str]] = None,
+        lexicon: Optional[LexiconSource] = None,
+        cache_size: int = KEYWORD_CACHE_SIZE
+    ):
         """
         Args:
             yaml_keywords: Set aller verfügbaren Keywords aus YAML-DB
+            lexicon: Geteiltes KB-Lexikon (hat Vorrang vor yaml_keywords)
+            cache_size: Max. gemerkte Queries (0 = Cache aus)
         """
-        self.yaml_keywords = set(k.lower() for k in yaml_keywords)
+        self.lexicon_source = lexicon or LexiconSource.from_keywords(yaml_keywords or set())
         self.stats = {
             'extractions': 0,
             'high_confidence': 0,
             'medium_confidence': 0,
             'low_confidence': 0,
             'no_keywords': 0,
+            'morphology_matches': 0,
         }
         
-        # Synonym-Mapping für besseres Matching
-        self.synonyms = self._build_synonym_map()
-    
-    def _build_synonym_map(self) -> Dict[str, Set[str]]:
-        """
-        Erstellt Synonym-Mapping für häufige Begriffe
-        Hilft bei verschiedenen Formulierungen
-        """
-        return {
-            'wlan': {'wifi', 'internet', 'w-lan', 'netzwerk', 'wlan-passwort', 'wifi-passwort'},
-            'pizza': {'pizzaofen', 'pizza-ofen', 'ofen', 'backen'},
-            'pizzaofen': {'pizza', 'ofen', 'backen'},
-            'hunde': {'hund', 'dogs', 'dog', 'haustier', 'haustiere', 'vierbeiner', 'tier', 'tiere'},
-            'schlangen': {'schlange', 'viper', 'vipern', 'reptil', 'reptilien'},
-            'müll': {'abfall', 'recycling', 'mülltrennung', 'entsorgung', 'trash', 'garbage'},
-            'notfall': {'notfälle', 'emergency', 'hilfe', 'sos', 'dringend', 'notruf'},
-            'wasser': {'warmwasser', 'kaltwasser', 'trinkwasser', 'dusche'},
-            'heizung': {'heizen', 'temperatur', 'warm', 'kalt', 'thermostat'},
-            'strom': {'elektrizität', 'energie', 'sicherung', 'stromausfall'},
-            'checkout': {'check-out', 'abreise', 'departure', 'auschecken'},
-            'anreise': {'check-in', 'checkin', 'arrival', 'ankommen', 'ankunft'},
-            'pool': {'schwimmbad', 'swimming', 'baden', 'schwimmen'},
+        # Schwelle für Tippfehler immer als Ratio 0-1
+        self.fuzzy_threshold = normalize_threshold(FUZZY_MATCH_THRESHOLD)
+        
+        # LRU: normalisierte Query -> Extraktion (gilt nur für _cache_version)
+        self.cache_size = max(0, cache_size)
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_version: Optional[int] = None
+        self.cache_stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+            'hits_time_ms': 0.0,
+            'misses_time_ms': 0.0,
         }
+        
+        # Komposita/Flexion: Token -> Keywords pro Extractor (das Lexikon bleibt unverändert)
+        self._token_memo: Dict[str, FrozenSet[str]] = {}
+        self._token_memo_version: Optional[int] = None
+        self.morphology_stats = {
+            'lookups': 0,
+            'memo_hits': 0,
+            'inflection_hits': 0,
+            'compound_hits': 0,
+        }
+    
+    # Alles Lexikalische kommt aus dem aktuellen (unveränderlichen) Lexikon
+    
+    @property
+    def lexicon(self) -> KBLexicon:
+        return self.lexicon_source.current
+    
+    @property
+    def yaml_keywords(self) -> FrozenSet[str]:
+        return self.lexicon.keywords
+    
+    @property
+    def synonyms(self):
+        """Keyword -> ergänzende Synonyme"""
+        return self.lexicon.synonyms
+    
+    @property
+    def matcher(self):
+        """Ein Automat für Keywords UND Synonyme (ein Durchlauf pro Query)"""
+        return self.lexicon.keyword_matcher
+    
+    @property
+    def fuzzy_index(self):
+        """Trigramm-Index für Tippfehler"""
+        return self.lexicon.fuzzy_index
+    
+    @property
+    def compound_index(self):
+        """Flexion + Komposita ("Hundeleine" -> hunde)"""
+        return self.lexicon.compound_index
     
     def extract(self, query: str) -> Dict[str, any]:
         """
         Hauptmethode: Extrahiert Keywords mit Confidence
         
+        Wiederholte Fragen ("wlan passwort", "müll") kommen aus dem LRU-Cache.
+        Der Cache-Key enthält die Lexikon-Version - ein KB-Reload macht
+        alle Einträge ungültig.
+        
         Returns:
             Dict mit 'high', 'medium', 'low' confidence Keywords
             und Metadaten
         """
         self.stats['extractions'] += 1
+        start = time.perf_counter()
         
-        query_lower = query.lower()
+        # Matching läuft immer auf der normalisierten Query - so hängt das
+        # Ergebnis nur vom Cache-Key ab
+        key = normalize_query(query)
         
-        # 1. Direkte Matches (High Confidence)
-        high = self._find_direct_matches(query_lower)
+        extraction = None
+        if self.cache_size:
+            lexicon_version = self.lexicon.version
+            if lexicon_version != self._cache_version:
+                if self._cache:
+                    self.cache_stats['invalidations'] += 1
+                self._cache.clear()
+                self._cache_version = lexicon_version
+            
+            extraction = self._cache.get(key)
+            if extraction is not None:
+                self._cache.move_to_end(key)
         
-        # 2. Synonym-Matches (High->Medium Confidence)
-        medium = self._find_synonym_matches(query_lower, exclude=high)
+        cache_hit = extraction is not None
+        if not cache_hit:
+            extraction = self._extract_uncached(key)
+            if self.cache_size:
+                self._cache[key] = extraction
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+                    self.cache_stats['evictions'] += 1
         
-        # 3. Fuzzy-Matches (Medium->Low Confidence)
-        low = self._find_fuzzy_matches(query_lower, exclude=high.union(medium))
+        high, medium, low, morphology = extraction
         
-        # Statistiken updaten
+        # Statistiken updaten (auch bei Cache-Treffern)
+        if morphology:
+            self.stats['morphology_matches'] += 1
         if high:
             self.stats['high_confidence'] += 1
         if medium:
@@ -94,81 +174,139 @@ class KeywordExtractor:
             self.stats['no_keywords'] += 1
         
         result = {
-            'high': sorted(high),
-            'medium': sorted(medium),
-            'low': sorted(low),
-            'all': sorted(high.union(medium).union(low)),
+            'high': list(high),
+            'medium': list(medium),
+            'low': list(low),
+            'all': sorted(set(high).union(medium).union(low)),
             'confidence_level': self._determine_overall_confidence(high, medium, low),
             'query': query
         }
         
-        logger.info(f"🔍 Keywords extracted: High={len(high)}, Med={len(medium)}, Low={len(low)}")
+        if self.cache_size:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            bucket = 'hits' if cache_hit else 'misses'
+            self.cache_stats[bucket] += 1
+            self.cache_stats[f'{bucket}_time_ms'] += elapsed_ms
+        
+        logger.info(
+            f"🔍 Keywords extracted: High={len(high)}, Med={len(medium)}, Low={len(low)}"
+            f"{' (cached)' if cache_hit else ''}",
+            extra={'sample': 'keywords'}
+        )
         logger.debug(f"   Keywords: {result['all']}")
         
         return result
     
-    def _find_direct_matches(self, query: str) -> Set[str]:
-        """Findet exakte Keyword-Matches in der Query"""
-        matches = set()
+    def extract_tiers(self, query: str) -> Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]:
+        """
+        Keywords pro Confidence-Stufe ohne LRU-Cache und Stats (Batch-Auswertungen)
+        
+        Returns:
+            (high, medium, low) - gleiche Treffer wie extract()
+        """
+        high, medium, low, _ = self._extract_uncached(normalize_query(query))
+        return high, medium, low
+    
+    def _extract_uncached(
+        self,
+        query_lower: str
+    ) -> Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...], bool]:
+        """
+        Führt alle Matching-Stufen aus
         
-        for keyword in self.yaml_keywords:
-            # Wort-Grenzen beachten für präzises Matching
-            pattern = r'\b' + re.escape(keyword) + r'\b'
-            if re.search(pattern, query):
-                matches.add(keyword)
+        Returns:
+            (high, medium, low, morphology_used) - sortiert und unveränderlich (cachebar)
+        """
+        # 1.+2. Direkte Matches (High) und Synonym-Matches (Medium) in einem Durchlauf
+        high, medium = self._find_lexicon_matches(query_lower)
         
-        return matches
+        # 3. Wortformen und Komposita (Medium Confidence)
+        morphology = self._find_morphology_matches(query_lower, exclude=high.union(medium))
+        medium |= morphology
+        
+        # 4. Fuzzy-Matches (Medium->Low Confidence)
+        low = self._find_fuzzy_matches(query_lower, exclude=high.union(medium))
+        
+        return tuple(sorted(high)), tuple(sorted(medium)), tuple(sorted(low)), bool(morphology)
     
-    def _find_synonym_matches(self, query: str, exclude: Set[str]) -> Set[str]:
+    def _find_lexicon_matches(self, query: str) -> Tuple[Set[str], Set[str]]:
         """
-        Findet Keywords über Synonyme
+        Findet exakte Keyword-Matches und Keywords über Synonyme
         Wenn "wifi" in Query, finde "wlan" keyword
+        
+        Returns:
+            (direkte Matches, Synonym-Matches ohne direkte Matches)
+        """
+        direct = set()
+        via_synonym = set()
+        
+        # Wort-Grenzen werden im Matcher geprüft (wie Regex \b)
+        for start, end, values in self.matcher.find_all(query):
+            for kind, keyword in values:
+                if kind == MATCH_DIRECT:
+                    direct.add(keyword)
+                else:
+                    via_synonym.add(keyword)
+                    logger.debug(f"Synonym match: '{query[start:end]}' -> '{keyword}'")
+        
+        return direct, via_synonym - direct
+    
+    def _find_morphology_matches(self, query: str, exclude: Set[str]) -> Set[str]:
+        """
+        Findet Keywords in flektierten Formen und Komposita
+        "Mülltonnen" -> müll, "Pizzaofenreinigung" -> pizzaofen
         """
         matches = set()
+        query_words = set(re.findall(r'\b\w{%d,}\b' % MIN_COMPOUND_PART, query))
         
-        for base_keyword, synonyms in self.synonyms.items():
-            # Skip wenn base_keyword schon gefunden
-            if base_keyword in exclude:
-                continue
-            
-            # Prüfe ob base_keyword in YAML existiert
-            if base_keyword not in self.yaml_keywords:
-                continue
-            
-            # Prüfe Synonyme
-            for synonym in synonyms:
-                pattern = r'\b' + re.escape(synonym) + r'\b'
-                if re.search(pattern, query):
-                    matches.add(base_keyword)
-                    logger.debug(f"Synonym match: '{synonym}' -> '{base_keyword}'")
-                    break
+        for query_word in query_words:
+            keywords = self._resolve_token(query_word)
+            new_keywords = keywords - exclude
+            if new_keywords:
+                matches.update(new_keywords)
+                logger.debug(f"Morphology match: '{query_word}' -> {sorted(new_keywords)}")
         
         return matches
     
+    def _resolve_token(self, token: str) -> FrozenSet[str]:
+        """CompoundIndex-Lookup, pro Lexikon-Version gemerkt"""
+        self.morphology_stats['lookups'] += 1
+        
+        lexicon = self.lexicon
+        if lexicon.version != self._token_memo_version:
+            self._token_memo.clear()
+            self._token_memo_version = lexicon.version
+        
+        keywords = self._token_memo.get(token)
+        if keywords is not None:
+            self.morphology_stats['memo_hits'] += 1
+            return keywords
+        
+        kind, keywords = lexicon.compound_index.resolve(token)
+        if kind is not None:
+            self.morphology_stats[f'{kind}_hits'] += 1
+        
+        if len(self._token_memo) >= MAX_CACHED_TOKENS:
+            self._token_memo.clear()
+        self._token_memo[token] = keywords
+        return keywords
+    
     def _find_fuzzy_matches(self, query: str, exclude: Set[str]) -> Set[str]:
         """
         Findet ähnliche Keywords via Fuzzy-Matching
         Hilft bei Tippfehlern und Variationen
+        
+        Kandidaten kommen aus dem Trigramm-Index, nur diese werden
+        exakt mit SequenceMatcher bewertet.
         """
         matches = set()
         query_words = set(re.findall(r'\b\w{4,}\b', query))  # Mindestens 4 Buchstaben
         
         for query_word in query_words:
-            best_match = None
-            best_score = 0
+            best = self.fuzzy_index.best_match(query_word, self.fuzzy_threshold, exclude)
             
-            for keyword in self.yaml_keywords:
-                if keyword in exclude:
-                    continue
-                
-                # Berechne Ähnlichkeit
-                score = SequenceMatcher(None, query_word, keyword).ratio()
-                
-                if score > best_score and score >= FUZZY_MATCH_THRESHOLD:
-                    best_score = score
-                    best_match = keyword
-            
-            if best_match:
+            if best:
+                best_match, best_score = best
                 matches.add(best_match)
                 logger.debug(f"Fuzzy match: '{query_word}' -> '{best_match}' (score: {best_score:.2f})")
         
@@ -228,7 +366,7 @@ class KeywordExtractor:
     def get_stats(self) -> Dict:
         """Gibt Extraktions-Statistiken zurück"""
         if self.stats['extractions'] == 0:
-            return self.stats
+            return {**self.stats, 'cache': self.get_cache_stats(), 'morphology': dict(self.morphology_stats)}
         
         total = self.stats['extractions']
         return {
@@ -237,7 +375,35 @@ class KeywordExtractor:
             'medium_rate_percent': round((self.stats['medium_confidence'] / total) * 100, 2),
             'low_rate_percent': round((self.stats['low_confidence'] / total) * 100, 2),
             'no_keywords_rate_percent': round((self.stats['no_keywords'] / total) * 100, 2),
+            'cache': self.get_cache_stats(),
+            'morphology': dict(self.morphology_stats),
         }
+    
+    def get_cache_stats(self) -> Dict:
+        """Hit-Rate und Zeiten des Extraktions-Caches"""
+        if not self.cache_size:
+            return {'enabled': False}
+        
+        hits = self.cache_stats['hits']
+        misses = self.cache_stats['misses']
+        lookups = hits + misses
+        return {
+            'enabled': True,
+            'size': len(self._cache),
+            'max_size': self.cache_size,
+            'hits': hits,
+            'misses': misses,
+            'evictions': self.cache_stats['evictions'],
+            'invalidations': self.cache_stats['invalidations'],
+            'hit_rate_percent': round(hits / lookups * 100, 2) if lookups else 0.0,
+            'avg_hit_ms': round(self.cache_stats['hits_time_ms'] / hits, 4) if hits else 0.0,
+            'avg_miss_ms': round(self.cache_stats['misses_time_ms'] / misses, 4) if misses else 0.0,
+        }
+    
+    def clear_cache(self):
+        """Leert den Extraktions-Cache (z.B. nach Synonym-Änderungen)"""
+        self._cache.clear()
+        self._token_memo.clear()
 
 
 class CategoryMatcher:
@@ -246,38 +412,56 @@ class CategoryMatcher:
     Wird verwendet wenn keine Keywords gefunden
     """
     
-    def __init__(self):
-        # Kategorie -> typische Begriffe Mapping
-        self.category_patterns = {
-            'facilities': ['ofen', 'pizza', 'küche', 'waschmaschine', 'pool'],
-            'safety': ['notfall', 'feuer', 'schlange', 'viper', 'gefahr', 'krankenhaus'],
-            'basics': ['wlan', 'wifi', 'internet', 'passwort', 'ankunft', 'check'],
-            'rules': ['erlaubt', 'verboten', 'regel', 'verhalten', 'hund', 'lärm'],
-            'contact': ['onsite', 'gruppe', 'kontakt', 'telefon', 'hilfe'],
-            'faq': ['wie', 'was', 'wann', 'wo', 'warum'],
-        }
+    def __init__(self, lexicon: Optional[LexiconSource] = None):
+        """
+        Args:
+            lexicon: Geteiltes KB-Lexikon (Kategorie-Index)
+        """
+        self.lexicon_source = lexicon or LexiconSource.from_keywords(set())
+    
+    @property
+    def category_patterns(self) -> Dict[str, Tuple[str, ...]]:
+        """Kategorie -> ergänzende Hinweis-Begriffe"""
+        return self.lexicon_source.current.category_hints
     
-    def find_category(self, query: str) -> Optional[str]:
+    def rank_categories(self, query: str, top_k: int = 3) -> List[Tuple[str, float]]:
         """
-        Findet beste Kategorie für Query
+        Kategorie-Scores für Query (Token -> Kategorie-Gewichte aus der KB)
+        
+        Returns:
+            Liste (Kategorie, Score), bester zuerst
+        """
+        return self.lexicon_source.current.category_index.score(query, top_k=top_k)
+    
+    def match_category(
+        self,
+        query: str,
+        min_score: float = CATEGORY_MIN_SCORE,
+        top_k: int = 3
+    ) -> Tuple[Optional[str], List[Tuple[str, float]]]:
+        """
+        Beste Kategorie plus Ranking aus einem rank_categories-Aufruf
         
         Returns:
-            Kategorie-Name oder None
+            (Kategorie-Name oder None (kein Score >= min_score), Ranking)
         """
-        query_lower = query.lower()
-        scores = defaultdict(int)
+        ranked = self.rank_categories(query, top_k=top_k)
         
-        for category, patterns in self.category_patterns.items():
-            for pattern in patterns:
-                if pattern in query_lower:
-                    scores[category] += 1
+        if ranked and ranked[0][1] >= min_score:
+            category, score = ranked[0]
+            logger.info(f"Category matched: '{category}' (score: {score:.2f})", extra={'sample': 'keywords'})
+            return category, ranked
         
-        if scores:
-            best_category = max(scores.items(), key=lambda x: x[1])
-            logger.info(f"Category matched: '{best_category[0]}' (score: {best_category[1]})")
-            return best_category[0]
+        return None, ranked
+    
+    def find_category(self, query: str, min_score: float = CATEGORY_MIN_SCORE) -> Optional[str]:
+        """
+        Findet beste Kategorie für Query
         
-        return None
+        Returns:
+            Kategorie-Name oder None (kein Score >= min_score)
+        """
+        return self.match_category(query, min_score, top_k=1)[0]
 
 
 # ========================================
@@ -303,10 +487,13 @@ def test_extractor():
         "Ich habe eine Schlange gesehen",
         "Wie viel Mehl für Pizza?",
         "WiFi Passwort?",  # Synonym-Test
+        "wifi passwort",  # Cache-Test (gleicher Key wie "WiFi Passwort?")
         "Gibt es einen Pool?",
         "Notfall - Feuer!",
         "Wann ist Check-in?",
         "Wie funktioniert die Heitzung?",  # Fuzzy-Test (Tippfehler)
+        "Wo stehen die Mülltonnen?",  # Kompositum
+        "Brauchen wir eine Hundeleine?",  # Kompositum
         "Blablabla nonsense",  # Kein Match
     ]
     
@@ -334,8 +521,8 @@ def test_extractor():
         
         # Category-Fallback wenn keine Keywords
         if not result['all']:
-            category = matcher.find_category(query)
-            print(f"   📁 Category Fallback: {category}")
+            ranked = matcher.rank_categories(query)
+            print(f"   📁 Category Fallback: {matcher.find_category(query)} {ranked}")
     
     # Statistiken
     print("\n" + "=" * 70)
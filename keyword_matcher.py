@@ -0,0 +1,144 @@
+"""
+Borgo-Bot - Multi-Pattern Keyword Matcher
+Aho-Corasick-Automat mit Wortgrenzen-Prüfung (Semantik wie Regex \\b)
+
+Wird einmal aus dem KB-Lexikon gebaut und findet alle Keyword- und
+Synonym-Treffer in einem einzigen Durchlauf über die Query. Die Kosten pro
+Query hängen von der Query-Länge ab, nicht von der Größe der Knowledge Base.
+"""
+
+import logging
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def is_word_char(char: str) -> bool:
+    """Wortzeichen im Sinne von Regex \\w (Unicode)"""
+    return char.isalnum() or char == '_'
+
+
+def has_word_boundary(text: str, index: int) -> bool:
+    """
+    Prüft ob an Position index eine Wortgrenze liegt (wie Regex \\b)
+
+    Eine Grenze liegt vor, wenn genau eines der Nachbarzeichen
+    (text[index - 1], text[index]) ein Wortzeichen ist.
+    """
+    before = index > 0 and is_word_char(text[index - 1])
+    after = index < len(text) and is_word_char(text[index])
+    return before != after
+
+
+class AhoCorasickMatcher:
+    """
+    Kompilierter Multi-Pattern-Matcher
+
+    Jedes Pattern ist mit einer Menge von Werten verknüpft (z.B. dem
+    KB-Keyword, zu dem ein Synonym gehört). Treffer zählen nur, wenn sie
+    an beiden Enden auf einer Wortgrenze liegen - genau wie
+    re.search(r'\\b' + re.escape(pattern) + r'\\b', text).
+    Mit word_boundaries=False zählt jedes Vorkommen (wie `pattern in text`).
+    """
+
+    def __init__(self, patterns: Dict[str, Iterable[Hashable]], word_boundaries: bool = True):
+        """
+        Args:
+            patterns: Mapping Pattern (bereits lowercase) -> zugehörige Werte
+            word_boundaries: Treffer nur an Wortgrenzen (Standard)
+        """
+        self.word_boundaries = word_boundaries
+        # Zustand 0 ist die Wurzel
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Pro Zustand: Liste von (Pattern-Länge, Werte) der hier endenden Patterns
+        self._output: List[List[Tuple[int, frozenset]]] = [[]]
+        self.pattern_count = 0
+
+        for pattern, values in patterns.items():
+            if pattern:
+                self._add(pattern, frozenset(values))
+
+        self._build_failure_links()
+        logger.debug(
+            f"Aho-Corasick matcher built: {self.pattern_count} patterns, "
+            f"{len(self._goto)} states"
+        )
+
+    @classmethod
+    def from_keywords(cls, keywords: Iterable[str], word_boundaries: bool = True) -> 'AhoCorasickMatcher':
+        """Matcher, bei dem jedes Keyword auf sich selbst zeigt"""
+        return cls({keyword: (keyword,) for keyword in keywords}, word_boundaries)
+
+    def _add(self, pattern: str, values: frozenset):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(pattern), values))
+        self.pattern_count += 1
+
+    def _build_failure_links(self):
+        """Breitensuche: Failure-Links setzen und Outputs vererben"""
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+
+                # Suffix-Treffer direkt mitnehmen (Dictionary-Suffix-Links flach)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, frozenset]]:
+        """
+        Findet alle Treffer (mit Wortgrenzen, falls aktiv) in einem Durchlauf
+
+        Returns:
+            Liste von (start, end, werte)
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        check_boundaries = self.word_boundaries
+
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            if not output[state]:
+                continue
+
+            end = index + 1
+            if check_boundaries and not has_word_boundary(text, end):
+                continue
+
+            for length, values in output[state]:
+                start = end - length
+                if not check_boundaries or has_word_boundary(text, start):
+                    matches.append((start, end, values))
+
+        return matches
+
+    def find_values(self, text: str) -> Set[Hashable]:
+        """Vereinigung der Werte aller Treffer"""
+        found = set()
+        for _, _, values in self.find_all(text):
+            found.update(values)
+        return found
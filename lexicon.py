@@ -0,0 +1,451 @@
+"""
+Borgo-Bot - Gemeinsames KB-Lexikon
+Ein unveränderliches Lexikon pro Knowledge Base für alle Komponenten
+
+KeywordExtractor, ContextManager, FallbackSystem und CategoryMatcher lesen
+Begriffe, Synonyme und Kategorien aus demselben KBLexicon. Es wird einmal
+beim Laden der YAML gebaut (inkl. kompilierter Matcher und Indizes) und
+von allen Bots mit derselben yaml_path geteilt (Registry pro aufgelöstem
+Pfad); Bots mit verschiedenen YAML-Dateien bleiben getrennt. Die Entries
+sind eingefroren (read-only Mappings, Tupel statt Listen), damit kein Bot
+den geteilten Stand verändern kann. Ein Reload baut ein neues Lexikon und
+tauscht es mit einer einzigen Zuweisung aus.
+"""
+
+import time
+import itertools
+import logging
+from dataclasses import dataclass, fields
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, Mapping, Optional, Tuple
+
+import yaml
+
+from keyword_matcher import AhoCorasickMatcher
+from fuzzy_index import TrigramIndex
+from compound_index import CompoundIndex
+from bm25_index import BM25Index, knowledge_base_documents
+from category_index import CategoryIndex
+from conflict_matrix import ConflictMatrix
+from passage_index import PassageIndex
+from config_multi_bot import CONTEXT_MIXING_RULES
+from token_counter import TokenCounter, configured_token_counters
+
+logger = logging.getLogger(__name__)
+
+# Treffer-Arten im kompilierten Keyword-Matcher
+MATCH_DIRECT = 'direct'
+MATCH_SYNONYM = 'synonym'
+
+# ========================================
+# ERGÄNZENDE BEGRIFFE (nicht in der YAML)
+# ========================================
+
+# Zusätzliche Synonyme für KB-Keywords (Medium Confidence im KeywordExtractor)
+EXTRA_SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    'wlan': ('wifi', 'internet', 'w-lan', 'netzwerk', 'wlan-passwort', 'wifi-passwort'),
+    'pizza': ('pizzaofen', 'pizza-ofen', 'ofen', 'backen'),
+    'pizzaofen': ('pizza', 'ofen', 'backen'),
+    'hunde': ('hund', 'dogs', 'dog', 'haustier', 'haustiere', 'vierbeiner', 'tier', 'tiere'),
+    'schlangen': ('schlange', 'viper', 'vipern', 'reptil', 'reptilien'),
+    'müll': ('abfall', 'recycling', 'mülltrennung', 'entsorgung', 'trash', 'garbage'),
+    'notfall': ('notfälle', 'emergency', 'hilfe', 'sos', 'dringend', 'notruf'),
+    'wasser': ('warmwasser', 'kaltwasser', 'trinkwasser', 'dusche'),
+    'heizung': ('heizen', 'temperatur', 'warm', 'kalt', 'thermostat'),
+    'strom': ('elektrizität', 'energie', 'sicherung', 'stromausfall'),
+    'checkout': ('check-out', 'abreise', 'departure', 'auschecken'),
+    'anreise': ('check-in', 'checkin', 'arrival', 'ankommen', 'ankunft'),
+    'pool': ('schwimmbad', 'swimming', 'baden', 'schwimmen'),
+}
+
+# Kategorie -> typische Begriffe (ergänzen das KB-Vokabular im CategoryIndex)
+# Fragewörter ('wie', 'wo', ...) gehören nicht hierher - sie passen auf jede Frage
+CATEGORY_HINTS: Dict[str, Tuple[str, ...]] = {
+    'facilities': ('ofen', 'pizza', 'küche', 'waschmaschine', 'pool'),
+    'safety': ('notfall', 'feuer', 'schlange', 'viper', 'gefahr', 'krankenhaus'),
+    'basics': ('wlan', 'wifi', 'internet', 'passwort', 'ankunft', 'check'),
+    'rules': ('erlaubt', 'verboten', 'regel', 'verhalten', 'hund', 'lärm'),
+    'contact': ('onsite', 'gruppe', 'kontakt', 'telefon', 'hilfe'),
+}
+
+# Fallback-Topic -> Begriffe (FallbackSystem, Teilstring-Treffer, erstes Topic gewinnt)
+FALLBACK_TOPIC_TERMS: Dict[str, Tuple[str, ...]] = {
+    'wlan': ('wlan', 'wifi', 'internet', 'w-lan', 'passwort'),
+    'pizza': ('pizza', 'ofen', 'pizzaofen', 'backen', 'mehl'),
+    'hunde': ('hund', 'hunde', 'dog', 'haustier', 'vierbeiner'),
+    'schlangen': ('schlange', 'schlangen', 'viper', 'giftig', 'biss'),
+    'notfall': ('notfall', 'emergency', 'hilfe', 'sos', 'dringend'),
+}
+
+# libyaml-Parser, falls PyYAML damit gebaut ist (ca. 10x schneller als der reine Python-Loader)
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Fortlaufende Lexikon-Versionen (für Caches, die an ein Lexikon gebunden sind)
+_versions = itertools.count(1)
+
+
+def freeze(value: Any) -> Any:
+    """Geparste YAML-Daten rekursiv read-only machen (dict -> Mapping, list -> tuple)"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Gegenstück zu freeze() für die Serialisierung (Mapping -> dict)"""
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    return value
+
+
+@dataclass(frozen=True)
+class EntryFragment:
+    """
+    Vorformatierter Context-Block eines Entries (beim Laden der KB gebaut)
+
+    `block` ist der Markdown-Abschnitt ohne laufende Nummer
+    (Überschrift "NAME (Kategorie: x)", Antworttext, Trenner "---");
+    `token_counts` enthält seine Länge pro Token-Zähler (Name, Tokens).
+    """
+    name: str
+    category: Any
+    content: str
+    word_count: int
+    block: str
+    synonyms: Tuple[str, ...] = ()
+    priority: Any = 'normal'
+    token_counts: Tuple[Tuple[str, int], ...] = ()
+
+    def tokens(self, counter: TokenCounter) -> int:
+        """Tokens des Blocks (vorberechnet oder jetzt gezählt)"""
+        for name, count in self.token_counts:
+            if name == counter.name:
+                return count
+        return counter.count(self.block)
+
+
+def format_block(entry_name: str, category: Any, content: str) -> str:
+    """Context-Abschnitt eines Entries ohne laufende Nummer"""
+    return f"{str(entry_name).upper()} (Kategorie: {category})\n\n{content}\n\n---\n"
+
+
+def build_fragment(
+    entry_name: str,
+    entry_data: Mapping,
+    counters: Iterable[TokenCounter] = ()
+) -> EntryFragment:
+    content = entry_data.get('answer', '') or ''
+    category = entry_data.get('category', 'unknown')
+    block = format_block(entry_name, category, content)
+    return EntryFragment(
+        name=entry_name,
+        category=category,
+        content=content,
+        word_count=len(content.split()),
+        block=block,
+        synonyms=tuple(entry_data.get('synonyms', ()) or ()),
+        priority=entry_data.get('priority', 'normal'),
+        token_counts=tuple((counter.name, counter.count(block)) for counter in counters),
+    )
+
+
+@dataclass(frozen=True)
+class KBLexicon:
+    """
+    Unveränderliches Lexikon einer Knowledge Base
+
+    Alle Mappings sind read-only; Matcher und Indizes werden nach dem Bau
+    nicht mehr verändert.
+    """
+    version: int
+    knowledge_base: Mapping[str, Mapping]                # Entry-Name -> YAML-Daten (eingefroren)
+    keywords: FrozenSet[str]                             # Entry-Namen + YAML-Synonyme (lowercase)
+    term_to_entry: Mapping[str, str]                     # Begriff (lowercase) -> Entry-Name
+    term_to_categories: Mapping[str, FrozenSet[str]]     # Begriff -> Kategorien
+    synonyms: Mapping[str, FrozenSet[str]]               # Keyword -> ergänzende Synonyme
+    category_hints: Mapping[str, Tuple[str, ...]]        # Kategorie -> Hinweis-Begriffe
+    topic_order: Tuple[str, ...]                         # Fallback-Topics nach Priorität
+    keyword_matcher: AhoCorasickMatcher                  # Keywords + Synonyme (Wortgrenzen)
+    category_index: CategoryIndex                        # Token -> Kategorie-Gewichte
+    topic_matcher: AhoCorasickMatcher                    # Begriff -> Fallback-Topics (Teilstring)
+    fuzzy_index: TrigramIndex
+    compound_index: CompoundIndex
+    answer_index: BM25Index                              # BM25 über Antworten + Synonyme
+    fragments: Mapping[str, EntryFragment]               # Entry-Name -> vorformatierter Context-Block
+    passage_index: PassageIndex                          # Absätze langer Antworten + BM25
+    conflicts: ConflictMatrix                            # Context-Mixing-Konflikte (CONTEXT_MIXING_RULES)
+    token_counters: Tuple[str, ...]                      # Zähler mit vorberechneten Token-Zahlen
+
+    def entry_for(self, term: str) -> Optional[str]:
+        """Entry-Name für einen Begriff (Name oder Synonym)"""
+        return self.term_to_entry.get(term.lower())
+
+    def get_stats(self) -> Dict:
+        return {
+            'version': self.version,
+            'entries': len(self.knowledge_base),
+            'keywords': len(self.keywords),
+            'term_mappings': len(self.term_to_entry),
+            'matcher_patterns': self.keyword_matcher.pattern_count,
+        }
+
+
+def build_lexicon(knowledge_base: Mapping, previous: Optional[KBLexicon] = None) -> KBLexicon:
+    """
+    Baut das Lexikon aus einer geparsten Knowledge Base
+
+    Args:
+        knowledge_base: Entry-Name -> YAML-Daten (answer, category, synonyms, ...)
+        previous: Bisheriges Lexikon - unveränderte Entries werden für den
+                  BM25-Index nicht neu tokenisiert
+    """
+    term_to_entry: Dict[str, str] = {}
+    term_to_categories: Dict[str, set] = {}
+
+    for entry_name, entry_data in knowledge_base.items():
+        entry_data = entry_data if isinstance(entry_data, Mapping) else {}
+        terms = [str(entry_name)] + [str(s) for s in entry_data.get('synonyms') or []]
+        category = entry_data.get('category')
+
+        for term in terms:
+            term_to_entry[term.lower()] = entry_name
+            if category:
+                term_to_categories.setdefault(term.lower(), set()).add(category)
+
+    for category, hints in CATEGORY_HINTS.items():
+        for hint in hints:
+            term_to_categories.setdefault(hint, set()).add(category)
+
+    keywords = frozenset(term_to_entry)
+
+    # Ergänzende Synonyme nur für Keywords, die in der KB existieren
+    synonyms = {
+        keyword: frozenset(extra)
+        for keyword, extra in EXTRA_SYNONYMS.items()
+        if keyword in keywords
+    }
+
+    # Pattern -> {(MATCH_DIRECT, Keyword), (MATCH_SYNONYM, Keyword), ...}
+    patterns: Dict[str, set] = {}
+    for keyword in keywords:
+        patterns.setdefault(keyword, set()).add((MATCH_DIRECT, keyword))
+    for keyword, extra in synonyms.items():
+        for synonym in extra:
+            patterns.setdefault(synonym, set()).add((MATCH_SYNONYM, keyword))
+
+    topic_patterns: Dict[str, set] = {}
+    for topic, terms in FALLBACK_TOPIC_TERMS.items():
+        for term in terms:
+            topic_patterns.setdefault(term, set()).add(topic)
+
+    documents = knowledge_base_documents(knowledge_base)
+
+    counters = configured_token_counters()
+    fragments = {
+        entry_name: build_fragment(entry_name, entry_data if isinstance(entry_data, Mapping) else {}, counters)
+        for entry_name, entry_data in knowledge_base.items()
+    }
+
+    lexicon = KBLexicon(
+        version=next(_versions),
+        knowledge_base=freeze(knowledge_base),
+        keywords=keywords,
+        term_to_entry=MappingProxyType(term_to_entry),
+        term_to_categories=MappingProxyType(
+            {term: frozenset(categories) for term, categories in term_to_categories.items()}
+        ),
+        synonyms=MappingProxyType(synonyms),
+        category_hints=MappingProxyType(dict(CATEGORY_HINTS)),
+        topic_order=tuple(FALLBACK_TOPIC_TERMS),
+        keyword_matcher=AhoCorasickMatcher(patterns),
+        category_index=CategoryIndex.from_knowledge_base(knowledge_base, CATEGORY_HINTS),
+        topic_matcher=AhoCorasickMatcher(topic_patterns, word_boundaries=False),
+        fuzzy_index=TrigramIndex(keywords),
+        compound_index=CompoundIndex(keywords),
+        answer_index=(
+            previous.answer_index.derive(documents) if previous
+            else BM25Index.from_documents(documents)
+        ),
+        fragments=MappingProxyType(fragments),
+        passage_index=PassageIndex.from_fragments(
+            fragments, counters, previous=previous.passage_index if previous else None
+        ),
+        conflicts=ConflictMatrix.from_contents(
+            {entry_name: fragment.content for entry_name, fragment in fragments.items()},
+            CONTEXT_MIXING_RULES
+        ),
+        token_counters=tuple(counter.name for counter in counters),
+    )
+
+    logger.info(
+        f"📚 Lexicon v{lexicon.version} built: {len(knowledge_base)} entries, "
+        f"{len(keywords)} keywords"
+    )
+    return lexicon
+
+
+def lexicon_state(lexicon: KBLexicon) -> Dict[str, Any]:
+    """Picklebarer Zustand eines Lexikons (für den Binär-Cache, ohne Version)"""
+    return {
+        field.name: thaw(getattr(lexicon, field.name))
+        for field in fields(KBLexicon)
+        if field.name != 'version'
+    }
+
+
+def lexicon_from_state(state: Mapping[str, Any]) -> KBLexicon:
+    """Lexikon aus lexicon_state() - erhält eine neue Version in diesem Prozess"""
+    frozen = {
+        name: freeze(value) if isinstance(value, dict) else value
+        for name, value in state.items()
+    }
+    return KBLexicon(version=next(_versions), **frozen)
+
+
+def lexicon_from_keywords(keywords: Iterable[str]) -> KBLexicon:
+    """Lexikon aus einer reinen Keyword-Menge (jedes Keyword ist ein Entry)"""
+    return build_lexicon({str(keyword).lower(): {} for keyword in keywords})
+
+
+class KnowledgeBaseError(ValueError):
+    """Knowledge Base ist strukturell ungültig (Reload wird abgelehnt)"""
+
+
+def validate_knowledge_base(knowledge_base: Any) -> None:
+    """
+    Prüft die Struktur einer geparsten Knowledge Base
+
+    Raises:
+        KnowledgeBaseError: keine Entries, Entry ohne Mapping oder ohne Antworttext
+    """
+    if not isinstance(knowledge_base, Mapping) or not knowledge_base:
+        raise KnowledgeBaseError("knowledge base must be a non-empty mapping of entries")
+
+    problems = []
+    for entry_name, entry_data in knowledge_base.items():
+        if not isinstance(entry_data, Mapping):
+            problems.append(f"{entry_name}: entry is not a mapping")
+        elif not isinstance(entry_data.get('answer'), str) or not entry_data['answer'].strip():
+            problems.append(f"{entry_name}: missing answer")
+        elif not isinstance(entry_data.get('synonyms') or [], (list, tuple)):
+            problems.append(f"{entry_name}: synonyms must be a list")
+
+    if problems:
+        raise KnowledgeBaseError(f"{len(problems)} invalid entries: {'; '.join(problems[:5])}")
+
+
+def parse_knowledge_base(text: str) -> Dict:
+    """YAML-Text -> Knowledge Base (leeres Dokument -> leere KB)"""
+    return yaml.load(text, Loader=YAML_LOADER) or {}
+
+
+def load_knowledge_base(yaml_path: Path, strict: bool = False) -> Dict:
+    """
+    Lädt die YAML Knowledge Base
+
+    Args:
+        strict: Fehler weiterreichen statt leere KB und Struktur prüfen (für Reloads)
+    """
+    try:
+        data = parse_knowledge_base(Path(yaml_path).read_text(encoding='utf-8'))
+        if strict:
+            validate_knowledge_base(data)
+        logger.info(f"✅ YAML loaded: {len(data)} entries")
+        return data
+    except Exception as e:
+        logger.error(f"❌ Failed to load YAML: {e}")
+        if strict:
+            raise
+        return {}
+
+
+class LexiconSource:
+    """
+    Hält das aktuelle Lexikon einer Knowledge Base
+
+    Komponenten lesen immer `source.current`; ein Reload baut ein neues
+    Lexikon vollständig (load_next, auch in einem Worker-Thread möglich) und
+    tauscht es dann mit einer Zuweisung aus (swap). Caches, die an
+    `current.version` gebunden sind, verfallen damit automatisch.
+    """
+
+    def __init__(self, lexicon: KBLexicon, yaml_path: Optional[Path] = None, load_ms: float = 0.0):
+        self.current = lexicon
+        self.yaml_path = yaml_path
+        self.load_ms = load_ms      # Parsen + Lexikon-Bau beim ersten Laden
+        self.users = 0              # Anzahl get_lexicon_source()-Aufrufe (Bots)
+
+    @classmethod
+    def from_keywords(cls, keywords: Iterable[str]) -> 'LexiconSource':
+        return cls(lexicon_from_keywords(keywords))
+
+    def load_next(self) -> KBLexicon:
+        """
+        Parst und validiert die YAML und baut das nächste Lexikon (ohne Tausch)
+
+        Raises:
+            Lade-, Parse- oder KnowledgeBaseError - das aktuelle Lexikon bleibt aktiv
+        """
+        from kb_cache import load_lexicon
+        return load_lexicon(self.yaml_path, previous=self.current, strict=True)
+
+    def swap(self, lexicon: KBLexicon) -> KBLexicon:
+        """Tauscht das Lexikon aus; gibt das bisherige zurück"""
+        previous, self.current = self.current, lexicon
+        return previous
+
+    def reload(self) -> KBLexicon:
+        """
+        Parst die YAML neu und tauscht das Lexikon atomar aus
+
+        Bei Fehlern (z.B. ungültige YAML) bleibt das bisherige Lexikon aktiv
+        und die Exception wird weitergereicht.
+        """
+        if self.yaml_path is None:
+            return self.current
+
+        lexicon = self.load_next()
+        self.swap(lexicon)
+        return lexicon
+
+
+# Registry: ein LexiconSource pro YAML-Datei - von allen Bots geteilt
+_shared_sources: Dict[Path, LexiconSource] = {}
+
+
+def get_lexicon_source(yaml_path: Path) -> LexiconSource:
+    """Geteiltes Lexikon für yaml_path (wird beim ersten Zugriff gebaut)"""
+    key = Path(yaml_path).resolve()
+    source = _shared_sources.get(key)
+    if source is None:
+        start = time.perf_counter()
+        from kb_cache import load_lexicon
+        lexicon = load_lexicon(yaml_path)
+        source = LexiconSource(lexicon, Path(yaml_path), load_ms=(time.perf_counter() - start) * 1000)
+        _shared_sources[key] = source
+        logger.info(f"📚 KB snapshot loaded: {key.name} in {source.load_ms:.0f} ms")
+    else:
+        logger.info(f"📚 KB snapshot shared: {key.name} (lexicon v{source.current.version})")
+    source.users += 1
+    return source
+
+
+def get_shared_sources() -> Tuple[LexiconSource, ...]:
+    """Alle geladenen KB-Snapshots der Registry (z.B. für Datei-Watcher)"""
+    return tuple(_shared_sources.values())
+
+
+def get_registry_stats() -> Dict[str, Dict]:
+    """Geladene KB-Snapshots: Pfad -> Entries, Version, Ladezeit, Nutzer"""
+    return {
+        str(path): {
+            'entries': len(source.current.knowledge_base),
+            'lexicon_version': source.current.version,
+            'load_ms': round(source.load_ms, 1),
+            'users': source.users,
+        }
+        for path, source in _shared_sources.items()
+    }
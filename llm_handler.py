@@ -6,7 +6,7 @@ Phase 4: Multi-Model-Fallback und Response-Validierung
 import re
 import asyncio
 import logging
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 import aiohttp
 
@@ -19,8 +19,13 @@ from config_multi_bot import (
     CONTEXT_MIXING_RULES,
     MIN_RESPONSE_LENGTH,
     MAX_RESPONSE_LENGTH,
-    QUALITY_CHECKS
+    QUALITY_CHECKS,
+    LLM_MIN_ATTEMPT_SECONDS,
+    SEND_RESERVE_SECONDS,
+    LLM_CONNECTION_POOL_SIZE
 )
+from deadline import Deadline
+from spans import span
 
 logger = logging.getLogger(__name__)
 
@@ -31,11 +36,27 @@ class LLMHandler:
     Erkennt Halluzinationen und Context-Mixing
     """
     
-    def __init__(self, ollama_url: str = "http://localhost:11434"):
+    def __init__(
+        self,
+        ollama_url: str = "http://localhost:11434",
+        pool_connections: bool = True
+    ):
+        """
+        Args:
+            ollama_url: Basis-URL der Ollama API
+            pool_connections: Eine ClientSession (Keep-Alive-Pool) für alle
+                              Calls wiederverwenden statt pro Call neu aufzubauen
+        """
         self.ollama_url = ollama_url
+        self.pool_connections = pool_connections
+        self.pool_size = LLM_CONNECTION_POOL_SIZE
+        self._session: Optional[aiohttp.ClientSession] = None
         # Models als Instance-Variable (können von außen überschrieben werden)
         self.models = LLM_MODELS
         self.primary_model = PRIMARY_MODEL
+        self.timeout_seconds = LLM_TIMEOUT_SECONDS
+        # Gleitender Mittelwert der Antwortzeit pro Modell (Sekunden)
+        self.model_latency_seconds: Dict[str, float] = {}
         self.stats = {
             'total_requests': 0,
             'successful_requests': 0,
@@ -43,6 +64,8 @@ class LLMHandler:
             'retries_used': 0,
             'hallucinations_detected': 0,
             'context_mixing_detected': 0,
+            'budget_exhausted': 0,
+            'attempts_skipped_for_budget': 0,
             'model_usage': {model: 0 for model in self.models},
         }
     
@@ -50,7 +73,9 @@ class LLMHandler:
         self,
         query: str,
         context: str,
-        max_retries: int = MAX_LLM_RETRIES
+        max_retries: int = MAX_LLM_RETRIES,
+        deadline: Optional[Deadline] = None,
+        context_for_model: Optional[Callable[[str], str]] = None
     ) -> Tuple[Optional[str], Dict]:
         """
         Generiert LLM-Response mit Fallback und Validierung
@@ -59,6 +84,11 @@ class LLMHandler:
             query: User-Query
             context: Vorbereiteter Context
             max_retries: Max Retry-Versuche
+            deadline: Zeitbudget der Nachricht (optional).
+                      Modell-Versuche und Timeouts richten sich nach dem Restbudget.
+            context_for_model: Context für ein Modell der Fallback-Kette
+                               (z.B. auf ein kleineres Token-Budget gekürzt);
+                               None = `context` für alle Modelle
         
         Returns:
             (response, metadata)
@@ -71,18 +101,46 @@ class LLMHandler:
             'final_model': None,
             'validation_issues': [],
             'processing_time_ms': 0,
+            'budget_exhausted': False,
+            'phase_timings_ms': {},     # Spans: response_validation
+            'model_timings_ms': {},     # Spans: llm_call pro Modell
         }
         
         # Versuche Modelle der Reihe nach
-        for attempt, model in enumerate(self.models[:max_retries + 1]):
+        candidates = self.models[:max_retries + 1]
+        for attempt, model in enumerate(candidates):
+            timeout = self._attempt_timeout(model, deadline, candidates[attempt + 1:])
+            
+            if timeout is None:
+                if self._budget_exhausted(deadline):
+                    metadata['budget_exhausted'] = True
+                    break
+                # Modell ist zu langsam für das Restbudget - nächstes versuchen
+                self.stats['attempts_skipped_for_budget'] += 1
+                metadata['attempts'].append({
+                    'model': model,
+                    'success': False,
+                    'skipped': 'insufficient_budget',
+                })
+                logger.info(f"⏭️ Skipping model '{model}' (remaining budget too small)")
+                continue
+            
+            call_start = None
             try:
-                logger.info(f"🤖 Attempt {attempt + 1}: Using model '{model}'")
+                logger.info(f"🤖 Attempt {attempt + 1}: Using model '{model}' (timeout {timeout:.0f}s)",
+                            extra={'sample': 'prompt'})
                 
                 # LLM-Call
-                response = await self._call_ollama(query, context, model)
+                call_start = datetime.now()
+                with span(metadata['model_timings_ms'], 'llm_call', key=model):
+                    model_context = context_for_model(model) if context_for_model else context
+                    response = await self._call_ollama(query, model_context, model, timeout=timeout)
+                self._record_latency(model, (datetime.now() - call_start).total_seconds())
+                call_start = None
                 
                 # Validierung
-                is_valid, issues = self._validate_response(response, query)
+                with span(metadata['phase_timings_ms'], 'response_validation'):
+                    is_valid, issues = self._validate_response(response, query)
                 
                 attempt_data = {
                     'model': model,
@@ -107,6 +165,7 @@ class LLMHandler:
                     # Validierung fehlgeschlagen
                     logger.warning(f"❌ Invalid response from '{model}': {issues}")
                     self.stats['retries_used'] += 1
+                    metadata['validation_issues'].extend(issues)
                     
                     # Zähle spezifische Issues
                     for issue in issues:
@@ -116,6 +175,10 @@ class LLMHandler:
                             self.stats['context_mixing_detected'] += 1
             
             except Exception as e:
+                if call_start is not None:
+                    # Auch Timeouts/Fehler zählen, sonst plant _attempt_timeout
+                    # ein Modell, das immer ins Timeout läuft, immer wieder ein
+                    self._record_latency(model, (datetime.now() - call_start).total_seconds())
                 logger.error(f"❌ Model '{model}' failed: {e}", exc_info=True)
                 metadata['attempts'].append({
                     'model': model,
@@ -124,28 +187,91 @@ class LLMHandler:
                 })
                 continue
         
-        # Alle Modelle gescheitert
+        # Alle Modelle gescheitert (oder Budget aufgebraucht)
         self.stats['failed_requests'] += 1
-        metadata['validation_issues'] = ['All models failed or produced invalid responses']
+        
+        if metadata['budget_exhausted'] or self._budget_exhausted(deadline):
+            metadata['budget_exhausted'] = True
+            self.stats['budget_exhausted'] += 1
+            deadline.record_miss('llm')
+            metadata['validation_issues'].append('Response budget exhausted before a valid response')
+            logger.warning(f"⏱️ Response budget exhausted after {len(metadata['attempts'])} attempts")
+        else:
+            metadata['validation_issues'].append('All models failed or produced invalid responses')
+            logger.error(f"❌ All models failed after {len(metadata['attempts'])} attempts")
         
         duration = (datetime.now() - start_time).total_seconds() * 1000
         metadata['processing_time_ms'] = round(duration, 2)
         
-        logger.error(f"❌ All models failed after {len(metadata['attempts'])} attempts")
         return None, metadata
     
+    def _budget_exhausted(self, deadline: Optional[Deadline]) -> bool:
+        """True wenn für keinen weiteren LLM-Versuch genug Budget übrig ist"""
+        if deadline is None:
+            return False
+        return deadline.remaining() - SEND_RESERVE_SECONDS < LLM_MIN_ATTEMPT_SECONDS
+    
+    def _attempt_timeout(
+        self,
+        model: str,
+        deadline: Optional[Deadline],
+        later_models: List[str]
+    ) -> Optional[float]:
+        """
+        Wählt das Timeout für einen Modell-Versuch aus dem Restbudget
+        
+        Args:
+            model: Modell des aktuellen Versuchs
+            deadline: Zeitbudget der Nachricht
+            later_models: Modelle, die danach noch versucht werden könnten
+        
+        Returns:
+            Timeout in Sekunden oder None wenn der Versuch nicht ins Budget passt
+        """
+        if deadline is None:
+            return self.timeout_seconds
+        
+        if self._budget_exhausted(deadline):
+            return None
+        
+        timeout = deadline.timeout_for(
+            self.timeout_seconds,
+            reserve_seconds=SEND_RESERVE_SECONDS
+        )
+        
+        # Bekannt langsame Modelle überspringen, wenn ein schnelleres noch passt
+        expected = self.model_latency_seconds.get(model)
+        if expected is not None and expected > timeout:
+            if any(self.model_latency_seconds.get(m, timeout) < timeout for m in later_models):
+                return None
+        
+        return timeout
+    
+    def _record_latency(self, model: str, seconds: float, alpha: float = 0.3):
+        """Aktualisiert den gleitenden Mittelwert der Modell-Antwortzeit"""
+        previous = self.model_latency_seconds.get(model)
+        if previous is None:
+            self.model_latency_seconds[model] = seconds
+        else:
+            self.model_latency_seconds[model] = alpha * seconds + (1 - alpha) * previous
+    
     async def _call_ollama(
         self,
         query: str,
         context: str,
-        model: str
+        model: str,
+        timeout: Optional[float] = None
     ) -> str:
         """
         Ruft Ollama API auf
         
+        Args:
+            timeout: Timeout in Sekunden (Default: self.timeout_seconds)
+        
         Returns:
             LLM-Response als String
         """
+        timeout = timeout or self.timeout_seconds
         prompt = self._build_prompt(query, context, model)
         
         payload = {
@@ -160,28 +286,55 @@ class LLMHandler:
         }
         
         try:
+            if self.pool_connections:
+                session = await self._get_session()
+                return await self._post_generate(session, payload, timeout)
+            
             async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.ollama_url}/api/generate",
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=LLM_TIMEOUT_SECONDS)
-                ) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        response = data.get('response', '').strip()
-                        
-                        logger.info(f"LLM response length: {len(response)} chars")
-                        logger.info(f"🔍 LLM RESPONSE: {response[:500]}")
-                        return response
-                    else:
-                        error_text = await resp.text()
-                        raise Exception(f"Ollama API error {resp.status}: {error_text}")
+                return await self._post_generate(session, payload, timeout)
         
         except asyncio.TimeoutError:
-            raise Exception(f"Timeout after {LLM_TIMEOUT_SECONDS}s")
+            raise Exception(f"Timeout after {timeout:.0f}s")
         except Exception as e:
             raise Exception(f"Ollama call failed: {e}")
     
+    async def _post_generate(
+        self,
+        session: aiohttp.ClientSession,
+        payload: Dict,
+        timeout: float
+    ) -> str:
+        """Sendet den Generate-Request und liest die Antwort"""
+        async with session.post(
+            f"{self.ollama_url}/api/generate",
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as resp:
+            if resp.status == 200:
+                data = await resp.json()
+                response = data.get('response', '').strip()
+                
+                logger.info(f"🔍 LLM RESPONSE ({len(response)} chars): {response[:500]}",
+                            extra={'sample': 'llm_response'})
+                return response
+            else:
+                error_text = await resp.text()
+                raise Exception(f"Ollama API error {resp.status}: {error_text}")
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Gibt die geteilte ClientSession zurück (lazy, pro Event-Loop)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size)
+            )
+        return self._session
+    
+    async def close(self):
+        """Schließt die geteilte ClientSession"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
     def _build_prompt(self, query: str, context: str, model: str = None) -> str:
         """Baut LLM-Prompt aus Query und Context"""
         
@@ -434,10 +587,10 @@ class ResponseFormatter:
 # TESTS
 # ========================================
 
-async def test_llm_handler():
+async def test_llm_handler(ollama_url: str = "http://localhost:11434"):
     """Test-Suite für LLM Handler"""
     
-    handler = LLMHandler()
+    handler = LLMHandler(ollama_url=ollama_url)
     formatter = ResponseFormatter()
     
     # Mock-Context für Tests
@@ -506,8 +659,23 @@ Für 24 Personen Pizza brauchst du 3 kg Mehl, 3 Würfel Hefe,
         print(f"    {model}: {count}")
     
     print("=" * 70)
+    
+    await handler.close()
+
+
+async def test_llm_handler_with_stub():
+    """Test-Suite gegen den lokalen Ollama-Stub (kein echtes Ollama nötig)"""
+    from ollama_stub import OllamaStub, StubConfig
+    
+    async with OllamaStub(StubConfig(models=list(LLM_MODELS))) as stub:
+        await test_llm_handler(ollama_url=stub.url)
 
 
 if __name__ == "__main__":
-    # Asyncio Event Loop für Tests
-    asyncio.run(test_llm_handler())
+    import sys
+    
+    # Asyncio Event Loop für Tests (--stub: gegen ollama_stub statt echtem Ollama)
+    if '--stub' in sys.argv:
+        asyncio.run(test_llm_handler_with_stub())
+    else:
+        asyncio.run(test_llm_handler())
@@ -0,0 +1,243 @@
+"""
+Borgo-Bot - Logging ohne Blockieren der Event-Loop
+Queue, Hintergrund-Thread, Rotation und Sampling ausführlicher Zeilen
+
+Bisher schrieben FileHandler und StreamHandler jede Zeile synchron aus der
+Event-Loop - pro Nachricht ein Dutzend INFO-Zeilen, darunter die LLM-Antwort
+und der gesendete Text. Jetzt:
+
+1. Der Root-Logger hat nur einen QueueHandler: ein Log-Aufruf formatiert die
+   Nachricht und legt den Record in eine Queue (LOG_QUEUE_SIZE; ist sie voll,
+   wird der Record gezählt und verworfen statt zu warten)
+2. Ein QueueListener-Thread schreibt in Datei und Konsole
+3. Die Datei rotiert um Mitternacht und ab LOG_ROTATION_MB
+   (borgo_bot_multi.log.2026-10-19, .2026-10-19.1, ...); rotierte Dateien
+   älter als LOG_RETENTION_DAYS werden gelöscht
+4. Ausführliche Zeilen tragen einen Sampling-Schlüssel:
+
+       logger.info(f"🔍 LLM RESPONSE: {response[:500]}", extra={'sample': 'llm_response'})
+
+   LogSampler lässt pro Schlüssel höchstens LOG_SAMPLE_LIMITS[key] Zeilen pro
+   LOG_SAMPLE_WINDOW_SECONDS durch; die nächste durchgelassene Zeile nennt
+   die Zahl der unterdrückten. WARNING und höher werden nie unterdrückt.
+"""
+
+import os
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+from typing import Dict, Optional
+
+from config_multi_bot import (
+    LOG_FILE,
+    LOG_ROTATION_MB,
+    LOG_RETENTION_DAYS,
+    LOG_QUEUE_SIZE,
+    LOG_SAMPLE_WINDOW_SECONDS,
+    LOG_SAMPLE_LIMITS,
+)
+
+LOG_FORMAT = '%(asctime)s | %(levelname)-8s | %(name)s | %(message)s'
+
+
+class LogSampler(logging.Filter):
+    """
+    Begrenzt Records mit `sample`-Schlüssel auf N pro Zeitfenster
+    (läuft im aufrufenden Thread, vor der Queue)
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, int] = LOG_SAMPLE_LIMITS,
+        window_seconds: float = LOG_SAMPLE_WINDOW_SECONDS
+    ):
+        super().__init__()
+        self.limits = dict(limits)
+        self.window_seconds = window_seconds
+        self._window_start: Dict[str, float] = {}
+        self._passed: Dict[str, int] = {}
+        self._suppressed: Dict[str, int] = {}           # im aktuellen Fenster
+        self.suppressed_total: Dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, 'sample', None)
+        if key is None or key not in self.limits or record.levelno >= logging.WARNING:
+            return True
+
+        now = record.created
+        if now - self._window_start.get(key, 0.0) >= self.window_seconds:
+            self._window_start[key] = now
+            self._passed[key] = 0
+
+        if self._passed[key] >= self.limits[key]:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            self.suppressed_total[key] = self.suppressed_total.get(key, 0) + 1
+            return False
+
+        self._passed[key] += 1
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record.msg = f"{record.getMessage()} [+{suppressed} '{key}' lines suppressed]"
+            record.args = None
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, der bei voller Queue verwirft statt die Event-Loop aufzuhalten"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RotatingLogFile(logging.handlers.TimedRotatingFileHandler):
+    """
+    Rotation um Mitternacht und nach Größe; Retention nach Alter der Dateien
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_mb: float = LOG_ROTATION_MB,
+        retention_days: float = LOG_RETENTION_DAYS
+    ):
+        super().__init__(filename, when='midnight', backupCount=1, encoding='utf-8', delay=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.retention_seconds = retention_days * 86400
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes and self.stream is not None:
+            return self.stream.tell() >= self.max_bytes
+        return False
+
+    def rotation_filename(self, default_name: str) -> str:
+        # Mehrere Größen-Rotationen am selben Tag: .2026-10-19, .2026-10-19.1, ...
+        name, n = default_name, 0
+        while os.path.exists(name):
+            n += 1
+            name = f"{default_name}.{n}"
+        return name
+
+    def getFilesToDelete(self):
+        directory, base = os.path.split(self.baseFilename)
+        cutoff = time.time() - self.retention_seconds
+        old = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.startswith(base + '.') and os.path.getmtime(path) < cutoff:
+                old.append(path)
+        return old
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+_sampler: Optional[LogSampler] = None
+
+
+def setup_logging(
+    log_file: str = LOG_FILE,
+    level: int = logging.INFO,
+    console: bool = True
+) -> logging.handlers.QueueListener:
+    """
+    Root-Logger auf Queue + Listener-Thread umstellen (idempotent)
+
+    Bestehende Handler des Root-Loggers werden ersetzt.
+    """
+    global _listener, _queue_handler, _sampler
+    if _listener is not None:
+        return _listener
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [RotatingLogFile(log_file)]
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    _sampler = LogSampler()
+    _queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _queue_handler.addFilter(_sampler)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Queue leeren, Listener-Thread beenden, Dateien schließen"""
+    global _listener, _queue_handler, _sampler
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener = _queue_handler = _sampler = None
+
+
+def get_logging_stats() -> Dict:
+    """Unterdrückte (Sampling) und verworfene (Queue voll) Zeilen"""
+    if _listener is None:
+        return {}
+    return {
+        'queued': _queue_handler.queue.qsize(),
+        'dropped': _queue_handler.dropped,
+        'suppressed': dict(_sampler.suppressed_total),
+    }
+
+
+def test_logging_setup():
+    """Selbsttest: Sampling, Größen-Rotation und Retention in einem temp-Verzeichnis"""
+    import tempfile
+    from pathlib import Path
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = Path(tmp) / 'bot.log'
+        # Alte rotierte Datei für die Retention
+        stale = Path(f"{log_file}.2020-01-01")
+        stale.write_text("alt\n")
+        os.utime(stale, (0, 0))
+
+        setup_logging(str(log_file), console=False)
+        log = logging.getLogger('borgo.test')
+        _listener.handlers[0].max_bytes = 20_000
+
+        start = time.perf_counter()
+        for i in range(200):
+            log.info(f"🔍 LLM RESPONSE: {'x' * 400} #{i}", extra={'sample': 'llm_response'})
+            log.info(f"📨 Processing message #{i}")
+        call_us = (time.perf_counter() - start) / 400 * 1e6
+        stats = get_logging_stats()
+        stop_logging()
+
+        print("=" * 70)
+        print("LOGGING SETUP TESTS")
+        print("=" * 70)
+        lines = sum(len(p.read_text(encoding='utf-8').splitlines()) for p in Path(tmp).glob('bot.log*'))
+        print(f"  Calls: 400, written lines: {lines}, stats: {stats}")
+        print(f"  Files: {sorted(p.name for p in Path(tmp).iterdir())}")
+        print(f"  Stale backup removed: {not stale.exists()}")
+        print(f"  Avg cost per call (caller thread): {call_us:.1f} µs")
+        print("=" * 70)
+
+
+if __name__ == "__main__":
+    test_logging_setup()
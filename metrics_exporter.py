@@ -0,0 +1,284 @@
+"""
+Borgo-Bot - Metrik-Endpoint im Prometheus-Textformat
+Lokaler HTTP-Endpoint (GET /metrics) für Scraper wie Prometheus oder curl
+
+Exportiert pro Bot (Label `bot`):
+- Interactions, Fallbacks pro Grund, Budget-Misses pro Phase (Counter)
+- Latenz-Histogramme pro Pipeline-Phase (validation, extraction, context,
+  llm, response_validation, send, total; Spans siehe spans.py) und pro
+  LLM-Versuch und Modell (llm_call), dazu p50/p90/p99 über das gleitende
+  Fenster aus quantile_sketch.py
+- In Bearbeitung und noch nicht ins Journal geschriebene Interactions (Gauges)
+- Keyword- und Context-Cache (Treffer, Anfragen, Trefferquote)
+- LLM-Zähler und gleitende Modell-Latenz, nach der LLMHandler zu langsame
+  Modelle überspringt (der Bot hat keine Circuit-Breaker; das ist sein
+  Gegenstück)
+Dazu KB-Snapshots (Lexikon-Version, Reloads), unterdrückte/verworfene
+Log-Zeilen (logging_setup.py) und Prozess-RSS.
+
+Ein Scrape liest nur Zähler im Speicher (plus /proc/self/statm für RSS) -
+auf der Event-Loop, ohne Locks (der Request-Pfad nimmt keine), ca. 1 ms für
+drei Bots. Die Dauer des Renderns wird selbst als Metrik exportiert.
+
+    curl -s http://127.0.0.1:9464/metrics
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web
+
+from config_multi_bot import METRICS_HTTP_HOST, METRICS_HTTP_PORT, BOT_VERSION
+from monitoring import parse_phase_label, process_rss_mb
+from logging_setup import get_logging_stats
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Exposition:
+    """Sammelt Samples pro Metrik-Familie und rendert das Textformat"""
+
+    def __init__(self):
+        self._families: Dict[str, Tuple[str, str, List[str]]] = {}
+
+    def _family(self, name: str, kind: str, help_text: str) -> List[str]:
+        if name not in self._families:
+            self._families[name] = (kind, help_text, [])
+        return self._families[name][2]
+
+    @staticmethod
+    def _label_pairs(labels: Dict[str, object]) -> str:
+        return ','.join(f'{key}="{escape_label(value)}"' for key, value in labels.items())
+
+    @classmethod
+    def _labels(cls, labels: Dict[str, object]) -> str:
+        return '{' + cls._label_pairs(labels) + '}' if labels else ''
+
+    def add(self, name: str, kind: str, help_text: str, value: float, **labels):
+        self._family(name, kind, help_text).append(f"{name}{self._labels(labels)} {format_value(value)}")
+
+    def add_histogram(self, name: str, help_text: str, histogram, **labels):
+        """histogram: monitoring.LatencyHistogram"""
+        lines = self._family(name, 'histogram', help_text)
+        pairs = self._label_pairs(labels)
+        prefix = f"{name}_bucket{{{pairs},le=" if pairs else f"{name}_bucket{{le="
+        for bound, count in histogram.cumulative():
+            lines.append(f'{prefix}"{format_value(bound)}"}} {count}')
+        lines.append(f"{name}_sum{self._labels(labels)} {format_value(histogram.sum)}")
+        lines.append(f"{name}_count{self._labels(labels)} {histogram.count}")
+
+    def render(self) -> str:
+        out = []
+        for name, (kind, help_text, lines) in self._families.items():
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(lines)
+        return '\n'.join(out) + '\n'
+
+
+def collect_bot(exp: Exposition, bot):
+    """Metriken einer BorgoBotInstance"""
+    name = bot.name
+    monitoring = bot.monitoring
+    metrics = monitoring.metrics
+
+    for outcome, key in (('success', 'successful_interactions'), ('failure', 'failed_interactions')):
+        exp.add('borgo_interactions_total', 'counter', "Bearbeitete Nachrichten",
+                metrics[key], bot=name, outcome=outcome)
+    for reason, count in metrics['fallbacks_by_reason'].items():
+        exp.add('borgo_fallbacks_total', 'counter', "Fallback-Antworten pro Grund",
+                count, bot=name, reason=reason)
+    for phase, count in metrics['budget_misses_by_phase'].items():
+        exp.add('borgo_budget_misses_total', 'counter', "Phasen nach Ablauf des Zeitbudgets",
+                count, bot=name, phase=phase)
+    for rate in ('keywords_found_rate', 'fallback_rate', 'validation_failure_rate'):
+        exp.add(f'borgo_window_{rate}_percent', 'gauge', f"{rate} über das Interaction-Fenster",
+                metrics[rate], bot=name)
+
+    for (phase, model), histogram in sorted(monitoring.phase_latency.items()):
+        labels = {'bot': name, 'phase': phase}
+        if model:
+            labels['model'] = model
+        exp.add_histogram('borgo_phase_duration_seconds', "Dauer pro Pipeline-Phase bzw. LLM-Versuch",
+                          histogram, **labels)
+    for label, values in monitoring.get_latency_quantiles().items():
+        phase, model = parse_phase_label(label)
+        labels = {'bot': name, 'phase': phase}
+        if model:
+            labels['model'] = model
+        for quantile, value in values.items():
+            exp.add('borgo_phase_duration_quantile_seconds', 'gauge',
+                    "p50/p90/p99 pro Phase über das gleitende Fenster (Sketch)",
+                    value / 1000, **labels, quantile=int(quantile[1:]) / 100)
+
+    # Warteschlangen
+    exp.add('borgo_messages_in_flight', 'gauge', "Nachrichten in Bearbeitung",
+            getattr(bot, 'in_flight', 0), bot=name)
+    exp.add('borgo_metrics_journal_pending', 'gauge', "Interactions, die noch ins Journal geschrieben werden",
+            monitoring.unsaved_interactions, bot=name)
+
+    # Caches
+    keyword_cache = bot.keyword_extractor.cache_stats
+    context_stats = bot.context_manager.stats
+    caches = {
+        'keywords': (keyword_cache['hits'], keyword_cache['hits'] + keyword_cache['misses']),
+        'context': (context_stats['context_cache_hits'], context_stats['contexts_built']),
+    }
+    for cache, (hits, lookups) in caches.items():
+        exp.add('borgo_cache_hits_total', 'counter', "Cache-Treffer", hits, bot=name, cache=cache)
+        exp.add('borgo_cache_lookups_total', 'counter', "Cache-Anfragen", lookups, bot=name, cache=cache)
+        exp.add('borgo_cache_hit_ratio', 'gauge', "Cache-Trefferquote seit Start",
+                hits / lookups if lookups else 0, bot=name, cache=cache)
+
+    # LLM
+    llm = bot.llm_handler
+    for key in ('total_requests', 'failed_requests', 'retries_used', 'hallucinations_detected',
+                'budget_exhausted', 'attempts_skipped_for_budget'):
+        exp.add(f'borgo_llm_{key}_total', 'counter', f"LLMHandler {key}", llm.stats[key], bot=name)
+    for model, count in llm.stats['model_usage'].items():
+        exp.add('borgo_llm_model_responses_total', 'counter', "Gültige Antworten pro Modell",
+                count, bot=name, model=model)
+    for model, seconds in llm.model_latency_seconds.items():
+        exp.add('borgo_llm_model_latency_seconds', 'gauge',
+                "Gleitender Mittelwert der Modell-Latenz (Grundlage fürs Überspringen)",
+                seconds, bot=name, model=model)
+
+
+def collect_watcher(exp: Exposition, watcher):
+    """Metriken eines KnowledgeBaseWatcher"""
+    kb = watcher.path.name
+    exp.add('borgo_kb_lexicon_version', 'gauge', "Aktive Lexikon-Version", watcher.source.current.version, kb=kb)
+    exp.add('borgo_kb_reloads_total', 'counter', "Erfolgreiche KB-Reloads", watcher.stats['reloads'], kb=kb)
+    exp.add('borgo_kb_reload_failures_total', 'counter', "Verworfene KB-Reloads", watcher.stats['failures'], kb=kb)
+
+
+class MetricsServer:
+    """
+    aiohttp-Server für GET /metrics (läuft auf der Event-Loop der Bots)
+    """
+
+    def __init__(
+        self,
+        bots: Iterable,
+        watchers: Iterable = (),
+        host: str = METRICS_HTTP_HOST,
+        port: int = METRICS_HTTP_PORT
+    ):
+        self.bots = list(bots)
+        self.watchers = list(watchers)
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+        self.stats = {
+            'scrapes': 0,
+            'last_render_ms': None,
+        }
+
+    def render(self) -> str:
+        start = time.perf_counter()
+        exp = Exposition()
+        exp.add('borgo_build_info', 'gauge', "Bot-Version", 1, version=BOT_VERSION)
+        for bot in self.bots:
+            collect_bot(exp, bot)
+        for watcher in self.watchers:
+            collect_watcher(exp, watcher)
+        log_stats = get_logging_stats()
+        if log_stats:
+            exp.add('borgo_log_queue_dropped_total', 'counter', "Log-Zeilen verworfen (Queue voll)",
+                    log_stats['dropped'])
+            for key, count in log_stats['suppressed'].items():
+                exp.add('borgo_log_lines_suppressed_total', 'counter', "Log-Zeilen durch Sampling unterdrückt",
+                        count, key=key)
+        rss = process_rss_mb()
+        if rss is not None:
+            exp.add('borgo_process_resident_memory_megabytes', 'gauge', "RSS des Prozesses", rss)
+        if self.stats['last_render_ms'] is not None:
+            exp.add('borgo_metrics_render_seconds', 'gauge', "Dauer des letzten Scrapes",
+                    self.stats['last_render_ms'] / 1000)
+
+        text = exp.render()
+        self.stats['scrapes'] += 1
+        self.stats['last_render_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        return text
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.render().encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+    async def start(self) -> bool:
+        """Startet den Server; ein belegter Port wird geloggt, der Bot läuft weiter"""
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None, shutdown_timeout=1.0)
+        await self._runner.setup()
+        try:
+            site = web.TCPSite(self._runner, self.host, self.port)
+            await site.start()
+        except OSError as e:
+            logger.warning(f"⚠️ Metrics endpoint not available on {self.host}:{self.port}: {e}")
+            await self.stop()
+            return False
+
+        if self.port == 0:
+            self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"📈 Metrics endpoint: http://{self.host}:{self.port}/metrics")
+        return True
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def test_metrics_exporter():
+    """Selbsttest: zwei Nachrichten über den Ollama-Stub, dann /metrics abrufen"""
+    import aiohttp
+    from config_multi_bot import DEV_BOT_CONFIG
+    from borgo_bot_multi import BorgoBotInstance
+    from ollama_stub import OllamaStub, StubBehavior, StubConfig
+
+    async with OllamaStub(StubConfig(default=StubBehavior(latency_ms=20, mode='kb_echo'))) as stub:
+        bot = BorgoBotInstance({**DEV_BOT_CONFIG, 'ollama_url': stub.url})
+        for message in ("Wie ist das WLAN-Passwort?", "Wo stehen die Mülltonnen?"):
+            await bot.process_message(message)
+        await bot.llm_handler.close()
+
+    server = MetricsServer([bot], port=0)
+    await server.start()
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"http://{server.host}:{server.port}/metrics") as resp:
+            content_type = resp.headers['Content-Type']
+            text = await resp.text()
+    await server.stop()
+
+    print("=" * 70)
+    print(f"METRICS EXPORTER TESTS ({content_type}, {len(text.splitlines())} lines, "
+          f"render {server.stats['last_render_ms']} ms)")
+    print("=" * 70)
+    for line in text.splitlines():
+        if line.startswith(('borgo_interactions_total', 'borgo_cache_hit_ratio', 'borgo_llm_model_latency'))\
+                or ('_count{' in line):
+            print(f"  {line}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(test_metrics_exporter())
@@ -0,0 +1,254 @@
+"""
+Borgo-Bot - Persistenz der Monitoring-Metriken
+Snapshot und Interaction-Journal außerhalb des Request-Pfads schreiben
+
+Bisher hat MonitoringSystem bei jeder 10. Interaction das komplette JSON
+(Metriken, Stunden-Statistik, 100 Interactions, alle Alerts, mit indent)
+synchron auf der Event-Loop geschrieben und die Datei dabei direkt
+überschrieben - ein Absturz konnte sie abgeschnitten hinterlassen.
+
+Jetzt:
+1. Auf der Event-Loop wird nur ein billiger Snapshot genommen (flache
+   Kopien; neue Interactions werden aus dem Journal-Puffer übernommen)
+2. Serialisieren und Schreiben laufen in einem Worker-Thread
+3. Neue Interactions werden als je eine Zeile an das JSONL-Journal
+   angehängt (<metrics>.journal.jsonl, rotiert nach METRICS_JOURNAL_MAX_MB)
+4. Der Snapshot wird atomar ersetzt (temp-Datei + fsync + rename)
+
+Ausgelöst wird nach METRICS_FLUSH_EVERY neuen Interactions oder spätestens
+alle METRICS_FLUSH_INTERVAL_SECONDS (nur wenn sich etwas geändert hat).
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from dataclasses import dataclass, asdict, field
+from typing import Any, Dict, List, Optional
+
+from config_multi_bot import (
+    METRICS_FLUSH_INTERVAL_SECONDS,
+    METRICS_FLUSH_EVERY,
+    METRICS_JOURNAL_MAX_MB,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MetricsSnapshot:
+    """Stand des MonitoringSystems zum Schreiben im Worker-Thread"""
+    metrics_file: Path
+    journal_file: Path
+    data: Dict[str, Any]            # Metriken, Stunden-Statistik, Alerts
+    recent: List[Any]               # Letzte Interactions (InteractionLog) für den Snapshot
+    journal: List[Any]              # Seit dem letzten Snapshot neue Interactions
+    quantiles: Dict[str, Any] = field(default_factory=dict)  # Phase -> SlidingQuantiles (Kopie)
+
+
+def journal_path(metrics_file: Path) -> Path:
+    """borgo_bot_metrics_dev.json -> borgo_bot_metrics_dev.journal.jsonl"""
+    metrics_file = Path(metrics_file)
+    return metrics_file.with_name(f"{metrics_file.stem}.journal.jsonl")
+
+
+def atomic_write_json(path: Path, data: Dict):
+    """Schreibt JSON in eine temp-Datei und ersetzt das Ziel per rename"""
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def append_journal(path: Path, interactions: List[Any], max_mb: float = METRICS_JOURNAL_MAX_MB):
+    """Hängt Interactions als JSONL an; zu große Journale werden nach .1 rotiert"""
+    if not interactions:
+        return
+    path = Path(path)
+    try:
+        if path.stat().st_size > max_mb * 1024 * 1024:
+            os.replace(path, path.with_name(path.name + '.1'))
+    except FileNotFoundError:
+        pass
+
+    lines = ''.join(json.dumps(asdict(i), ensure_ascii=False) + '\n' for i in interactions)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(lines)
+
+
+def write_snapshot(snapshot: MetricsSnapshot):
+    """
+    Journal anhängen, dann Snapshot ersetzen (läuft im Worker-Thread)
+
+    Fehler beim Journal werden weitergereicht (Interactions zurück in den
+    Puffer), Fehler beim Snapshot nur geloggt - der nächste ersetzt ihn.
+    """
+    append_journal(snapshot.journal_file, snapshot.journal)
+    try:
+        atomic_write_json(snapshot.metrics_file, {
+            **snapshot.data,
+            'latency_quantiles': {label: sliding.to_dict() for label, sliding in snapshot.quantiles.items()},
+            'recent_interactions': [asdict(i) for i in snapshot.recent],
+        })
+    except Exception as e:
+        logger.error(f"Failed to save metrics snapshot {snapshot.metrics_file}: {e}")
+
+
+class MetricsPersister:
+    """
+    Hintergrund-Task, der die Metriken eines MonitoringSystems schreibt
+    """
+
+    def __init__(
+        self,
+        monitoring,
+        interval_seconds: float = METRICS_FLUSH_INTERVAL_SECONDS,
+        flush_every: int = METRICS_FLUSH_EVERY
+    ):
+        self.monitoring = monitoring
+        self.interval_seconds = interval_seconds
+        self.flush_every = flush_every
+        monitoring.persister = self
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._write_lock = threading.Lock()     # Abschluss-Flush vs. laufender Write
+
+        self.stats = {
+            'flushes': 0,
+            'failures': 0,
+            'journaled': 0,
+            'last_flush_ms': None,
+            'last_error': None,
+        }
+
+    def notify(self):
+        """Nach jeder Interaction (Event-Loop): Flush anstoßen, wenn genug neu sind"""
+        if self._wakeup is not None and self.monitoring.unsaved_interactions >= self.flush_every:
+            self._wakeup.set()
+
+    def _write(self, snapshot: MetricsSnapshot):
+        with self._write_lock:
+            write_snapshot(snapshot)
+
+    async def flush(self) -> bool:
+        """
+        Snapshot nehmen und im Worker-Thread schreiben
+
+        Returns:
+            True, wenn geschrieben wurde
+        """
+        if not self.monitoring.dirty:
+            return False
+
+        snapshot = self.monitoring.snapshot()
+        start = time.perf_counter()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, snapshot)
+        except Exception as e:
+            self.monitoring.restore_journal(snapshot.journal)
+            self.stats['failures'] += 1
+            self.stats['last_error'] = f"{type(e).__name__}: {e}"
+            logger.error(f"Failed to write metrics journal {snapshot.journal_file}: {e}")
+            return False
+
+        self.stats['flushes'] += 1
+        self.stats['journaled'] += len(snapshot.journal)
+        self.stats['last_flush_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        self.stats['last_error'] = None
+        logger.debug(f"Metrics saved to {snapshot.metrics_file} (+{len(snapshot.journal)} journaled)")
+        return True
+
+    async def run(self):
+        """Flush-Schleife (läuft bis zum Abbruch des Tasks)"""
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"❌ Metrics persister error: {e}", exc_info=True)
+
+    def start(self) -> asyncio.Task:
+        """Startet die Flush-Schleife als Task der laufenden Event-Loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        """Beendet die Schleife und schreibt den letzten Stand"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+        await self.flush()
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'metrics_file': str(self.monitoring.metrics_file)}
+
+
+async def test_metrics_persistence():
+    """Selbsttest: Interactions loggen, Flush per Anzahl und beim Stoppen"""
+    from datetime import datetime
+    from monitoring import InteractionLog, MonitoringSystem
+
+    with tempfile.TemporaryDirectory() as tmp:
+        monitor = MonitoringSystem(metrics_file=str(Path(tmp) / 'metrics.json'))
+        persister = MetricsPersister(monitor, interval_seconds=60, flush_every=5)
+        persister.start()
+        await asyncio.sleep(0)
+
+        def log(n: int):
+            for i in range(n):
+                monitor.log_interaction(InteractionLog(
+                    timestamp=datetime.now().isoformat(), query=f"Frage {i}", query_length=8,
+                    keywords_found=['wifi'], keywords_confidence='high', context_entries=1,
+                    context_words=50, model_used='mistral:instruct', response_length=100,
+                    response_time_ms=1000.0, validation_issues=[], fallback_used=False,
+                    fallback_reason=None, success=True,
+                ))
+
+        print("=" * 70)
+        print("METRICS PERSISTENCE TESTS")
+        print("=" * 70)
+
+        log(7)
+        await asyncio.sleep(0.2)
+        journal = monitor.journal_file.read_text(encoding='utf-8').splitlines()
+        print(f"  After 7 interactions: {persister.stats['flushes']} flush, {len(journal)} journaled, "
+              f"{monitor.unsaved_interactions} pending")
+
+        log(2)
+        await persister.stop()
+        journal = monitor.journal_file.read_text(encoding='utf-8').splitlines()
+        data = json.loads(monitor.metrics_file.read_text(encoding='utf-8'))
+        print(f"  After stop:           {persister.stats['flushes']} flushes, {len(journal)} journaled, "
+              f"snapshot total {data['metrics']['total_interactions']}, "
+              f"{len(data['recent_interactions'])} recent")
+        print(f"  Files: {sorted(p.name for p in Path(tmp).iterdir())}")
+        print(f"\n  Stats: {persister.get_stats()}")
+        print("=" * 70)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(test_metrics_persistence())
@@ -5,21 +5,100 @@ Phase 6: Performance-Tracking, Logging und Alerting
 
 import json
 import logging
+from bisect import bisect_left
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
+from itertools import islice
 from collections import defaultdict, deque
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field
 
 from config_multi_bot import (
     LOG_LEVEL,
     LOG_FILE,
     TRACK_METRICS,
-    ALERT_THRESHOLDS
+    ALERT_THRESHOLDS,
+    MONITORING_WINDOW_SIZE,
+    MONITORING_HOURLY_RETENTION_HOURS,
+    METRICS_FLUSH_EVERY,
+    LATENCY_BUCKETS_SECONDS,
+    QUANTILE_WINDOW_SECONDS
 )
+from metrics_persistence import MetricsSnapshot, journal_path, write_snapshot
+from quantile_sketch import SlidingQuantiles, format_quantiles
 
 logger = logging.getLogger(__name__)
 
+HOUR_FORMAT = "%Y-%m-%d %H:00"
+
+# Zähler über das Interaction-Fenster (Flag -> Prädikat)
+WINDOW_FLAGS = {
+    'keywords_found': lambda i: bool(i.keywords_found),
+    'fallback_used': lambda i: bool(i.fallback_used),
+    'validation_failed': lambda i: bool(i.validation_issues),
+}
+
+
+def is_hallucination(log_entry: 'InteractionLog') -> bool:
+    return any('hallucination' in issue.lower() for issue in log_entry.validation_issues)
+
+
+def phase_label(phase: str, model: str = '') -> str:
+    """'llm' bzw. 'llm_call:mistral:instruct' (Modellnamen enthalten selbst ':')"""
+    return f"{phase}:{model}" if model else phase
+
+
+def parse_phase_label(label: str) -> Tuple[str, str]:
+    phase, _, model = label.partition(':')
+    return phase, model
+
+
+def new_hour_bucket() -> Dict:
+    return {'interactions': 0, 'failures': 0, 'avg_response_time': 0, 'hallucinations': 0}
+
+
+class LatencyHistogram:
+    """Latenz-Histogramm mit festen Grenzen (Sekunden, wie Prometheus `le`)"""
+    
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+    
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS_SECONDS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)   # letzter Bucket: +Inf
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+    
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(Grenze, Anzahl <= Grenze) inkl. +Inf"""
+        total = 0
+        buckets = []
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+
+def process_rss_mb() -> Optional[float]:
+    """Aktueller Resident Set Size des Prozesses in MB (None wenn nicht ermittelbar)"""
+    try:
+        import os
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return round(resident_pages * os.sysconf('SC_PAGE_SIZE') / 1e6, 1)
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Fallback (z.B. macOS): Spitzenwert statt aktuellem Wert, in Bytes
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e6, 1)
+    except (ImportError, OSError):
+        return None
+
 
 @dataclass
 class InteractionLog:
@@ -38,16 +117,35 @@ class InteractionLog:
     fallback_used: bool
     fallback_reason: Optional[str]
     success: bool
+    budget_misses: List[str] = field(default_factory=list)  # Phasen nach Budget-Ablauf
+    retrieved_entries: List[str] = field(default_factory=list)  # BM25-Ranking bei schwacher Extraktion
+    context_tokens: int = 0  # Context-Größe in Tokens (token_counter)
+    phase_timings_ms: Dict[str, float] = field(default_factory=dict)  # Dauer pro Pipeline-Phase
+    model_timings_ms: Dict[str, float] = field(default_factory=dict)  # Dauer pro LLM-Versuch (Modell)
 
 
 class MonitoringSystem:
     """
     Überwacht Bot-Performance und Qualität
     Tracked Metriken, detektiert Probleme, sendet Alerts
+    
+    Alle Aggregate werden inkrementell gepflegt (O(1) pro Interaction):
+    Zähler über das Fenster werden beim Hinzufügen erhöht und beim
+    Herausfallen des ältesten Eintrags verringert; Stunden-Statistiken sind
+    Buckets mit laufendem Mittelwert.
+    
+    Gespeichert wird über einen MetricsPersister (Hintergrund-Task, Snapshot
+    + JSONL-Journal); ohne Persister synchron nach METRICS_FLUSH_EVERY
+    Interactions (Skripte, Tests).
     """
     
-    def __init__(self, metrics_file: str = "borgo_bot_metrics.json"):
+    def __init__(
+        self,
+        metrics_file: str = "borgo_bot_metrics.json",
+        window_size: int = MONITORING_WINDOW_SIZE
+    ):
         self.metrics_file = Path(metrics_file)
+        self.journal_file = journal_path(self.metrics_file)
         self.session_start = datetime.now()
         
         # Real-time Metrics
@@ -60,15 +158,19 @@ class MonitoringSystem:
             'keywords_found_rate': 0,
             'fallback_rate': 0,
             'validation_failure_rate': 0,
+            'budget_misses_by_phase': defaultdict(int),
+            'fallbacks_by_reason': defaultdict(int),
         }
         
+        # Latenz-Histogramme pro (Phase, Modell) - Modell nur bei 'llm_call'
+        self.phase_latency: Dict[Tuple[str, str], LatencyHistogram] = {}
+        # p50/p90/p99 über das gleitende Fenster (ms), gleiche Schlüssel
+        self.phase_quantiles: Dict[Tuple[str, str], SlidingQuantiles] = {}
+        
         # Detailed Tracking
-        self.interactions: deque = deque(maxlen=1000)  # Letzte 1000 Interactions
-        self.hourly_stats: Dict = defaultdict(lambda: {
-            'interactions': 0,
-            'failures': 0,
-            'avg_response_time': 0
-        })
+        self.interactions: deque = deque(maxlen=window_size)  # Letzte N Interactions
+        self.window_counts = dict.fromkeys(WINDOW_FLAGS, 0)    # Flags im Fenster
+        self.hourly_stats: Dict = defaultdict(new_hour_bucket)
         
         # Alert-Tracking
         self.alerts_sent = []
@@ -76,6 +178,17 @@ class MonitoringSystem:
         
         # Performance-Fenster (letzte 10 Interactions für schnelle Checks)
         self.recent_response_times = deque(maxlen=10)
+        self.recent_failures = deque(maxlen=10)
+        
+        # Persistenz: seit dem letzten Snapshot neue Interactions
+        self.persister = None               # MetricsPersister (setzt sich selbst)
+        self.dirty = False
+        self.unsaved_interactions = 0
+        self._journal_pending: List[InteractionLog] = []
+        
+        # Historie in SQLite (InteractionStore.attach setzt beides)
+        self.store = None
+        self.bot_name: Optional[str] = None
     
     def log_interaction(self, log_entry: InteractionLog):
         """
@@ -84,17 +197,41 @@ class MonitoringSystem:
         Args:
             log_entry: InteractionLog Objekt
         """
-        self.interactions.append(log_entry)
+        self._append_to_window(log_entry)
         self._update_metrics(log_entry)
         self._check_for_alerts(log_entry)
         
-        # Speichere periodisch
-        if self.metrics['total_interactions'] % 10 == 0:
+        # Speichere periodisch (im Hintergrund, wenn ein Persister läuft)
+        self._journal_pending.append(log_entry)
+        self.unsaved_interactions += 1
+        self.dirty = True
+        if self.persister is not None:
+            self.persister.notify()
+        elif self.unsaved_interactions >= METRICS_FLUSH_EVERY:
             self._save_metrics()
+        if self.store is not None:
+            self.store.add(self.bot_name, log_entry)
         
         logger.info(f"📊 Interaction logged: {log_entry.query[:50]}... "
                    f"(Success: {log_entry.success}, Time: {log_entry.response_time_ms:.0f}ms)")
     
+    def _append_to_window(self, log_entry: InteractionLog):
+        """Fügt ins Fenster ein und pflegt die Zähler (auch für den verdrängten Eintrag)"""
+        if len(self.interactions) == self.interactions.maxlen:
+            evicted = self.interactions[0]
+            for flag, predicate in WINDOW_FLAGS.items():
+                if predicate(evicted):
+                    self.window_counts[flag] -= 1
+        
+        self.interactions.append(log_entry)
+        for flag, predicate in WINDOW_FLAGS.items():
+            if predicate(log_entry):
+                self.window_counts[flag] += 1
+    
+    def _window_rate(self, flag: str) -> float:
+        """Anteil der Interactions im Fenster mit Flag (Prozent)"""
+        return self.window_counts[flag] / len(self.interactions) * 100 if self.interactions else 0
+    
     def _update_metrics(self, log_entry: InteractionLog):
         """Updated Metriken basierend auf neuem Log"""
         self.metrics['total_interactions'] += 1
@@ -104,6 +241,10 @@ class MonitoringSystem:
         else:
             self.metrics['failed_interactions'] += 1
         
+        # Budget-Misses pro Phase
+        for phase in log_entry.budget_misses:
+            self.metrics['budget_misses_by_phase'][phase] += 1
+        
         # Response Time
         self.metrics['total_response_time_ms'] += log_entry.response_time_ms
         self.metrics['avg_response_time_ms'] = (
@@ -111,40 +252,61 @@ class MonitoringSystem:
             self.metrics['total_interactions']
         )
         self.recent_response_times.append(log_entry.response_time_ms)
+        self.recent_failures.append(not log_entry.success)
         
-        # Rates
-        total = self.metrics['total_interactions']
-        self.metrics['keywords_found_rate'] = (
-            sum(1 for i in self.interactions if i.keywords_found) / 
-            len(self.interactions) * 100
-        ) if self.interactions else 0
+        if log_entry.fallback_reason:
+            self.metrics['fallbacks_by_reason'][log_entry.fallback_reason] += 1
         
-        self.metrics['fallback_rate'] = (
-            sum(1 for i in self.interactions if i.fallback_used) / 
-            len(self.interactions) * 100
-        ) if self.interactions else 0
+        # Latenz pro Phase und pro LLM-Versuch
+        self.observe_phase('total', log_entry.response_time_ms / 1000)
+        for phase, duration_ms in log_entry.phase_timings_ms.items():
+            self.observe_phase(phase, duration_ms / 1000)
+        for model, duration_ms in log_entry.model_timings_ms.items():
+            self.observe_phase('llm_call', duration_ms / 1000, model)
         
-        self.metrics['validation_failure_rate'] = (
-            sum(1 for i in self.interactions if i.validation_issues) / 
-            len(self.interactions) * 100
-        ) if self.interactions else 0
+        # Rates (über das Fenster)
+        self.metrics['keywords_found_rate'] = self._window_rate('keywords_found')
+        self.metrics['fallback_rate'] = self._window_rate('fallback_used')
+        self.metrics['validation_failure_rate'] = self._window_rate('validation_failed')
         
         # Hourly Stats
-        hour_key = datetime.now().strftime("%Y-%m-%d %H:00")
-        self.hourly_stats[hour_key]['interactions'] += 1
+        bucket = self._hour_bucket(datetime.now())
+        bucket['interactions'] += 1
         if not log_entry.success:
-            self.hourly_stats[hour_key]['failures'] += 1
+            bucket['failures'] += 1
+        if is_hallucination(log_entry):
+            bucket['hallucinations'] = bucket.get('hallucinations', 0) + 1
         
-        # Update avg response time for this hour
-        hour_interactions = [
-            i for i in self.interactions 
-            if i.timestamp.startswith(hour_key.split()[0])
-        ]
-        if hour_interactions:
-            self.hourly_stats[hour_key]['avg_response_time'] = (
-                sum(i.response_time_ms for i in hour_interactions) / 
-                len(hour_interactions)
-            )
+        # Laufender Mittelwert der Stunde
+        bucket['avg_response_time'] += (
+            (log_entry.response_time_ms - bucket['avg_response_time']) / bucket['interactions']
+        )
+    
+    def _hour_bucket(self, now: datetime) -> Dict:
+        """Bucket der aktuellen Stunde; beim Stundenwechsel werden alte Buckets entfernt"""
+        hour_key = now.strftime(HOUR_FORMAT)
+        if hour_key not in self.hourly_stats:
+            cutoff = (now - timedelta(hours=MONITORING_HOURLY_RETENTION_HOURS)).strftime(HOUR_FORMAT)
+            for hour in [h for h in self.hourly_stats if h < cutoff]:
+                del self.hourly_stats[hour]
+        return self.hourly_stats[hour_key]
+    
+    def record_budget_miss(self, phase: str):
+        """
+        Zählt einen Budget-Miss außerhalb von process_message
+        (z.B. beim Senden, nachdem der Log-Eintrag bereits geschrieben wurde)
+        """
+        self.metrics['budget_misses_by_phase'][phase] += 1
+        self.dirty = True
+    
+    def observe_phase(self, phase: str, seconds: float, model: str = ''):
+        """Trägt eine Phasen-Dauer ins Histogramm ein (auch außerhalb von process_message, z.B. send)"""
+        histogram = self.phase_latency.get((phase, model))
+        if histogram is None:
+            histogram = self.phase_latency[(phase, model)] = LatencyHistogram()
+            self.phase_quantiles[(phase, model)] = SlidingQuantiles()
+        histogram.observe(seconds)
+        self.phase_quantiles[(phase, model)].add(seconds * 1000)
     
     def _check_for_alerts(self, log_entry: InteractionLog):
         """
@@ -163,9 +325,9 @@ class MonitoringSystem:
             })
         
         # Alert 2: Hohe Fehlerrate (letzte 10 Interactions)
-        recent = list(self.interactions)[-10:]
+        recent = self.recent_failures
         if len(recent) >= 10:
-            error_rate = sum(1 for i in recent if not i.success) / len(recent) * 100
+            error_rate = sum(recent) / len(recent) * 100
             if error_rate > ALERT_THRESHOLDS['high_error_rate_percent']:
                 alerts.append({
                     'type': 'high_error_rate',
@@ -174,15 +336,8 @@ class MonitoringSystem:
                 })
         
         # Alert 3: Halluzinationen häufen sich
-        hour_key = datetime.now().strftime("%Y-%m-%d %H")
-        recent_hour = [
-            i for i in self.interactions 
-            if i.timestamp.startswith(hour_key)
-        ]
-        hallucination_count = sum(
-            1 for i in recent_hour 
-            if any('hallucination' in issue.lower() for issue in i.validation_issues)
-        )
+        hour_key = datetime.now().strftime(HOUR_FORMAT)
+        hallucination_count = self.hourly_stats.get(hour_key, {}).get('hallucinations', 0)
         if hallucination_count >= ALERT_THRESHOLDS['hallucination_count_per_hour']:
             alerts.append({
                 'type': 'hallucination_spike',
@@ -234,9 +389,29 @@ class MonitoringSystem:
             'recent_avg_response_time_ms': (
                 sum(self.recent_response_times) / len(self.recent_response_times)
                 if self.recent_response_times else 0
-            )
+            ),
+            'phase_avg_ms': self.get_phase_averages(),
+        }
+    
+    def get_phase_averages(self) -> Dict[str, float]:
+        """Mittlere Dauer pro Phase seit Start (ms); LLM-Versuche als 'llm_call:<modell>'"""
+        return {
+            phase_label(phase, model): round(histogram.sum / histogram.count * 1000, 2)
+            for (phase, model), histogram in sorted(self.phase_latency.items())
+            if histogram.count
         }
     
+    def get_latency_quantiles(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """p50/p90/p99 pro Phase über das gleitende Fenster (QUANTILE_WINDOW_SECONDS, ms)"""
+        result = {}
+        for (phase, model), sliding in sorted(self.phase_quantiles.items()):
+            window = sliding.window()
+            if window.count:
+                result[phase_label(phase, model)] = {
+                    name: round(value, 1) for name, value in window.quantiles().items()
+                }
+        return result
+    
     def get_hourly_report(self, hours: int = 24) -> Dict:
         """
         Gibt stündlichen Report zurück
@@ -245,8 +420,15 @@ class MonitoringSystem:
             hours: Anzahl Stunden zurück
         
         Returns:
-            Dict mit stündlichen Statistiken
+            Dict mit stündlichen Statistiken (aus dem InteractionStore, falls
+            verbunden - dann auch über MONITORING_HOURLY_RETENTION_HOURS hinaus)
+        
+        Mit InteractionStore eine blockierende SQL-Abfrage: nicht aus
+        process_message aufrufen (Reports/Admin, sonst per run_in_executor).
         """
+        if self.store is not None:
+            return self.store.hourly_report(bot=self.bot_name, hours=hours)
+        
         cutoff = datetime.now() - timedelta(hours=hours)
         
         relevant_stats = {
@@ -257,13 +439,24 @@ class MonitoringSystem:
         
         return relevant_stats
     
-    def get_problem_patterns(self) -> Dict:
+    def get_problem_patterns(self, days: Optional[int] = None) -> Dict:
         """
         Analysiert Interactions und findet Problem-Patterns
         
+        Mit InteractionStore per SQL über die gespeicherte Historie (noch nicht
+        geschriebene Interactions fehlen), sonst über das Fenster. Die
+        SQL-Abfragen blockieren: nicht aus process_message aufrufen
+        (Reports/Admin, sonst per run_in_executor).
+        
+        Args:
+            days: Nur die letzten N Tage (nur mit InteractionStore)
+        
         Returns:
             Dict mit erkannten Patterns
         """
+        if self.store is not None:
+            return self.store.problem_patterns(bot=self.bot_name, days=days)
+        
         patterns = {
             'most_failed_queries': [],
             'slowest_queries': [],
@@ -305,25 +498,52 @@ class MonitoringSystem:
         
         return patterns
     
+    def snapshot(self) -> MetricsSnapshot:
+        """
+        Billige Kopie des aktuellen Stands (auf der Event-Loop)
+        
+        Übernimmt die neuen Interactions für das Journal; serialisiert und
+        geschrieben wird mit write_snapshot (Worker-Thread).
+        """
+        metrics = self.get_metrics()
+        metrics['budget_misses_by_phase'] = dict(metrics['budget_misses_by_phase'])
+        metrics['fallbacks_by_reason'] = dict(metrics['fallbacks_by_reason'])
+        
+        journal, self._journal_pending = self._journal_pending, []
+        self.unsaved_interactions = 0
+        self.dirty = False
+        
+        return MetricsSnapshot(
+            metrics_file=self.metrics_file,
+            journal_file=self.journal_file,
+            data={
+                'metrics': metrics,
+                'hourly_stats': {hour: dict(stats) for hour, stats in self.hourly_stats.items()},
+                'alerts': list(self.alerts_sent),
+                'saved_at': datetime.now().isoformat()
+            },
+            recent=list(islice(reversed(self.interactions), 100))[::-1],
+            journal=journal,
+            quantiles={
+                phase_label(phase, model): sliding.copy()
+                for (phase, model), sliding in self.phase_quantiles.items()
+            },
+        )
+    
+    def restore_journal(self, journal: List[InteractionLog]):
+        """Nicht geschriebene Interactions zurück in den Puffer (nächster Versuch)"""
+        self._journal_pending[:0] = journal
+        self.unsaved_interactions += len(journal)
+        self.dirty = True
+    
     def _save_metrics(self):
-        """Speichert Metriken zu JSON-File"""
+        """Speichert Metriken synchron (ohne Persister, z.B. Skripte und Tests)"""
+        snapshot = self.snapshot()
         try:
-            data = {
-                'metrics': self.get_metrics(),
-                'hourly_stats': dict(self.hourly_stats),
-                'recent_interactions': [
-                    asdict(i) for i in list(self.interactions)[-100:]
-                ],
-                'alerts': self.alerts_sent,
-                'saved_at': datetime.now().isoformat()
-            }
-            
-            with open(self.metrics_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
+            write_snapshot(snapshot)
             logger.debug(f"Metrics saved to {self.metrics_file}")
-        
         except Exception as e:
+            self.restore_journal(snapshot.journal)
             logger.error(f"Failed to save metrics: {e}")
     
     def load_metrics(self) -> bool:
@@ -338,14 +558,17 @@ class MonitoringSystem:
             
             # Lade Daten
             if 'hourly_stats' in data:
-                self.hourly_stats = defaultdict(
-                    lambda: {'interactions': 0, 'failures': 0, 'avg_response_time': 0},
-                    data['hourly_stats']
-                )
+                self.hourly_stats = defaultdict(new_hour_bucket, data['hourly_stats'])
             
             if 'alerts' in data:
                 self.alerts_sent = data['alerts']
             
+            # Quantil-Fenster über den Neustart hinweg (abgelaufene Scheiben verfallen)
+            for label, sliding_data in data.get('latency_quantiles', {}).items():
+                key = parse_phase_label(label)
+                self.phase_latency.setdefault(key, LatencyHistogram())
+                self.phase_quantiles.setdefault(key, SlidingQuantiles()).load(sliding_data)
+            
             logger.info(f"Metrics loaded from {self.metrics_file}")
             return True
         
@@ -378,6 +601,18 @@ class MonitoringSystem:
             "## PERFORMANCE ##",
             f"Avg Response Time: {metrics['avg_response_time_ms']:.0f}ms",
             f"Recent Avg: {metrics['recent_avg_response_time_ms']:.0f}ms",
+            f"Budget Misses: {dict(metrics['budget_misses_by_phase']) or 'none'}",
+            f"Phase Avg (ms): {metrics['phase_avg_ms'] or 'not tracked'}",
+            "",
+            f"## LATENCY QUANTILES (last {QUANTILE_WINDOW_SECONDS // 60:.0f} min) ##",
+        ]
+        quantiles = self.get_latency_quantiles()
+        report_lines.extend(
+            f"{label:30} {format_quantiles(values)}" for label, values in quantiles.items()
+        )
+        if not quantiles:
+            report_lines.append("No samples")
+        report_lines += [
             "",
             "## QUALITY ##",
             f"Keywords Found Rate: {metrics['keywords_found_rate']:.1f}%",
@@ -439,7 +674,9 @@ def test_monitoring():
             validation_issues=[],
             fallback_used=False,
             fallback_reason=None,
-            success=True
+            success=True,
+            phase_timings_ms={'validation': 0.4, 'extraction': 2.1, 'context': 1.3, 'llm': 3480.0},
+            model_timings_ms={'mistral:7b-instruct': 3460.0}
         ),
         # Gescheiterte Interaktion
         InteractionLog(
@@ -524,8 +761,9 @@ def test_monitoring():
     print(f"\n✅ Metrics saved to {monitor.metrics_file}")
     
     # Cleanup
-    if monitor.metrics_file.exists():
-        monitor.metrics_file.unlink()
+    for path in (monitor.metrics_file, monitor.journal_file):
+        if path.exists():
+            path.unlink()
 
 
 if __name__ == "__main__":
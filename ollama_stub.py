@@ -0,0 +1,366 @@
+"""
+Borgo-Bot - Deterministischer Ollama-Stub
+Lokaler Fake-Server für Benchmarks und Regression-Tests des LLM-Pfads
+
+Spricht die Teile der Ollama API, die der Bot nutzt:
+- POST /api/generate   (streaming und non-streaming)
+- GET  /api/tags
+- POST /api/embeddings (alt) und POST /api/embed (neu)
+
+Latenz, Tokens/Sekunde, Fehlerraten und Antworten (canned oder KB-Echo)
+sind global und pro Modell konfigurierbar. Zufallsentscheidungen hängen
+nur von Seed, Modell und Request-Nummer ab - gleiche Abfolge, gleiches Ergebnis.
+
+Usage:
+    python ollama_stub.py --port 11435 --latency-ms 200 --tps 40 --prompt-tps 60 --mode kb_echo
+"""
+
+import re
+import json
+import random
+import asyncio
+import hashlib
+import logging
+import argparse
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODELS = ['mistral:instruct', 'granite3.3:2b', 'qwen2.5:7b']
+DEFAULT_RESPONSE = "Dazu habe ich keine Informationen im Benvenuti-Guide."
+EMBEDDING_DIMENSIONS = 384
+
+# Erster Eintrag im Context (Format von ContextManager._format_context)
+KB_ENTRY_PATTERN = re.compile(
+    r'^## [^\n]*\n\n(.*?)(?:\n\n---|\n\n#|\Z)',
+    re.DOTALL | re.MULTILINE
+)
+TOKEN_PATTERN = re.compile(r'\S+\s*|\s+')
+
+
+@dataclass
+class StubBehavior:
+    """Verhalten des Stubs (global oder als Override für ein Modell)"""
+    latency_ms: float = 50.0          # Zeit bis zum ersten Token (Prompt-Eval)
+    prompt_tokens_per_second: float = 0.0  # Prompt-Eval proportional zur Prompt-Länge (0 = aus)
+    jitter_ms: float = 0.0            # Gleichverteilte Streuung auf latency_ms
+    tokens_per_second: float = 0.0    # 0 = ohne Generierungs-Verzögerung
+    error_rate: float = 0.0           # Anteil HTTP 500 Antworten
+    hang_rate: float = 0.0            # Anteil Requests, die nie antworten (Timeout-Test)
+    mode: str = 'kb_echo'             # 'kb_echo' oder 'canned'
+    response: str = DEFAULT_RESPONSE  # Antwort im Modus 'canned' / KB-Echo ohne Treffer
+
+
+@dataclass
+class StubConfig:
+    """Gesamtkonfiguration des Stubs"""
+    models: List[str] = field(default_factory=lambda: list(DEFAULT_MODELS))
+    default: StubBehavior = field(default_factory=StubBehavior)
+    model_overrides: Dict[str, Dict] = field(default_factory=dict)
+    seed: int = 0
+
+    def behavior_for(self, model: str) -> StubBehavior:
+        """Verhalten für ein Modell (Default + Overrides)"""
+        overrides = self.model_overrides.get(model)
+        if not overrides:
+            return self.default
+        return replace(self.default, **overrides)
+
+
+class OllamaStub:
+    """
+    In-Process Ollama-Stub auf Basis von aiohttp.web
+
+    Nutzung:
+        async with OllamaStub(config) as stub:
+            handler = LLMHandler(ollama_url=stub.url)
+    """
+
+    def __init__(
+        self,
+        config: Optional[StubConfig] = None,
+        host: str = '127.0.0.1',
+        port: int = 0
+    ):
+        self.config = config or StubConfig()
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+        self._request_counter: Dict[str, int] = {}
+        self.stats = {
+            'generate_requests': 0,
+            'stream_requests': 0,
+            'errors_injected': 0,
+            'hangs_injected': 0,
+            'tags_requests': 0,
+            'embedding_requests': 0,
+            'by_model': {},
+        }
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/api/generate', self._handle_generate)
+        app.router.add_get('/api/tags', self._handle_tags)
+        app.router.add_post('/api/embeddings', self._handle_embeddings)
+        app.router.add_post('/api/embed', self._handle_embed)
+        app.router.add_get('/stub/stats', self._handle_stats)
+        return app
+
+    async def start(self):
+        """Startet den Server (Port 0 = freien Port wählen)"""
+        self._runner = web.AppRunner(self.build_app(), access_log=None, shutdown_timeout=1.0)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+
+        if self.port == 0:
+            self.port = site._server.sockets[0].getsockname()[1]
+
+        logger.info(f"🧪 Ollama stub listening on {self.url}")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> 'OllamaStub':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def reset_stats(self):
+        """Setzt Statistiken und Request-Zähler (und damit die Zufallsfolge) zurück"""
+        self._request_counter.clear()
+        for key in self.stats:
+            self.stats[key] = {} if key == 'by_model' else 0
+
+    # ========================================================
+    # Deterministische Zufallsquelle
+    # ========================================================
+    def _rng_for(self, model: str) -> random.Random:
+        """Zufallsquelle pro (Seed, Modell, Request-Nummer)"""
+        n = self._request_counter.get(model, 0)
+        self._request_counter[model] = n + 1
+        return random.Random(f"{self.config.seed}:{model}:{n}")
+
+    # ========================================================
+    # Handler
+    # ========================================================
+    async def _handle_generate(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        model = payload.get('model', '')
+        prompt = payload.get('prompt', '')
+        stream = payload.get('stream', True)  # Ollama-Default: streaming
+
+        if model not in self.config.models:
+            return web.json_response({'error': f"model '{model}' not found"}, status=404)
+
+        behavior = self.config.behavior_for(model)
+        rng = self._rng_for(model)
+
+        self.stats['generate_requests'] += 1
+        self.stats['by_model'][model] = self.stats['by_model'].get(model, 0) + 1
+
+        # Reihenfolge der Zufallsziehungen ist fix -> deterministisch
+        roll_error = rng.random()
+        roll_hang = rng.random()
+        jitter = rng.uniform(-behavior.jitter_ms, behavior.jitter_ms) if behavior.jitter_ms else 0.0
+
+        if roll_hang < behavior.hang_rate:
+            self.stats['hangs_injected'] += 1
+            await asyncio.sleep(3600)
+
+        await asyncio.sleep(max(0.0, self._prompt_eval_ms(prompt, behavior) + jitter) / 1000)
+
+        if roll_error < behavior.error_rate:
+            self.stats['errors_injected'] += 1
+            return web.json_response({'error': 'stub: injected server error'}, status=500)
+
+        text = self._response_text(prompt, behavior)
+        tokens = TOKEN_PATTERN.findall(text)
+        started = datetime.now(timezone.utc)
+
+        if stream:
+            self.stats['stream_requests'] += 1
+            return await self._stream_tokens(request, model, prompt, tokens, behavior, started)
+
+        if behavior.tokens_per_second > 0:
+            await asyncio.sleep(len(tokens) / behavior.tokens_per_second)
+
+        return web.json_response({
+            'model': model,
+            'created_at': started.isoformat(),
+            'response': text,
+            'done': True,
+            **self._timings(prompt, tokens, behavior),
+        })
+
+    async def _stream_tokens(
+        self,
+        request: web.Request,
+        model: str,
+        prompt: str,
+        tokens: List[str],
+        behavior: StubBehavior,
+        started: datetime
+    ) -> web.StreamResponse:
+        """Streamt Tokens als NDJSON wie Ollama"""
+        resp = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+        await resp.prepare(request)
+
+        delay = 1 / behavior.tokens_per_second if behavior.tokens_per_second > 0 else 0
+        for token in tokens:
+            if delay:
+                await asyncio.sleep(delay)
+            chunk = {
+                'model': model,
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'response': token,
+                'done': False,
+            }
+            await resp.write((json.dumps(chunk, ensure_ascii=False) + "\n").encode())
+
+        final = {
+            'model': model,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'response': '',
+            'done': True,
+            **self._timings(prompt, tokens, behavior),
+        }
+        await resp.write((json.dumps(final) + "\n").encode())
+        await resp.write_eof()
+        return resp
+
+    async def _handle_tags(self, request: web.Request) -> web.Response:
+        self.stats['tags_requests'] += 1
+        models = [
+            {
+                'name': model,
+                'model': model,
+                'modified_at': '2026-01-01T00:00:00Z',
+                'size': 0,
+                'digest': hashlib.sha256(model.encode()).hexdigest(),
+                'details': {'family': model.split(':')[0], 'format': 'gguf'},
+            }
+            for model in self.config.models
+        ]
+        return web.json_response({'models': models})
+
+    async def _handle_embeddings(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        self.stats['embedding_requests'] += 1
+        return web.json_response({'embedding': self._embedding(payload.get('prompt', ''))})
+
+    async def _handle_embed(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        inputs = payload.get('input', '')
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        self.stats['embedding_requests'] += 1
+        return web.json_response({
+            'model': payload.get('model', ''),
+            'embeddings': [self._embedding(text) for text in inputs],
+        })
+
+    async def _handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    # ========================================================
+    # Hilfsfunktionen
+    # ========================================================
+    @staticmethod
+    def _response_text(prompt: str, behavior: StubBehavior) -> str:
+        """Canned-Antwort oder erster KB-Eintrag aus dem Prompt (wortgetreu)"""
+        if behavior.mode == 'kb_echo':
+            match = KB_ENTRY_PATTERN.search(prompt)
+            if match:
+                return match.group(1).strip()
+        return behavior.response
+
+    @staticmethod
+    def _prompt_eval_ms(prompt: str, behavior: StubBehavior) -> float:
+        """Feste Latenz + Prompt-Eval (CPU-Ollama: linear in der Prompt-Länge)"""
+        if behavior.prompt_tokens_per_second > 0:
+            return behavior.latency_ms + len(prompt.split()) / behavior.prompt_tokens_per_second * 1000
+        return behavior.latency_ms
+
+    @classmethod
+    def _timings(cls, prompt: str, tokens: List[str], behavior: StubBehavior) -> Dict:
+        """Ollama-kompatible Metriken (Nanosekunden)"""
+        eval_ns = int(len(tokens) / behavior.tokens_per_second * 1e9) if behavior.tokens_per_second > 0 else 0
+        prompt_ns = int(cls._prompt_eval_ms(prompt, behavior) * 1e6)
+        return {
+            'total_duration': prompt_ns + eval_ns,
+            'prompt_eval_count': len(prompt.split()),
+            'prompt_eval_duration': prompt_ns,
+            'eval_count': len(tokens),
+            'eval_duration': eval_ns,
+        }
+
+    @staticmethod
+    def _embedding(text: str) -> List[float]:
+        """Deterministischer Pseudo-Embedding-Vektor (normiert)"""
+        rng = random.Random(hashlib.sha256(text.encode('utf-8')).digest())
+        vector = [rng.gauss(0, 1) for _ in range(EMBEDDING_DIMENSIONS)]
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Deterministischer Ollama-Stub")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--tps', type=float, default=0.0, help="Tokens pro Sekunde (0 = sofort)")
+    parser.add_argument('--prompt-tps', type=float, default=0.0,
+                        help="Prompt-Eval Tokens pro Sekunde zusätzlich zu --latency-ms (0 = aus)")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--hang-rate', type=float, default=0.0)
+    parser.add_argument('--mode', choices=['kb_echo', 'canned'], default='kb_echo')
+    parser.add_argument('--response', default=DEFAULT_RESPONSE)
+    parser.add_argument('--models', default=','.join(DEFAULT_MODELS))
+    parser.add_argument('--model-overrides', default='{}',
+                        help='JSON, z.B. \'{"mistral:instruct": {"error_rate": 1.0}}\'')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+async def _serve(args: argparse.Namespace):
+    config = StubConfig(
+        models=[m.strip() for m in args.models.split(',') if m.strip()],
+        default=StubBehavior(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            tokens_per_second=args.tps,
+            prompt_tokens_per_second=args.prompt_tps,
+            error_rate=args.error_rate,
+            hang_rate=args.hang_rate,
+            mode=args.mode,
+            response=args.response,
+        ),
+        model_overrides=json.loads(args.model_overrides),
+        seed=args.seed,
+    )
+
+    async with OllamaStub(config, host=args.host, port=args.port) as stub:
+        print(f"🧪 Ollama stub running on {stub.url} (models: {', '.join(config.models)})")
+        await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_serve(_parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,185 @@
+"""
+Borgo-Bot - Passagen langer KB-Entries
+Nur die zur Frage passenden Abschnitte eines langen Entries in den Context
+
+Lange Antworten (Sicherungskasten, Pizza-Rezept, Müll, ...) bestehen aus
+Absätzen bzw. Listen mit Überschrift ("Zubereitung:\\n1. ...\\n2. ...").
+Beim Laden der KB wird jede Antwort an Leerzeilen in Passagen geteilt und
+ein BM25-Index über alle Passagen gebaut. Zur Laufzeit werden die Passagen
+eines Entries gegen die Frage gescort - ohne die Wörter, über die der Entry
+gefunden wurde (Name, Synonyme): "Wie viel Mehl für die Pizza?" wählt die
+Zutaten, "Pizza?" allein den ganzen Entry.
+
+Die erste Passage (Titel/Einleitung) bleibt immer erhalten. Ohne
+aussagekräftige Query-Wörter oder ohne Treffer wird der ganze Entry
+verwendet - Passagen verkleinern den Context nur, wenn die Frage es erlaubt.
+"""
+
+import re
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from bm25_index import BM25Index, tokenize
+from token_counter import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n')
+
+
+@dataclass(frozen=True)
+class Passage:
+    """Ein Absatz einer KB-Antwort"""
+    entry: str
+    position: int
+    text: str
+    token_counts: Tuple[Tuple[str, int], ...] = ()
+
+    @property
+    def doc_id(self) -> str:
+        return f"{self.entry}#{self.position}"
+
+    def tokens(self, counter: TokenCounter) -> int:
+        """Tokens der Passage (vorberechnet oder jetzt gezählt)"""
+        for name, count in self.token_counts:
+            if name == counter.name:
+                return count
+        return counter.count(self.text)
+
+
+def split_passages(text: str) -> List[str]:
+    """Antworttext -> Absätze (Leerzeilen trennen, Listen bleiben beisammen)"""
+    return [part.strip() for part in PARAGRAPH_BREAK.split(text.strip()) if part.strip()]
+
+
+class PassageIndex:
+    """
+    Passagen pro Entry + BM25-Index über alle Passagen
+    """
+
+    def __init__(
+        self,
+        passages: Mapping[str, Tuple[Passage, ...]],
+        index: BM25Index,
+        entry_terms: Mapping[str, FrozenSet[str]]
+    ):
+        self._passages = dict(passages)
+        self._index = index
+        self._entry_terms = dict(entry_terms)
+
+    @classmethod
+    def from_fragments(
+        cls,
+        fragments: Mapping[str, Any],
+        counters: Iterable[TokenCounter] = (),
+        previous: Optional['PassageIndex'] = None
+    ) -> 'PassageIndex':
+        """
+        Args:
+            fragments: Entry-Name -> EntryFragment (lexicon.build_fragment)
+            counters: Token-Zähler, deren Zahlen vorberechnet werden
+            previous: Bisheriger Index - unveränderte Passagen werden nicht neu tokenisiert
+        """
+        counters = tuple(counters)
+        passages: Dict[str, Tuple[Passage, ...]] = {}
+        entry_terms: Dict[str, FrozenSet[str]] = {}
+        documents: Dict[str, str] = {}
+
+        for entry_name, fragment in fragments.items():
+            entry_passages = tuple(
+                Passage(
+                    entry=entry_name,
+                    position=position,
+                    text=text,
+                    token_counts=tuple((counter.name, counter.count(text)) for counter in counters),
+                )
+                for position, text in enumerate(split_passages(fragment.content))
+            )
+            passages[entry_name] = entry_passages
+            entry_terms[entry_name] = frozenset(tokenize(
+                ' '.join([str(entry_name).replace('_', ' ')] + [str(s) for s in fragment.synonyms])
+            ))
+            for passage in entry_passages:
+                documents[passage.doc_id] = passage.text
+
+        index = previous._index.derive(documents) if previous else BM25Index.from_documents(documents)
+        logger.debug(f"Passage index built: {len(documents)} passages, {len(passages)} entries")
+        return cls(passages, index, entry_terms)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def passages(self, entry_name: str) -> Tuple[Passage, ...]:
+        return self._passages.get(entry_name, ())
+
+    def select(
+        self,
+        entry_name: str,
+        query: str,
+        max_passages: int,
+        relative_score: float
+    ) -> Optional[Tuple[int, ...]]:
+        """
+        Passagen eines Entries, die zur Frage passen
+
+        Args:
+            max_passages: Höchstens so viele Passagen zusätzlich zur ersten
+            relative_score: Passagen ab diesem Anteil des besten Scores
+
+        Returns:
+            Positionen (aufsteigend, inkl. 0) oder None = ganzer Entry
+        """
+        passages = self._passages.get(entry_name, ())
+        if len(passages) <= max_passages + 1:
+            return None
+
+        terms = set(tokenize(query)) - self._entry_terms.get(entry_name, frozenset())
+        if not terms:
+            return None
+
+        scores = self._index.score_documents(terms, (p.doc_id for p in passages[1:]))
+        if not scores:
+            return None
+
+        best = max(scores.values())
+        ranked = sorted(
+            (passage for passage in passages[1:] if scores.get(passage.doc_id, 0.0) >= best * relative_score),
+            key=lambda passage: -scores[passage.doc_id]
+        )
+        return (0,) + tuple(sorted(passage.position for passage in ranked[:max_passages]))
+
+
+def test_passage_index():
+    """Selbsttest gegen die echte Knowledge Base"""
+    from config_multi_bot import YAML_DB_PATH, PASSAGES_PER_ENTRY, PASSAGE_RELATIVE_SCORE
+    from lexicon import build_lexicon, load_knowledge_base
+
+    lexicon = build_lexicon(load_knowledge_base(YAML_DB_PATH))
+    index = lexicon.passage_index
+
+    cases = [
+        ("pizza", "Wie lange muss der Teig gehen?"),
+        ("pizza", "Wie funktioniert der Pizzaofen?"),
+        ("sicherungskasten", "Was tun nach einem Gewitter?"),
+        ("muell", "Wohin mit Sperrmüll?"),
+        ("notfall", "Notfall!"),
+    ]
+
+    print("=" * 70)
+    print(f"PASSAGE INDEX TESTS ({len(index)} passages)")
+    print("=" * 70)
+    for entry_name, query in cases:
+        selected = index.select(entry_name, query, PASSAGES_PER_ENTRY, PASSAGE_RELATIVE_SCORE)
+        passages = index.passages(entry_name)
+        print(f"\n  {query}  [{entry_name}: {len(passages)} passages]")
+        if selected is None:
+            print("    -> ganzer Entry")
+            continue
+        for position in selected:
+            print(f"    -> {passages[position].text.splitlines()[0]}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    test_passage_index()
@@ -0,0 +1,234 @@
+"""
+Borgo-Bot - Streaming-Quantile für Antwortzeiten
+p50/p90/p99 pro Phase und Modell mit begrenztem Speicher
+
+Der Mittelwert versteckt die langsamen Antworten, die Gäste bemerken. Statt
+alle Messwerte zu speichern, zählt QuantileSketch sie in logarithmischen
+Buckets (wie DDSketch/HDR-Histogramme): Bucket i deckt (γ^(i-1), γ^i] ab mit
+γ = (1 + α) / (1 - α). Jedes Quantil liegt damit höchstens um den relativen
+Fehler α (QUANTILE_RELATIVE_ACCURACY, 1%) neben dem exakten Wert. Für
+1 µs bis 10 min sind das unter 1000 Buckets, egal wie viele Messwerte.
+
+Sketches sind mergebar (Bucket-Zähler addieren) - über Zeitscheiben, Bots
+oder Prozess-Neustarts hinweg. SlidingQuantiles hält einen Ring aus
+Zeitscheiben (QUANTILE_WINDOW_SLOTS à QUANTILE_WINDOW_SECONDS / Slots) und
+merged beim Abfragen nur die Scheiben im Fenster.
+"""
+
+import math
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from config_multi_bot import (
+    QUANTILE_RELATIVE_ACCURACY,
+    QUANTILE_WINDOW_SECONDS,
+    QUANTILE_WINDOW_SLOTS,
+)
+
+REPORT_QUANTILES = (0.5, 0.9, 0.99)
+MIN_VALUE = 1e-3    # kleinere Werte (ms) zählen als 0
+
+
+class QuantileSketch:
+    """
+    Mergebarer Quantil-Sketch mit relativem Fehler (logarithmische Buckets)
+    """
+
+    __slots__ = ('relative_accuracy', '_log_gamma', 'bins', 'zero_count', 'count', 'min', 'max')
+
+    def __init__(self, relative_accuracy: float = QUANTILE_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self._log_gamma = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        if value <= MIN_VALUE:
+            self.zero_count += 1
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + 1
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'QuantileSketch'):
+        """Addiert einen anderen Sketch (gleiche Genauigkeit) in diesen"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Schätzwert für Quantil q (0-1), None ohne Messwerte"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                # Mitte des Buckets (relativer Fehler <= α), auf Min/Max begrenzt
+                value = 2 * math.exp(key * self._log_gamma) / (1 + math.exp(self._log_gamma))
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs: Iterable[float] = REPORT_QUANTILES) -> Dict[str, Optional[float]]:
+        return {f"p{round(q * 100):d}": self.quantile(q) for q in qs}
+
+    def copy(self) -> 'QuantileSketch':
+        sketch = QuantileSketch(self.relative_accuracy)
+        sketch.bins = dict(self.bins)
+        sketch.zero_count = self.zero_count
+        sketch.count = self.count
+        sketch.min = self.min
+        sketch.max = self.max
+        return sketch
+
+    def to_dict(self) -> Dict:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'bins': {str(key): count for key, count in self.bins.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'QuantileSketch':
+        sketch = cls(data['relative_accuracy'])
+        sketch.bins = {int(key): count for key, count in data['bins'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        if sketch.count:
+            sketch.min = data['min']
+            sketch.max = data['max']
+        return sketch
+
+
+class SlidingQuantiles:
+    """
+    Quantile über ein gleitendes Zeitfenster (Ring aus Sketches pro Zeitscheibe)
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = QUANTILE_WINDOW_SECONDS,
+        slots: int = QUANTILE_WINDOW_SLOTS,
+        relative_accuracy: float = QUANTILE_RELATIVE_ACCURACY,
+        clock: Callable[[], float] = time.time
+    ):
+        self.window_seconds = window_seconds
+        self.slot_seconds = window_seconds / slots
+        self.slots = slots
+        self.relative_accuracy = relative_accuracy
+        self.clock = clock
+        # Slot-Nummer (Zeit / slot_seconds) -> Sketch; höchstens `slots` Einträge
+        self._sketches: Dict[int, QuantileSketch] = {}
+
+    def _slot(self, now: float) -> int:
+        return int(now // self.slot_seconds)
+
+    def _expire(self, current: int):
+        for slot in [s for s in self._sketches if s <= current - self.slots]:
+            del self._sketches[slot]
+
+    def add(self, value: float, now: Optional[float] = None):
+        slot = self._slot(self.clock() if now is None else now)
+        sketch = self._sketches.get(slot)
+        if sketch is None:
+            self._expire(slot)
+            sketch = self._sketches[slot] = QuantileSketch(self.relative_accuracy)
+        sketch.add(value)
+
+    def window(self, now: Optional[float] = None) -> QuantileSketch:
+        """Alle Zeitscheiben im Fenster zu einem Sketch gemerged"""
+        current = self._slot(self.clock() if now is None else now)
+        merged = QuantileSketch(self.relative_accuracy)
+        for slot, sketch in self._sketches.items():
+            if current - self.slots < slot <= current:
+                merged.merge(sketch)
+        return merged
+
+    def copy(self) -> 'SlidingQuantiles':
+        """Kopie für den Metrik-Snapshot (auf der Event-Loop, Bucket-Dicts flach kopiert)"""
+        sliding = SlidingQuantiles(self.window_seconds, self.slots, self.relative_accuracy, self.clock)
+        sliding._sketches = {slot: sketch.copy() for slot, sketch in self._sketches.items()}
+        return sliding
+
+    def to_dict(self) -> Dict:
+        return {
+            'window_seconds': self.window_seconds,
+            'slots': self.slots,
+            'sketches': {str(slot): sketch.to_dict() for slot, sketch in self._sketches.items()},
+        }
+
+    def load(self, data: Dict):
+        """Übernimmt gespeicherte Zeitscheiben (z.B. nach Neustart); abgelaufene verfallen"""
+        if data.get('window_seconds') != self.window_seconds or data.get('slots') != self.slots:
+            return
+        for slot, sketch_data in data.get('sketches', {}).items():
+            sketch = QuantileSketch.from_dict(sketch_data)
+            if sketch.relative_accuracy != self.relative_accuracy:
+                continue
+            existing = self._sketches.get(int(slot))
+            if existing is None:
+                self._sketches[int(slot)] = sketch
+            else:
+                existing.merge(sketch)
+        self._expire(self._slot(self.clock()))
+
+
+def format_quantiles(quantiles: Dict[str, Optional[float]]) -> str:
+    return ' / '.join(f"{name} {value:.0f}ms" if value is not None else f"{name} -" for name, value in quantiles.items())
+
+
+def test_quantile_sketch():
+    """Selbsttest: Genauigkeit gegen exakte Quantile, Merge, gleitendes Fenster"""
+    import random
+
+    rng = random.Random(1)
+    # LLM-ähnliche Verteilung: meist 2-6 s, langer Schwanz bis 60 s
+    samples = [rng.lognormvariate(8.2, 0.6) for _ in range(100_000)]
+    exact = sorted(samples)
+
+    sketch = QuantileSketch()
+    halves = (QuantileSketch(), QuantileSketch())
+    for i, value in enumerate(samples):
+        sketch.add(value)
+        halves[i % 2].add(value)
+    merged = halves[0].copy()
+    merged.merge(halves[1])
+
+    print("=" * 70)
+    print(f"QUANTILE SKETCH TESTS ({len(samples)} samples, α={QUANTILE_RELATIVE_ACCURACY}, "
+          f"{len(sketch.bins)} buckets)")
+    print("=" * 70)
+    for q in (0.5, 0.9, 0.99, 0.999):
+        true = exact[int(q * (len(exact) - 1))]
+        estimate = sketch.quantile(q)
+        print(f"  p{q * 100:<5g} exact {true:8.0f}ms  sketch {estimate:8.0f}ms  "
+              f"error {abs(estimate - true) / true * 100:.2f}%  merged {merged.quantile(q):8.0f}ms")
+
+    sliding = SlidingQuantiles(window_seconds=60, slots=6)
+    for second in range(120):
+        sliding.add(100.0 if second < 60 else 5000.0, now=second)
+    print(f"\n  Sliding window (60s): {format_quantiles(sliding.window(now=119).quantiles())} "
+          f"(slow minute only), {len(sliding._sketches)} slots")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    test_quantile_sketch()
@@ -30,6 +30,19 @@ try:
 except Exception:
     SIGNAL_CLI_PATH = "signal-cli"
 
+try:
+    from config_multi_bot import SIGNAL_SEND_TIMEOUT_SECONDS
+except Exception:
+    SIGNAL_SEND_TIMEOUT_SECONDS = 10.0
+
+try:
+    from spans import span
+except Exception:
+    from contextlib import nullcontext
+
+    def span(timings, phase, key=None):
+        return nullcontext()
+
 SIGNAL_CLI_SOCKET = "/tmp/signal-cli-socket"
 
 
@@ -228,11 +241,23 @@ class SignalInterface:
     # ========================================================
     # Senden: JSON-RPC send via Unix Socket
     # ========================================================
-    async def send(self, text: str, group_id: Optional[str] = None) -> None:
+    async def send(
+        self,
+        text: str,
+        group_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+        timings: Optional[Dict[str, float]] = None
+    ) -> None:
         """
         Sendet eine Nachricht via JSON-RPC Socket.
         KEIN Config-Lock Problem mehr!
+
+        timeout: Max. Wartezeit auf die Daemon-Antwort in Sekunden
+                 (Default: SIGNAL_SEND_TIMEOUT_SECONDS, z.B. Restbudget der Deadline)
+        timings: Dict für die Dauer des Sendens (Span 'send', ms)
         """
+        timeout = timeout or SIGNAL_SEND_TIMEOUT_SECONDS
+
         # Target-Gruppe bestimmen
         if group_id:
             target_group = group_id
@@ -255,44 +280,47 @@ class SignalInterface:
             )
             return
 
-        logger.info(f"📤 Sende Nachricht via JSON-RPC an group_id={target_group[:30]}...: {text!r}")
-
-        try:
-            reader, writer = await asyncio.open_unix_connection(self.socket_path)
-
-            send_request = {
-                "jsonrpc": "2.0",
-                "method": "send",
-                "params": {
-                    "account": self.number,
-                    "groupId": target_group,
-                    "message": text
-                },
-                "id": 2
-            }
+        logger.info(f"📤 Sende Nachricht via JSON-RPC an group_id={target_group[:30]}...: {text!r}",
+                    extra={'sample': 'send_payload'})
+
+        # Verbindung, Request und Bestätigung des Daemons
+        with span(timings, 'send'):
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path)
+
+                send_request = {
+                    "jsonrpc": "2.0",
+                    "method": "send",
+                    "params": {
+                        "account": self.number,
+                        "groupId": target_group,
+                        "message": text
+                    },
+                    "id": 2
+                }
             
-            writer.write((json.dumps(send_request) + "\n").encode())
-            await writer.drain()
+                writer.write((json.dumps(send_request) + "\n").encode())
+                await writer.drain()
 
-            response_line = await asyncio.wait_for(reader.readline(), timeout=10.0)
-            response_str = response_line.decode("utf-8", errors="ignore").strip()
+                response_line = await asyncio.wait_for(reader.readline(), timeout=timeout)
+                response_str = response_line.decode("utf-8", errors="ignore").strip()
 
-            writer.close()
-            await writer.wait_closed()
+                writer.close()
+                await writer.wait_closed()
 
-            if response_str:
-                response = json.loads(response_str)
-                if "error" in response:
-                    error = response["error"]
-                    logger.error(
-                        f"❌ signal-cli daemon send error: {error.get('message', error)}"
-                    )
+                if response_str:
+                    response = json.loads(response_str)
+                    if "error" in response:
+                        error = response["error"]
+                        logger.error(
+                            f"❌ signal-cli daemon send error: {error.get('message', error)}"
+                        )
+                    else:
+                        logger.info("✅ Nachricht erfolgreich via JSON-RPC gesendet")
                 else:
-                    logger.info("✅ Nachricht erfolgreich via JSON-RPC gesendet")
-            else:
-                logger.warning("⚠️ Keine Response vom Daemon erhalten")
-
-        except asyncio.TimeoutError:
-            logger.error("❌ Timeout beim Senden (10s) - Daemon antwortet nicht")
-        except Exception as e:
-            logger.error(f"❌ Fehler beim Senden via JSON-RPC: {e}", exc_info=True)
+                    logger.warning("⚠️ Keine Response vom Daemon erhalten")
+
+            except asyncio.TimeoutError:
+                logger.error(f"❌ Timeout beim Senden ({timeout:.0f}s) - Daemon antwortet nicht")
+            except Exception as e:
+                logger.error(f"❌ Fehler beim Senden via JSON-RPC: {e}", exc_info=True)
@@ -0,0 +1,116 @@
+"""
+Borgo-Bot - Timing-Spans pro Pipeline-Phase
+Misst, wo die Sekunden einer Nachricht bleiben
+
+    timings = {}
+    with span(timings, 'extraction'):
+        ...
+    # timings == {'extraction': 0.42}   (Millisekunden)
+
+Ein Span misst mit der monotonen perf_counter-Uhr und addiert die Dauer beim
+Verlassen des Blocks in das übergebene Dict - auch bei return oder Exception.
+Der Schlüssel ist die Phase oder ein eigener `key` (z.B. das Modell bei
+'llm_call'). Gemessene Dicts landen im InteractionLog
+(phase_timings_ms, model_timings_ms) und von dort in den Histogrammen des
+MonitoringSystems.
+
+Welche Phasen gemessen werden, steuert TRACK_METRICS (PHASE_FLAGS). Für
+abgeschaltete Phasen gibt span() ein geteiltes No-op-Objekt zurück - ohne
+Uhr-Aufruf und ohne Allokation.
+"""
+
+import time
+from typing import Dict, Optional
+
+from config_multi_bot import TRACK_METRICS
+
+# Phase -> Flag in TRACK_METRICS
+PHASE_FLAGS = {
+    'validation': 'validation_time',
+    'extraction': 'keyword_extraction_time',
+    'context': 'query_processing_time',
+    'llm': 'llm_response_time',
+    'llm_call': 'llm_response_time',
+    'response_validation': 'validation_time',
+    'send': 'signal_send_time',
+}
+
+ENABLED_PHASES = frozenset(phase for phase, flag in PHASE_FLAGS.items() if TRACK_METRICS.get(flag))
+
+
+class _Span:
+    """Misst einen Block und addiert die Dauer (ms) in timings[key]"""
+
+    __slots__ = ('timings', 'key', 'start')
+
+    def __init__(self, timings: Dict[str, float], key: str):
+        self.timings = timings
+        self.key = key
+        self.start = 0.0
+
+    def __enter__(self) -> '_Span':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        self.timings[self.key] = round(self.timings.get(self.key, 0.0) + elapsed_ms, 3)
+        return False
+
+
+class _NullSpan:
+    """Abgeschaltete Phase: tut nichts"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def span(timings: Optional[Dict[str, float]], phase: str, key: Optional[str] = None):
+    """
+    Span für eine Phase
+
+    Args:
+        timings: Ziel-Dict (None = nicht messen)
+        phase: Phase aus PHASE_FLAGS (entscheidet, ob gemessen wird)
+        key: Schlüssel im Dict (Standard: phase)
+    """
+    if timings is None or phase not in ENABLED_PHASES:
+        return NULL_SPAN
+    return _Span(timings, key or phase)
+
+
+def test_spans():
+    """Selbsttest: Messung, Exceptions und Overhead pro Span"""
+    import timeit
+
+    print("=" * 70)
+    print(f"SPAN TESTS (enabled: {sorted(ENABLED_PHASES)})")
+    print("=" * 70)
+
+    timings: Dict[str, float] = {}
+    with span(timings, 'llm_call', key='mistral:instruct'):
+        time.sleep(0.01)
+    try:
+        with span(timings, 'send'):
+            raise RuntimeError("send failed")
+    except RuntimeError:
+        pass
+    print(f"  Timings: {timings}")
+
+    runs = 200_000
+    for label, phase in (("enabled", 'extraction'), ("disabled", 'unknown_phase')):
+        seconds = timeit.timeit(lambda: span({}, phase).__enter__().__exit__(None, None, None), number=runs)
+        print(f"  {label:8} span: {seconds / runs * 1e9:6.0f} ns")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    test_spans()
@@ -0,0 +1,152 @@
+"""
+Borgo-Bot - Token-Zählung für das Context-Budget
+Ersetzt die Wortzahl als Maß für die Prompt-Größe
+
+Deutsche Antworten mit Emojis, Zahlen und Komposita ergeben deutlich mehr
+Tokens als Wörter (in der KB ca. 2.3 pro Wort). Zwei Zähler:
+- approx: Heuristik ohne Abhängigkeiten - Wortteile à APPROX_CHARS_PER_TOKEN
+  Zeichen, jedes Satz-/Sonderzeichen ein Token
+- exact:  Tokenizer des Modells (HuggingFace `tokenizers`, tokenizer.json aus
+  TOKENIZER_FILES); ohne Paket oder Datei wird approx verwendet
+
+Die Token-Zahlen der Entries werden beim Laden der KB pro Zähler berechnet
+(EntryFragment.token_counts); zur Laufzeit wird nur noch addiert.
+"""
+
+import re
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from config_multi_bot import (
+    TOKEN_COUNT_MODE,
+    APPROX_CHARS_PER_TOKEN,
+    TOKENIZER_FILES,
+    CONTEXT_TOKEN_BUDGETS,
+)
+
+try:
+    from tokenizers import Tokenizer
+    TOKENIZERS_AVAILABLE = True
+except ImportError:
+    TOKENIZERS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+class TokenCounter(ABC):
+    """Zählt Tokens eines Textes; `name` (von Unterklassen gesetzt) identifiziert die Zählweise in Caches"""
+
+    name: str
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        ...
+
+
+class ApproxTokenCounter(TokenCounter):
+    """Schätzung: Wörter in Stücke à chars_per_token Zeichen, Sonderzeichen einzeln"""
+
+    def __init__(self, chars_per_token: int = APPROX_CHARS_PER_TOKEN):
+        self.chars_per_token = chars_per_token
+        self.name = f"approx{chars_per_token}"
+
+    def count(self, text: str) -> int:
+        tokens = 0
+        for piece in _PIECES.findall(text):
+            if piece[0].isalnum() or piece[0] == '_':
+                tokens += 1 + (len(piece) - 1) // self.chars_per_token
+            else:
+                tokens += 1
+        return tokens
+
+
+class HFTokenCounter(TokenCounter):
+    """Exakte Zählung mit dem Tokenizer eines Modells (tokenizer.json)"""
+
+    def __init__(self, model: str, tokenizer_file: Path):
+        self._tokenizer = Tokenizer.from_file(str(tokenizer_file))
+        self.name = f"hf:{model}"
+
+    def count(self, text: str) -> int:
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+_approx = ApproxTokenCounter()
+_exact: Dict[str, TokenCounter] = {}
+
+
+def get_token_counter(model: Optional[str] = None) -> TokenCounter:
+    """Zähler für ein Modell (exakt, falls konfiguriert und verfügbar)"""
+    if TOKEN_COUNT_MODE != 'exact' or model not in TOKENIZER_FILES:
+        return _approx
+
+    if model not in _exact:
+        tokenizer_file = Path(TOKENIZER_FILES[model])
+        if not TOKENIZERS_AVAILABLE:
+            logger.warning("⚠️ 'tokenizers' not installed - using approximate token counts")
+            _exact[model] = _approx
+        elif not tokenizer_file.exists():
+            logger.warning(f"⚠️ Tokenizer file {tokenizer_file} missing - approximate counts for '{model}'")
+            _exact[model] = _approx
+        else:
+            _exact[model] = HFTokenCounter(model, tokenizer_file)
+    return _exact[model]
+
+
+def configured_token_counters() -> Tuple[TokenCounter, ...]:
+    """Alle Zähler, für die beim KB-Laden Token-Zahlen vorberechnet werden"""
+    counters = {_approx.name: _approx}
+    for model in TOKENIZER_FILES:
+        counter = get_token_counter(model)
+        counters.setdefault(counter.name, counter)
+    return tuple(counters.values())
+
+
+def context_token_budget(model: Optional[str] = None) -> int:
+    """Token-Budget für den Context (ohne Frage und Prompt-Rahmen des LLMHandlers)"""
+    return CONTEXT_TOKEN_BUDGETS.get(model, CONTEXT_TOKEN_BUDGETS['default'])
+
+
+def fits_context_of(model: str, context_model: Optional[str]) -> bool:
+    """
+    True, wenn ein für context_model gebauter Context auch für model passt
+
+    Der Context wird für das Primärmodell gebaut; Fallback-Modelle mit
+    kleinerem Budget oder anderem Tokenizer brauchen einen eigenen.
+    """
+    return (context_token_budget(model) >= context_token_budget(context_model)
+            and get_token_counter(model).name == get_token_counter(context_model).name)
+
+
+def test_token_counter():
+    """Selbsttest: Wörter vs. Tokens für die Entries der echten KB"""
+    from lexicon import load_knowledge_base
+    from config_multi_bot import YAML_DB_PATH, LLM_MODELS
+
+    kb = load_knowledge_base(YAML_DB_PATH)
+    answers = {name: str(data.get('answer') or '') for name, data in kb.items() if hasattr(data, 'get')}
+
+    print("=" * 70)
+    print(f"TOKEN COUNTER TESTS (mode {TOKEN_COUNT_MODE}, "
+          f"counters {[c.name for c in configured_token_counters()]})")
+    print("=" * 70)
+    for name in list(answers)[:6]:
+        text = answers[name]
+        print(f"  {name:20} {len(text.split()):4} words -> {_approx.count(text):4} tokens")
+
+    words = sum(len(text.split()) for text in answers.values())
+    tokens = sum(_approx.count(text) for text in answers.values())
+    print(f"\n  KB total: {words} words -> {tokens} tokens ({tokens / words:.2f} per word)")
+    for model in LLM_MODELS:
+        print(f"  Budget {model:20} {context_token_budget(model)} tokens ({get_token_counter(model).name})")
+    print(f"  Reuse context of {LLM_MODELS[0]}: "
+          f"{[model for model in LLM_MODELS if fits_context_of(model, LLM_MODELS[0])]}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    test_token_counter()